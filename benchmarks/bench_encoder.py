@@ -0,0 +1,97 @@
+"""
+Compare the journal encoder with the `isinstance` chain it replaced.
+
+    python -m benchmarks.bench_encoder --activities 10000
+
+Each variant serializes the same synthetic journal, whose activity outputs
+mix the types the legacy encoder supported, and the best of `--repeat`
+rounds is reported.
+"""
+
+import argparse
+import decimal
+import json
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from chaostoolkit.encoding import dumps, encoder
+
+
+def legacy_encoder(o: object) -> str:
+    # the encoder as it was before the dispatch registry
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    elif isinstance(o, decimal.Decimal):
+        return str(o)
+    elif isinstance(o, uuid.UUID):
+        return str(o)
+
+    raise TypeError(f"Object of type '{type(o)}' is not JSON serializable")
+
+
+def make_journal(activities: int) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    runs = []
+    for i in range(activities):
+        runs.append(
+            {
+                "activity": {
+                    "type": "probe",
+                    "name": f"probe-{i}",
+                    "provider": {
+                        "type": "python",
+                        "module": "os.path",
+                        "func": "exists",
+                        "arguments": {"path": f"/tmp/{i}"},
+                    },
+                },
+                "status": "succeeded",
+                "start": now,
+                "end": now,
+                "duration": 0.001 * i,
+                "output": {
+                    "id": uuid.uuid4(),
+                    "value": decimal.Decimal(i) / 7,
+                    "samples": list(range(10)),
+                },
+            }
+        )
+    return {"chaoslib-version": "1", "status": "completed", "run": runs}
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--activities", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args(args)
+
+    journal = make_journal(options.activities)
+    variants = {
+        "legacy encoder": lambda: json.dumps(journal, default=legacy_encoder),
+        "dispatch encoder": lambda: json.dumps(journal, default=encoder),
+        "dumps": lambda: dumps(journal),
+        "dumps, indented": lambda: dumps(journal, indent=2),
+    }
+
+    baseline = None
+    for name, func in variants.items():
+        duration = best_of(options.repeat, func)
+        baseline = baseline or duration
+        print(
+            f"{name:<20}{duration * 1000:>10.1f} ms{baseline / duration:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Generate synthetic experiments to load-test the toolkit.
+
+    python -m benchmarks.generate --activities 5000 --payload-size 4096 \\
+        --pause exponential:0.01 --background-ratio 0.2 -o experiment.json
+
+Activities only call local functions of the standard library, so the
+experiment runs anywhere and its cost is the toolkit's own:
+
+* no-op actions call `os.getcwd`
+* echo actions call `json.dumps` on a payload of `--payload-size`
+  characters, which comes back as their output and ends up in the journal
+* probes of the steady-state hypothesis call `os.path.exists`
+
+Pauses follow the distribution given with `--pause`, and a share of the
+method activities run in the background.
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+from typing import Any, Callable, Dict, List
+
+import yaml
+
+PAUSE_DISTRIBUTIONS = ("none", "constant", "uniform", "exponential")
+
+
+def make_experiment(
+    activities: int = 100,
+    probes: int = 2,
+    rollbacks: int = 0,
+    payload_size: int = 0,
+    echo_ratio: float = 0.5,
+    background_ratio: float = 0.0,
+    pause: str = "none",
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    A valid experiment of `activities` actions in its method, a hypothesis
+    of `probes` probes and `rollbacks` rollback actions.
+
+    A share of `echo_ratio` actions echo a payload of `payload_size`
+    characters, the others do nothing, and a share of `background_ratio`
+    of them run in the background. `pause` is a distribution and its mean,
+    in seconds, such as `constant:0.1`, `uniform:0.1` or `exponential:0.1`,
+    of the pause after each action.
+    """
+    rng = random.Random(seed)
+    payload = "".join(rng.choices(string.ascii_letters, k=payload_size))
+    next_pause = _pauses(pause, rng)
+
+    method = []
+    for index in range(activities):
+        if rng.random() < echo_ratio:
+            activity = _action(f"echo-{index}", "json", "dumps", obj=payload)
+        else:
+            activity = _action(f"noop-{index}", "os", "getcwd")
+        if rng.random() < background_ratio:
+            activity["background"] = True
+        duration = next_pause()
+        if duration:
+            activity["pauses"] = {"after": duration}
+        method.append(activity)
+
+    experiment = {
+        "title": f"Synthetic experiment of {activities} activities",
+        "description": "Generated to load-test the Chaos Toolkit",
+        "tags": ["synthetic"],
+        "steady-state-hypothesis": {
+            "title": "Current directory exists",
+            "probes": [
+                {
+                    "name": f"current-directory-exists-{index}",
+                    "type": "probe",
+                    "tolerance": True,
+                    "provider": {
+                        "type": "python",
+                        "module": "os.path",
+                        "func": "exists",
+                        "arguments": {"path": "."},
+                    },
+                }
+                for index in range(probes)
+            ],
+        },
+        "method": method,
+    }
+    if rollbacks:
+        experiment["rollbacks"] = [
+            _action(f"rollback-{index}", "os", "getcwd")
+            for index in range(rollbacks)
+        ]
+    return experiment
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--activities", type=int, default=100)
+    parser.add_argument("--probes", type=int, default=2)
+    parser.add_argument("--rollbacks", type=int, default=0)
+    parser.add_argument(
+        "--payload-size",
+        type=int,
+        default=0,
+        help="Characters echoed by each echo action.",
+    )
+    parser.add_argument(
+        "--echo-ratio",
+        type=float,
+        default=0.5,
+        help="Share of echo actions, the others do nothing.",
+    )
+    parser.add_argument(
+        "--background-ratio",
+        type=float,
+        default=0.0,
+        help="Share of actions running in the background.",
+    )
+    parser.add_argument(
+        "--pause",
+        default="none",
+        help="Distribution of the pause after each action and its mean in "
+        f"seconds, as DISTRIBUTION:MEAN, one of {PAUSE_DISTRIBUTIONS}.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="File to write the experiment to, YAML when it ends with "
+        ".yaml or .yml, the standard output by default.",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        experiment = make_experiment(
+            activities=args.activities,
+            probes=args.probes,
+            rollbacks=args.rollbacks,
+            payload_size=args.payload_size,
+            echo_ratio=args.echo_ratio,
+            background_ratio=args.background_ratio,
+            pause=args.pause,
+            seed=args.seed,
+        )
+    except ValueError as x:
+        parser.error(str(x))
+
+    if args.output and args.output.endswith((".yaml", ".yml")):
+        content = yaml.safe_dump(experiment, sort_keys=False)
+    else:
+        content = json.dumps(experiment, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(content)
+    else:
+        sys.stdout.write(content)
+    return 0
+
+
+def _action(
+    name: str, module: str, func: str, **arguments: Any
+) -> Dict[str, Any]:
+    provider = {"type": "python", "module": module, "func": func}
+    if arguments:
+        provider["arguments"] = arguments
+    return {"name": name, "type": "action", "provider": provider}
+
+
+def _pauses(pause: str, rng: random.Random) -> Callable[[], float]:
+    distribution, _, mean = pause.partition(":")
+    if distribution not in PAUSE_DISTRIBUTIONS:
+        raise ValueError(f"Unknown pause distribution '{distribution}'")
+    if distribution == "none":
+        return lambda: 0
+    try:
+        mean = float(mean)
+    except ValueError:
+        raise ValueError(f"Expected DISTRIBUTION:MEAN, got '{pause}'")
+
+    if distribution == "constant":
+        return lambda: mean
+    elif distribution == "uniform":
+        return lambda: round(rng.uniform(0, 2 * mean), 6)
+    return lambda: round(rng.expovariate(1 / mean), 6) if mean else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
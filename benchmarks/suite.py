@@ -0,0 +1,351 @@
+"""
+Benchmark the chaos command overhead and the journal I/O.
+
+    python -m benchmarks.suite run --output results.json
+    python -m benchmarks.suite compare baseline.json results.json
+
+Each benchmark runs for a number of rounds and its minimum, median, mean
+and standard deviation, in seconds, are saved along with the versions of
+chaostoolkit, chaoslib and Python, so results of two releases, or two
+commits, can be compared. `compare` exits with an error when the median of
+a benchmark regressed by more than `--threshold` percent.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import yaml
+from chaoslib import __version__ as chaoslib_version
+from chaoslib.settings import load_settings, save_settings
+
+from benchmarks.bench_encoder import make_journal
+from benchmarks.generate import make_experiment
+from chaostoolkit import __version__, encoder
+from chaostoolkit import settings as settings_cache
+from chaostoolkit.journal import load_journal, save_journal
+from chaostoolkit.settings import load_settings as load_cached_settings
+
+RESULTS_FORMAT = 1
+JOURNAL_SIZES = (1000, 10000, 100000)
+SETTINGS_CHANNELS = 500
+
+
+def measure(func: Callable[[], Any], rounds: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def summarize(timings: List[float]) -> Dict[str, Any]:
+    return {
+        "rounds": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def chaos(*args: str, env: Dict[str, str] = None) -> None:
+    cmd = [sys.executable, "-m", "chaostoolkit", "--no-version-check"]
+    p = subprocess.run(
+        cmd + list(args),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+    # a deviated run exits with 1 too, which is fine for timing
+    if p.returncode not in (0, 1):
+        raise RuntimeError(p.stderr.decode("utf-8", "replace"))
+
+
+def bench_help(rounds: int) -> Dict[str, Any]:
+    """
+    `chaos --help`, cold with no compiled bytecode to reuse, then warm.
+    """
+    results = {}
+    timings = []
+    for _ in range(rounds):
+        with tempfile.TemporaryDirectory() as pycache:
+            env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+            start = time.perf_counter()
+            chaos("--no-log-file", "--help", env=env)
+            timings.append(time.perf_counter() - start)
+    results["help.cold"] = summarize(timings)
+
+    chaos("--no-log-file", "--help")
+    results["help.warm"] = measure(
+        lambda: chaos("--no-log-file", "--help"), rounds
+    )
+    return results
+
+
+def bench_run(rounds: int, workdir: str) -> Dict[str, Any]:
+    """
+    End-to-end `chaos run` of an experiment of trivial Python probes and
+    action, and its overhead: the time not spent in the experiment itself.
+    """
+    experiment_path = os.path.join(workdir, "experiment.json")
+    journal_path = os.path.join(workdir, "journal.json")
+    settings_path = os.path.join(workdir, "settings.yaml")
+    with open(experiment_path, "w") as f:
+        json.dump(make_experiment(activities=1, probes=1, echo_ratio=0), f)
+
+    args = [
+        "--no-log-file",
+        "--settings",
+        settings_path,
+        "run",
+        "--no-cache",
+        "--journal-path",
+        journal_path,
+        experiment_path,
+    ]
+    timings = []
+    overheads = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        chaos(*args)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        overheads.append(elapsed - load_journal(journal_path)["duration"])
+
+    return {"run": summarize(timings), "run.overhead": summarize(overheads)}
+
+
+def bench_scale(rounds: int, workdir: str, activities: int) -> Dict[str, Any]:
+    """
+    `chaos validate` and `chaos run` of a synthetic experiment of many
+    activities, some in the background, echoing 1KB payloads.
+    """
+    experiment_path = os.path.join(workdir, f"synthetic-{activities}.json")
+    journal_path = os.path.join(workdir, f"synthetic-{activities}-journal.json")
+    settings_path = os.path.join(workdir, "settings.yaml")
+    experiment = make_experiment(
+        activities=activities,
+        rollbacks=activities // 10,
+        payload_size=1024,
+        background_ratio=0.1,
+    )
+    with open(experiment_path, "w") as f:
+        json.dump(experiment, f)
+
+    common = ["--no-log-file", "--settings", settings_path]
+    validate = common + ["validate", "--no-cache", experiment_path]
+    run = common + ["run", "--no-cache", "--journal-path", journal_path]
+    return {
+        f"scale.validate.{activities}": measure(
+            lambda: chaos(*validate), rounds
+        ),
+        f"scale.run.{activities}": measure(
+            lambda: chaos(*run, experiment_path), rounds
+        ),
+    }
+
+
+def bench_settings(rounds: int, workdir: str) -> Dict[str, Any]:
+    """
+    Load and save a large settings file, with many notification channels,
+    controls and secrets. `settings.load.cached` loads it from the snapshot
+    kept on disk by the chaostoolkit, as a new process would.
+    """
+    path = os.path.join(workdir, "large-settings.yaml")
+    settings = make_settings(SETTINGS_CHANNELS)
+    with open(path, "w") as f:
+        yaml.safe_dump(settings, f)
+    # files modified too recently are not cached
+    past = time.time() - 60
+    os.utime(path, (past, past))
+
+    cache_dir = os.path.join(workdir, "cache")
+    load_cached_settings(path, cache_dir)
+
+    def load_cached():
+        settings_cache._memory.clear()
+        load_cached_settings(path, cache_dir)
+
+    return {
+        "settings.load": measure(lambda: load_settings(path), rounds),
+        "settings.load.cached": measure(load_cached, rounds),
+        "settings.save": measure(lambda: save_settings(settings, path), rounds),
+    }
+
+
+def bench_journals(
+    rounds: int, workdir: str, sizes: List[int]
+) -> Dict[str, Any]:
+    """
+    Save and load journals of `sizes` activities, pretty-printed and
+    compact, as well as encode them with the standard library and
+    `encoder`, which is what is left when orjson is not installed.
+    """
+    results = {}
+    for size in sizes:
+        journal = make_journal(size)
+        # larger journals take long enough not to need as many rounds
+        size_rounds = max(1, rounds * 1000 // max(size, 1000))
+        results[f"journal.encode.{size}"] = measure(
+            lambda: json.dumps(journal, default=encoder), size_rounds
+        )
+        for fmt in ("json", "compact"):
+            path = os.path.join(workdir, f"journal-{size}.{fmt}")
+            results[f"journal.save.{fmt}.{size}"] = measure(
+                lambda: save_journal(journal, path, fmt), size_rounds
+            )
+            results[f"journal.load.{fmt}.{size}"] = measure(
+                lambda: load_journal(path), size_rounds
+            )
+    return results
+
+
+def make_settings(channels: int) -> Dict[str, Any]:
+    return {
+        "notifications": [
+            {
+                "type": "http",
+                "url": f"https://notifications.example.com/{i}",
+                "headers": {"Authorization": f"Bearer {'x' * 64}"},
+                "events": ["run-started", "run-completed", "run-failed"],
+            }
+            for i in range(channels)
+        ],
+        "controls": {
+            f"control-{i}": {
+                "provider": {
+                    "type": "python",
+                    "module": f"chaosextension.control{i}",
+                    "arguments": {"level": i, "tags": ["a", "b", "c"]},
+                }
+            }
+            for i in range(channels)
+        },
+        "auths": {
+            f"host-{i}.example.com": {"type": "bearer", "value": "x" * 64}
+            for i in range(channels)
+        },
+    }
+
+
+def run_suite(args: argparse.Namespace) -> int:
+    benchmarks = set(args.only or BENCHMARKS)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        if "help" in benchmarks:
+            results.update(bench_help(args.rounds))
+        if "run" in benchmarks:
+            results.update(bench_run(args.rounds, workdir))
+        if "scale" in benchmarks:
+            results.update(
+                bench_scale(args.rounds, workdir, args.scale_activities)
+            )
+        if "settings" in benchmarks:
+            results.update(bench_settings(args.rounds, workdir))
+        if "journal" in benchmarks:
+            results.update(
+                bench_journals(args.rounds, workdir, args.journal_sizes)
+            )
+
+    report = {
+        "format": RESULTS_FORMAT,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "chaostoolkit": __version__,
+        "chaoslib": chaoslib_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    for name, result in results.items():
+        print(f"{name:<32}{result['median'] * 1000:>12.2f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    with open(args.candidate) as f:
+        candidate = json.load(f)["results"]
+
+    regressed = 0
+    for name in sorted(set(baseline) & set(candidate)):
+        before = baseline[name]["median"]
+        after = candidate[name]["median"]
+        change = (after - before) / before * 100 if before else 0.0
+        marker = ""
+        if change > args.threshold:
+            marker = "  REGRESSION"
+            regressed += 1
+        print(
+            f"{name:<32}{before * 1000:>12.2f} ms{after * 1000:>12.2f} ms"
+            f"{change:>+10.1f}%{marker}"
+        )
+
+    for name in sorted(set(baseline) ^ set(candidate)):
+        side = "baseline" if name in baseline else "candidate"
+        print(f"{name:<32} only in {side}")
+
+    return 1 if regressed else 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmarks.")
+    run.add_argument("--output", help="JSON file to save the results to.")
+    run.add_argument("--rounds", type=int, default=5)
+    run.add_argument(
+        "--only",
+        action="append",
+        choices=BENCHMARKS,
+        help="Only run this benchmark, may be given more than once.",
+    )
+    run.add_argument(
+        "--journal-sizes",
+        type=lambda v: [int(s) for s in v.split(",")],
+        default=list(JOURNAL_SIZES),
+        help="Comma-separated numbers of activities of the journals.",
+    )
+    run.add_argument(
+        "--scale-activities",
+        type=int,
+        default=1000,
+        help="Number of activities of the synthetic experiment.",
+    )
+    run.set_defaults(func=run_suite)
+
+    cmp = commands.add_parser("compare", help="Compare two results files.")
+    cmp.add_argument("baseline")
+    cmp.add_argument("candidate")
+    cmp.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Median slowdown, in percent, reported as a regression.",
+    )
+    cmp.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+BENCHMARKS = ("help", "run", "scale", "settings", "journal")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
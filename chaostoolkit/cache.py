@@ -0,0 +1,424 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import requests
+import yaml
+from requests.exceptions import RequestException
+from chaoslib import __version__ as chaoslib_version
+from chaoslib.control import controls
+from chaoslib.exceptions import InvalidExperiment, InvalidSource
+from chaoslib.experiment import ensure_experiment_is_valid
+from chaoslib.loader import load_experiment
+from chaoslib.types import Experiment, Settings
+
+from chaostoolkit import __version__, encoder
+from chaostoolkit.settings import get_cache_dir
+
+__all__ = ["get_cache_dir", "load_cached_experiment", "validate_experiment"]
+
+EXPERIMENT_CACHE_TTL = 300
+EXPERIMENT_CACHE_MAX_SIZE = 100 * 1024 * 1024
+VALIDATION_CACHE_MAX_ENTRIES = 1000
+# connect and read timeouts, in seconds, when fetching an experiment
+EXPERIMENT_FETCH_TIMEOUT = (5, 30)
+logger = logging.getLogger("chaostoolkit")
+
+
+def load_cached_experiment(
+    source: str,
+    settings: Settings = None,
+    verify_tls: bool = True,
+    cache_dir: str = None,
+    refresh: bool = False,
+) -> Experiment:
+    """
+    Load an experiment like `chaoslib.loader.load_experiment` does, but keep
+    those fetched over HTTP in a local cache under `cache_dir`.
+
+    Entries are keyed by URL and point to the parsed experiment, stored by
+    the hash of its content. For `EXPERIMENT_CACHE_TTL` seconds, the cached
+    experiment is used without any request. Then, it is revalidated with a
+    conditional request based on the `ETag` and `Last-Modified` headers
+    returned by the server, so an unchanged experiment is neither downloaded
+    nor parsed again. The least recently used entries are evicted once the
+    cache grows over `EXPERIMENT_CACHE_MAX_SIZE` bytes.
+
+    Set `refresh` to fetch the experiment again regardless of the cache, and
+    leave `cache_dir` unset to not use the cache at all.
+    """
+    p = urlparse(source)
+    if not cache_dir or p.scheme not in ("http", "https"):
+        return load_experiment(source, settings, verify_tls=verify_tls)
+
+    cache = ExperimentCache(os.path.join(cache_dir, "experiments"))
+    with controls(level="loader", context=source) as control:
+        experiment = cache.load(source, settings, verify_tls, refresh)
+        control.with_state(experiment)
+        return experiment
+
+
+class ExperimentCache:
+    """
+    Content-addressed cache of experiments fetched over HTTP.
+
+    The layout of the cache directory is:
+
+    * `urls/<sha256 of the URL>.json`: the validators of a URL and the hash
+      of the content it last returned
+    * `objects/<sha256 of the content>.json`: the parsed experiment
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.urls_dir = os.path.join(path, "urls")
+        self.objects_dir = os.path.join(path, "objects")
+
+    def load(
+        self,
+        url: str,
+        settings: Settings = None,
+        verify_tls: bool = True,
+        refresh: bool = False,
+    ) -> Experiment:
+        entry = None if refresh else self._read_entry(url)
+        experiment = None
+        if entry:
+            experiment = self._read_object(entry["digest"])
+            if experiment is None:
+                entry = None
+
+        if experiment is not None:
+            age = time.time() - entry.get("validated_at", 0)
+            if 0 <= age < EXPERIMENT_CACHE_TTL:
+                logger.debug(f"Using cached experiment for '{url}'")
+                self._write_entry(url, entry)
+                return experiment
+
+        r = self._fetch(url, settings, verify_tls, entry)
+        if r.status_code == 304 and experiment is not None:
+            logger.debug(f"Cached experiment for '{url}' is still valid")
+            entry["validated_at"] = time.time()
+            self._write_entry(url, entry)
+            return experiment
+
+        if r.status_code != 200:
+            raise InvalidSource(f"Failed to fetch the experiment: {r.text}")
+
+        logger.debug(f"Fetched experiment: \n{r.text}")
+        content_type = r.headers.get("Content-Type") or ""
+        digest = hashlib.sha256(r.content).hexdigest()
+        experiment = self._read_object(digest)
+        if experiment is None:
+            experiment = parse_experiment(r.text, content_type)
+            self._write_object(digest, experiment)
+
+        self._write_entry(
+            url,
+            {
+                "url": url,
+                "digest": digest,
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "validated_at": time.time(),
+            },
+        )
+        self.evict()
+        return experiment
+
+    def evict(self, max_size: int = None) -> None:
+        """
+        Remove the least recently used entries until the cache fits in
+        `max_size` bytes, then the objects no entry points to any longer.
+        """
+        max_size = EXPERIMENT_CACHE_MAX_SIZE if max_size is None else max_size
+        if not os.path.isdir(self.urls_dir):
+            return
+
+        entries = []
+        for name in os.listdir(self.urls_dir):
+            entry_path = os.path.join(self.urls_dir, name)
+            try:
+                with open(entry_path) as f:
+                    entry = json.load(f)
+                entries.append(
+                    (os.path.getmtime(entry_path), entry_path, entry)
+                )
+            except (OSError, ValueError):
+                continue
+
+        # entries are touched on each use so their mtime is the last access
+        entries.sort(key=lambda e: e[0], reverse=True)
+        kept = set()
+        size = 0
+        for _, entry_path, entry in entries:
+            digest = entry.get("digest")
+            object_size = 0
+            if digest not in kept:
+                object_size = self._object_size(digest)
+            if size + object_size > max_size:
+                logger.debug(f"Evicting cached experiment '{entry['url']}'")
+                _remove(entry_path)
+                continue
+            kept.add(digest)
+            size += object_size
+
+        if os.path.isdir(self.objects_dir):
+            for name in os.listdir(self.objects_dir):
+                if name.rsplit(".", 1)[0] not in kept:
+                    _remove(os.path.join(self.objects_dir, name))
+
+    def _fetch(
+        self,
+        url: str,
+        settings: Settings,
+        verify_tls: bool,
+        entry: Optional[Dict[str, Any]],
+    ) -> Any:
+        headers = get_loader_headers(url, settings)
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            return requests.get(
+                url,
+                headers=headers,
+                verify=verify_tls,
+                timeout=EXPERIMENT_FETCH_TIMEOUT,
+            )
+        except RequestException as x:
+            raise InvalidSource(f"Failed to fetch the experiment: {x}")
+
+    def _entry_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.urls_dir, f"{key}.json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, f"{digest}.json")
+
+    def _read_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        return _read_json(self._entry_path(url))
+
+    def _write_entry(self, url: str, entry: Dict[str, Any]) -> None:
+        _write_json(self._entry_path(url), entry)
+
+    def _read_object(self, digest: str) -> Optional[Experiment]:
+        return _read_json(self._object_path(digest))
+
+    def _write_object(self, digest: str, experiment: Experiment) -> None:
+        _write_json(self._object_path(digest), experiment)
+
+    def _object_size(self, digest: str) -> int:
+        try:
+            return os.path.getsize(self._object_path(digest))
+        except OSError:
+            return 0
+
+
+def validate_experiment(experiment: Experiment, cache_dir: str = None) -> None:
+    """
+    Validate the `experiment` like `ensure_experiment_is_valid` does, but
+    remember under `cache_dir` the experiments that were found valid so they
+    are not validated again.
+
+    Entries are keyed on the hash of the experiment's canonical JSON form
+    and of what its validation depends on beyond its content: the chaoslib
+    and chaostoolkit versions, the files of the Python modules behind its
+    providers and controls, the executables of its process providers and
+    whether the environment variables it reads are set. Any change to them
+    leads to a new validation.
+
+    Leave `cache_dir` unset to always validate the experiment.
+    """
+    if not cache_dir:
+        ensure_experiment_is_valid(experiment)
+        return
+
+    key = get_validation_key(experiment)
+    path = os.path.join(cache_dir, "validations", f"{key}.json")
+    if _read_json(path) is not None:
+        logger.debug(f"Experiment already validated as {key}")
+        return
+
+    ensure_experiment_is_valid(experiment)
+    _write_json(path, {"validated_at": time.time()})
+    _evict_oldest(os.path.dirname(path), VALIDATION_CACHE_MAX_ENTRIES)
+
+
+def get_validation_key(experiment: Experiment) -> str:
+    """
+    Hash of the `experiment` and of the environment its validation depends
+    on. See `validate_experiment`.
+    """
+    modules = set()
+    executables = set()
+    env_vars = set()
+    for node in _iter_dicts(experiment):
+        node_type = node.get("type")
+        if node_type == "python" and isinstance(node.get("module"), str):
+            modules.add(node["module"])
+        elif node_type == "process" and isinstance(node.get("path"), str):
+            executables.add(node["path"])
+        elif node_type == "env" and isinstance(node.get("key"), str):
+            env_vars.add(node["key"])
+
+    fingerprint = {
+        "chaoslib": chaoslib_version,
+        "chaostoolkit": __version__,
+        "modules": {m: _module_fingerprint(m) for m in sorted(modules)},
+        "executables": {e: shutil.which(e) for e in sorted(executables)},
+        "env": {e: e in os.environ for e in sorted(env_vars)},
+        "experiment": experiment,
+    }
+    doc = json.dumps(
+        fingerprint, sort_keys=True, separators=(",", ":"), default=encoder
+    )
+    return hashlib.sha256(doc.encode("utf-8")).hexdigest()
+
+
+def get_loader_headers(url: str, settings: Settings = None) -> Dict[str, str]:
+    """
+    Headers to fetch an experiment with, authentication included, as
+    `chaoslib.loader.load_experiment` sets them.
+    """
+    headers = {"Accept": "application/json, application/x-yaml"}
+    ctk_bearer_token = os.getenv("CHAOSTOOLKIT_LOADER_AUTH_BEARER_TOKEN")
+    if ctk_bearer_token:
+        headers["Authorization"] = "bearer {}".format(ctk_bearer_token.strip())
+    elif settings:
+        netloc = urlparse(url).netloc
+        auths = settings.get("auths", [])
+        for domain in auths:
+            if domain == netloc:
+                auth = auths[domain]
+                headers["Authorization"] = "{} {}".format(
+                    auth["type"], auth["value"]
+                )
+                break
+    return headers
+
+
+def parse_experiment(content: str, content_type: str) -> Experiment:
+    """
+    Parse an experiment fetched over HTTP according to its content type, as
+    `chaoslib.loader.parse_experiment_from_http` does.
+    """
+    if "application/json" in content_type:
+        return json.loads(content)
+    elif "application/x-yaml" in content_type or "text/yaml" in content_type:
+        try:
+            return yaml.load(content, Loader=_YAMLLoader)
+        except yaml.YAMLError as ye:
+            raise InvalidSource(f"Failed parsing YAML experiment: {str(ye)}")
+    elif "text/plain" in content_type:
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            try:
+                return yaml.load(content, Loader=_YAMLLoader)
+            except yaml.YAMLError:
+                pass
+
+    raise InvalidExperiment(
+        "only files with json, yaml or yml extensions are supported"
+    )
+
+
+###############################################################################
+# Internals
+###############################################################################
+_YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _read_json(path: str) -> Any:
+    try:
+        with open(path) as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        # keep track of the last access for the LRU eviction
+        os.utime(path)
+    except OSError:
+        pass
+    return doc
+
+
+def _write_json(path: str, doc: Any) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(doc, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.debug(f"Failed to write cache file '{path}'", exc_info=True)
+
+
+def _iter_dicts(doc: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(doc, dict):
+        yield doc
+        for value in doc.values():
+            yield from _iter_dicts(value)
+    elif isinstance(doc, list):
+        for value in doc:
+            yield from _iter_dicts(value)
+
+
+def _module_fingerprint(module: str) -> Optional[List[Any]]:
+    # locate the file of the module without importing it, its stat changes
+    # when the extension providing it is upgraded or edited in place
+    parts = module.split(".")
+    try:
+        spec = importlib.util.find_spec(parts[0])
+    except (ImportError, ValueError):
+        return None
+    if spec is None:
+        return None
+
+    candidates = []
+    if len(parts) > 1 and spec.submodule_search_locations:
+        for location in spec.submodule_search_locations:
+            base = os.path.join(location, *parts[1:])
+            candidates.extend([f"{base}.py", os.path.join(base, "__init__.py")])
+    if spec.origin:
+        candidates.append(spec.origin)
+
+    for candidate in candidates:
+        try:
+            st = os.stat(candidate)
+        except OSError:
+            continue
+        return [candidate, st.st_mtime_ns, st.st_size]
+    return None
+
+
+def _evict_oldest(directory: str, max_entries: int) -> None:
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    if len(names) <= max_entries:
+        return
+
+    paths = [os.path.join(directory, name) for name in names]
+    paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+    for path in paths[: len(paths) - max_entries]:
+        _remove(path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
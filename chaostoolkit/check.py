@@ -1,49 +1,106 @@
+import json
 import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
 
-import requests
 from chaoslib.types import Strategy
 
 from chaostoolkit import __version__
 
-__all__ = ["check_newer_version", "check_hypothesis_strategy_spelling"]
+__all__ = [
+    "check_newer_version",
+    "check_hypothesis_strategy_spelling",
+    "get_version_check_cache_path",
+    "start_version_check",
+]
 
 LATEST_RELEASE_URL = "https://releases.chaostoolkit.org/latest"
 CHANGELOG_URL = "https://github.com/chaostoolkit/chaostoolkit/blob/master/CHANGELOG.md"  # nopep8
+VERSION_CHECK_CACHE_FILENAME = "version-check.json"
+VERSION_CHECK_CACHE_TTL = 24 * 3600
+# checks which did not complete are only retried after this many seconds
+VERSION_CHECK_FAILURE_TTL = 3600
+VERSION_CHECK_TIMEOUT = (1, 2)
+VERSION_CHECK_DEADLINE = 0.5
 logger = logging.getLogger("chaostoolkit")
 
 
-def check_newer_version(command: str):
+def check_newer_version(command: str, cache_path: str = None):
     """
     Query for the latest release of the chaostoolkit to compare it
     with the current's version. If the former is higher then issue a warning
     inviting the user to upgrade its environment.
+
+    When `cache_path` is set, the answer is cached in that file and reused,
+    without any network call, for `VERSION_CHECK_CACHE_TTL` seconds. Checks
+    which fail, or never complete, are retried after
+    `VERSION_CHECK_FAILURE_TTL` seconds.
     """
+    cache = _read_cache(cache_path)
+    if _is_fresh(cache):
+        return _warn_if_outdated(cache.get("payload"))
+
+    if cache_path:
+        # record the attempt first so that a check which never completes,
+        # such as in an air-gapped environment, is not retried on every call
+        _write_cache(cache_path, (cache or {}).get("payload"), failed=True)
+
+    # importing requests is expensive, only pay for it when checking
+    import requests
+
     try:
         command = command.strip()
         r = requests.get(
             LATEST_RELEASE_URL,
-            timeout=(2, 30),
+            timeout=VERSION_CHECK_TIMEOUT,
             params={"current": __version__, "command": command},
         )
         if r.status_code == 200:
             payload = r.json()
-            latest_version = payload["version"]
-            if payload.get("up_to_date") is False:
-                options = "--pre -U" if "rc" in latest_version else "-U"
-                logger.warning(
-                    "\nThere is a new version ({v}) of the chaostoolkit "
-                    "available.\n"
-                    "You may upgrade by typing:\n\n"
-                    "$ pip install {opt} chaostoolkit\n\n"
-                    "Please review changes at {u}\n".format(
-                        u=CHANGELOG_URL, v=latest_version, opt=options
-                    )
-                )
-                return latest_version
+            if cache_path:
+                _write_cache(cache_path, payload)
+            return _warn_if_outdated(payload)
     except Exception:
         pass
 
 
+def start_version_check(
+    command: str, cache_path: str
+) -> Optional[threading.Thread]:
+    """
+    Check for a newer version without blocking the caller.
+
+    When the cached answer is still fresh, it is used straight away and
+    `None` is returned. Otherwise, the check runs in a daemon thread which
+    is returned so the caller may wait on it for a bounded amount of time
+    (see `VERSION_CHECK_DEADLINE`) before exiting.
+    """
+    if _is_fresh(_read_cache(cache_path)):
+        check_newer_version(command, cache_path)
+        return
+
+    t = threading.Thread(
+        target=check_newer_version,
+        args=(command, cache_path),
+        name="chaostoolkit-version-check",
+        daemon=True,
+    )
+    t.start()
+    return t
+
+
+def get_version_check_cache_path(settings_path: str) -> str:
+    """
+    Path of the version check cache, next to the settings file.
+    """
+    return os.path.join(
+        os.path.dirname(os.path.abspath(settings_path)),
+        VERSION_CHECK_CACHE_FILENAME,
+    )
+
+
 def check_hypothesis_strategy_spelling(hypothesis_strategy: str) -> Strategy:
     """
     Checking for incorrectly spelt commands supported by
@@ -57,3 +114,65 @@ def check_hypothesis_strategy_spelling(hypothesis_strategy: str) -> Strategy:
         )
         hypothesis_strategy = "continuously"
     return Strategy.from_string(hypothesis_strategy)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _warn_if_outdated(payload: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not payload or payload.get("up_to_date") is not False:
+        return
+
+    latest_version = payload["version"]
+    options = "--pre -U" if "rc" in latest_version else "-U"
+    logger.warning(
+        "\nThere is a new version ({v}) of the chaostoolkit "
+        "available.\n"
+        "You may upgrade by typing:\n\n"
+        "$ pip install {opt} chaostoolkit\n\n"
+        "Please review changes at {u}\n".format(
+            u=CHANGELOG_URL, v=latest_version, opt=options
+        )
+    )
+    return latest_version
+
+
+def _read_cache(cache_path: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not cache_path or not os.path.isfile(cache_path):
+        return
+
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.debug("Failed to read the version check cache", exc_info=True)
+
+
+def _is_fresh(cache: Optional[Dict[str, Any]]) -> bool:
+    if not cache or cache.get("current") != __version__:
+        return False
+    age = time.time() - cache.get("checked_at", 0)
+    if cache.get("failed"):
+        return 0 <= age < VERSION_CHECK_FAILURE_TTL
+    return 0 <= age < VERSION_CHECK_CACHE_TTL
+
+
+def _write_cache(
+    cache_path: str, payload: Optional[Dict[str, Any]], failed: bool = False
+):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "current": __version__,
+                    "checked_at": time.time(),
+                    "payload": payload,
+                    "failed": failed,
+                },
+                f,
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        logger.debug("Failed to write the version check cache", exc_info=True)
@@ -1,36 +1,139 @@
+import importlib
 import logging
 import os
 import uuid
+from typing import Dict, List, Optional, Tuple
 
 import click
+from click.utils import make_default_short_help
 from chaoslib.log import configure_logger
 
 from chaostoolkit import __version__
 from chaostoolkit.check import (
-    check_newer_version,
+    VERSION_CHECK_DEADLINE,
+    get_version_check_cache_path,
+    start_version_check,
 )
+from chaostoolkit.plugins import get_cli_plugins_index_path, load_cli_plugins
+from chaostoolkit.timing import PhaseTimer
 from chaoslib.settings import CHAOSTOOLKIT_CONFIG_PATH
 from click_plugins import with_plugins
 
-try:
-    import importlib.metadata as importlib_metadata
-except ImportError:
-    import importlib_metadata
-
-
-from chaostoolkit.commands.discover import discover as discover_cli
-from chaostoolkit.commands.info import info as info_cli
-from chaostoolkit.commands.init import init as init_cli
-from chaostoolkit.commands.run import run as run_cli
-from chaostoolkit.commands.settings import settings as settings_cli
-from chaostoolkit.commands.validate import validate as validate_cli
-
-__all__ = ["cli"]
+__all__ = ["cli", "LazyGroup"]
 
 logger = logging.getLogger("chaostoolkit")
 
-
-@click.group()
+# subcommand name: (module and attribute of the command, short help)
+# the short help is declared here so `chaos --help` imports none of them
+LAZY_COMMANDS = {
+    "discover": (
+        "chaostoolkit.commands.discover:discover",
+        "Discover capabilities and experiments.",
+    ),
+    "doctor": (
+        "chaostoolkit.commands.doctor:doctor",
+        "Diagnose the Chaos Toolkit environment.",
+    ),
+    "info": (
+        "chaostoolkit.commands.info:info",
+        "Display information about the Chaos Toolkit environment.",
+    ),
+    "init": (
+        "chaostoolkit.commands.init:init",
+        "Initialize a new experiment from discovered capabilities.",
+    ),
+    "journal": (
+        "chaostoolkit.commands.journal:journal",
+        "Inspect and summarize experiment journals.",
+    ),
+    "run": (
+        "chaostoolkit.commands.run:run",
+        "Run the experiment loaded from SOURCE, either a local file or a "
+        "HTTP resource.",
+    ),
+    "schedule": (
+        "chaostoolkit.commands.schedule:schedule",
+        "Run the experiments of the schedule at PATH when they are due.",
+    ),
+    "serve": (
+        "chaostoolkit.commands.serve:serve",
+        "Run experiments sent by `chaos run --server` in warm workers.",
+    ),
+    "settings": (
+        "chaostoolkit.commands.settings:settings",
+        "Read, write or remove from your settings file.",
+    ),
+    "suite": (
+        "chaostoolkit.commands.suite:suite",
+        "Run the experiments of the suite at PATH in dependency order.",
+    ),
+    "validate": (
+        "chaostoolkit.commands.validate:validate",
+        "Validate the experiment at SOURCE.",
+    ),
+}
+
+
+class LazyGroup(click.Group):
+    """
+    A click group which only imports the module of a subcommand when that
+    subcommand is looked up, typically because it is being invoked.
+
+    Commands added directly, by plugins for instance, take precedence over
+    the lazy ones with the same name.
+    """
+
+    def __init__(
+        self,
+        *args,
+        lazy_commands: Dict[str, Tuple[str, str]] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        commands = set(super().list_commands(ctx))
+        return sorted(commands.union(self.lazy_commands))
+
+    def get_command(
+        self, ctx: click.Context, cmd_name: str
+    ) -> Optional[click.Command]:
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            self.add_command(self._load_command(cmd_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(
+        self, ctx: click.Context, formatter: click.HelpFormatter
+    ) -> None:
+        names = self.list_commands(ctx)
+        if not names:
+            return
+
+        # same layout as click.Group.format_commands
+        limit = formatter.width - 6 - max(len(name) for name in names)
+        rows = []
+        for name in names:
+            cmd = self.commands.get(name)
+            if cmd is not None:
+                if cmd.hidden:
+                    continue
+                rows.append((name, cmd.get_short_help_str(limit)))
+            else:
+                short_help = self.lazy_commands[name][1]
+                rows.append((name, make_default_short_help(short_help, limit)))
+
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+    def _load_command(self, cmd_name: str) -> click.Command:
+        import_path, _ = self.lazy_commands[cmd_name]
+        module_name, attr = import_path.split(":", 1)
+        return getattr(importlib.import_module(module_name), attr)
+
+
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
 @click.version_option(version=__version__)
 @click.option("--verbose", is_flag=True, help="Display debug level traces.")
 @click.option(
@@ -82,18 +185,22 @@ def cli(
     log_format: str = "string",
     settings: str = CHAOSTOOLKIT_CONFIG_PATH,
 ):
-    if no_log_file:
-        configure_logger(
-            verbose=verbose, log_format=log_format, context_id=str(uuid.uuid4())
-        )
-    else:
-        configure_logger(
-            verbose=verbose,
-            log_file=log_file,
-            log_file_level=log_file_level,
-            log_format=log_format,
-            context_id=str(uuid.uuid4()),
-        )
+    timer = PhaseTimer()
+    with timer.phase("configure_logger"):
+        if no_log_file:
+            configure_logger(
+                verbose=verbose,
+                log_format=log_format,
+                context_id=str(uuid.uuid4()),
+            )
+        else:
+            configure_logger(
+                verbose=verbose,
+                log_file=log_file,
+                log_file_level=log_file_level,
+                log_format=log_format,
+                context_id=str(uuid.uuid4()),
+            )
 
     subcommand = ctx.invoked_subcommand
 
@@ -102,35 +209,26 @@ def cli(
     logger.debug(f"Running command '{subcommand}'")
 
     ctx.obj = {}
+    ctx.obj["timings"] = timer
     ctx.obj["settings_path"] = click.format_filename(settings)
     logger.debug("Using settings file '{}'".format(ctx.obj["settings_path"]))
 
     if not no_version_check:
-        check_newer_version(command=subcommand)
+        version_check = start_version_check(
+            subcommand,
+            get_version_check_cache_path(ctx.obj["settings_path"]),
+        )
+        if version_check:
+            # give a pending check a short chance to complete, and be cached,
+            # but never hold the command back for longer than that
+            ctx.call_on_close(
+                lambda: version_check.join(VERSION_CHECK_DEADLINE)
+            )
 
     if change_dir:
         logger.warning(f"Moving to {change_dir}")
         os.chdir(change_dir)
 
 
-cli.add_command(discover_cli)
-cli.add_command(info_cli)
-cli.add_command(init_cli)
-cli.add_command(run_cli)
-cli.add_command(settings_cli)
-cli.add_command(validate_cli)
-
-
 # keep this after the cli group declaration for plugins to override defaults
-# knowing which version of importlib is actually installed is dark magic because
-# everyone wants a different versions that may not compatible
-# between each other. Easier to just see what works and what doesn't here.
-# https://github.com/python/importlib_metadata/issues/411#issuecomment-1494336052
-try:
-    with_plugins(
-        importlib_metadata.entry_points().get("chaostoolkit.cli_plugins")
-    )(cli)
-except AttributeError:
-    with_plugins(
-        importlib_metadata.entry_points(group="chaostoolkit.cli_plugins")
-    )(cli)
+with_plugins(load_cli_plugins(get_cli_plugins_index_path()))(cli)
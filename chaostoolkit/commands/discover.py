@@ -1,17 +1,14 @@
-import json
 import logging
 
 import click
 from chaoslib.discovery import discover as disco
 from chaoslib.exceptions import DiscoveryFailed
-from chaoslib.notification import (
-    DiscoverFlowEvent,
-    notify,
-)
+from chaoslib.notification import DiscoverFlowEvent
 from chaoslib.types import Discovery
-from chaoslib.settings import load_settings
 
-from chaostoolkit import encoder
+from chaostoolkit.journal import dump_json
+from chaostoolkit.notification import notify
+from chaostoolkit.settings import load_settings
 
 
 logger = logging.getLogger("chaostoolkit")
@@ -30,12 +27,21 @@ logger = logging.getLogger("chaostoolkit")
     help="Path where to save the the discovery outcome.",
     show_default=True,
 )
+@click.option(
+    "--discovery-format",
+    default="json",
+    show_default=True,
+    type=click.Choice(["json", "compact", "gzip", "xz"]),
+    help="Format of the discovery outcome: pretty-printed or compact JSON, "
+    "gzip or xz compressed JSON.",
+)
 @click.argument("package")
 @click.pass_context
 def discover(
     ctx: click.Context,
     package: str,
     discovery_path: str = "./discovery.json",
+    discovery_format: str = "json",
     no_system_info: bool = False,
     no_install: bool = False,
 ) -> Discovery:
@@ -54,8 +60,7 @@ def discover(
         logger.fatal(str(err))
         return
 
-    with open(discovery_path, "w") as d:
-        d.write(json.dumps(discovery, indent=2, default=encoder))
+    dump_json(discovery, discovery_path, discovery_format)
     logger.info(f"Discovery outcome saved in {discovery_path}")
 
     notify(settings, DiscoverFlowEvent.DiscoverCompleted, discovery)
@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import platform
+import tempfile
+from typing import Any, Dict, List
+
+import click
+from chaoslib import __version__ as chaoslib_version
+from chaoslib.control import cleanup_global_controls, load_global_controls
+from chaoslib.info import list_extensions
+
+from chaostoolkit import __version__
+from chaostoolkit.check import check_newer_version
+from chaostoolkit.plugins import get_cli_plugins_index_path, load_cli_plugins
+from chaostoolkit.settings import load_settings
+from chaostoolkit.timing import PhaseTimer, profile_imports
+
+try:
+    import importlib.metadata as importlib_metadata
+except ImportError:
+    import importlib_metadata
+
+__all__ = ["doctor", "collect_timings"]
+logger = logging.getLogger("chaostoolkit")
+
+
+@click.command()
+@click.option(
+    "--timings",
+    is_flag=True,
+    help="Report how long each step of the chaos command startup takes.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    default="text",
+    show_default=True,
+    type=click.Choice(["text", "json"]),
+    help="Format of the report.",
+)
+@click.option(
+    "--top",
+    default=15,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="How many of the slowest modules to import to list.",
+)
+@click.pass_context
+def doctor(
+    ctx: click.Context,
+    timings: bool = False,
+    output_format: str = "text",
+    top: int = 15,
+) -> Dict[str, Any]:
+    """Diagnose the Chaos Toolkit environment.
+
+    Report the versions of the chaostoolkit, chaoslib and Python.
+
+    With `--timings`, also report a breakdown of the time spent starting
+    the chaos command: importing its modules and each installed extension
+    in a fresh interpreter, finding and loading CLI plugins, configuring the
+    logger, loading the settings, checking for a newer version and loading
+    the global controls.
+
+    The JSON format is stable so reports can be compared across hosts or
+    image builds. Timings are in seconds."""
+    report = {
+        "chaostoolkit": __version__,
+        "chaoslib": chaoslib_version,
+        "python": platform.python_version(),
+    }
+
+    no_version_check = False
+    if ctx.parent is not None:
+        no_version_check = ctx.parent.params.get("no_version_check", False)
+
+    if timings:
+        report["timings"] = collect_timings(
+            ctx.obj["settings_path"],
+            startup=ctx.obj.get("timings"),
+            version_check=not no_version_check,
+            top=top,
+        )
+
+    if output_format == "json":
+        click.echo(json.dumps(report, indent=2))
+    elif timings:
+        click.echo(format_timings(report))
+    else:
+        click.echo(_versions(report))
+
+    return report
+
+
+def collect_timings(
+    settings_path: str,
+    startup: PhaseTimer = None,
+    version_check: bool = True,
+    top: int = 15,
+) -> Dict[str, Any]:
+    """
+    Measure the steps of the chaos command startup.
+
+    Imports are profiled in a fresh interpreter so they are not skewed by
+    the modules this process already imported. The other steps run in this
+    process, the `configure_logger` one is taken from the `startup` timer
+    of the `chaos` group when given. The version check runs with an empty
+    cache, as the `chaos` group already refreshed the actual one.
+    """
+    extensions = _extension_modules()
+    modules = ["chaostoolkit.cli"]
+    for names in extensions.values():
+        modules.extend(names)
+
+    entries = profile_imports(modules)
+    top_level = {e["name"]: e for e in entries if e["depth"] == 0}
+    slowest = sorted(entries, key=lambda e: e["self"], reverse=True)[:top]
+    imports = {
+        "chaostoolkit": _cumulative(top_level, ["chaostoolkit.cli"]),
+        "extensions": {
+            name: _cumulative(top_level, names)
+            for name, names in sorted(extensions.items())
+        },
+        "slowest": [{"name": e["name"], "self": e["self"]} for e in slowest],
+    }
+
+    timer = PhaseTimer()
+    if startup is not None:
+        timer.durations.update(startup.durations)
+
+    with timer.phase("plugins_scan"):
+        plugins = load_cli_plugins()
+    with timer.phase("plugins_index"):
+        load_cli_plugins(get_cli_plugins_index_path())
+
+    plugin_timer = PhaseTimer()
+    for entry_point in plugins:
+        with plugin_timer.phase(entry_point.name):
+            try:
+                entry_point.load()
+            except Exception:
+                logger.debug(
+                    f"Failed to load plugin '{entry_point.name}'",
+                    exc_info=True,
+                )
+
+    with timer.phase("load_settings"):
+        settings = load_settings(settings_path) or {}
+
+    if version_check:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = os.path.join(cache_dir, "version-check.json")
+            with timer.phase("version_check"):
+                check_newer_version("doctor", cache_path)
+
+    with timer.phase("global_controls"):
+        load_global_controls(settings)
+    cleanup_global_controls()
+
+    return {
+        "imports": imports,
+        "plugins": plugin_timer.durations,
+        "phases": timer.durations,
+    }
+
+
+def format_timings(report: Dict[str, Any]) -> str:
+    """
+    Human-readable rendering of a `chaos doctor --timings` report.
+    """
+    timings = report["timings"]
+    imports = timings["imports"]
+    fmt = "{:<50}{:>12}"
+    lines = [
+        _versions(report),
+        "",
+        click.style(fmt.format("IMPORTS", "CUMULATIVE"), fg="bright_blue"),
+        fmt.format("chaostoolkit", _ms(imports["chaostoolkit"])),
+    ]
+    for name, duration in imports["extensions"].items():
+        lines.append(fmt.format(name, _ms(duration)))
+
+    lines.append("")
+    lines.append(
+        click.style(fmt.format("SLOWEST MODULES", "SELF"), fg="bright_blue")
+    )
+    for entry in imports["slowest"]:
+        lines.append(fmt.format(entry["name"], _ms(entry["self"])))
+
+    if timings["plugins"]:
+        lines.append("")
+        lines.append(
+            click.style(fmt.format("PLUGINS", "LOAD"), fg="bright_blue")
+        )
+        for name, duration in timings["plugins"].items():
+            lines.append(fmt.format(name, _ms(duration)))
+
+    lines.append("")
+    lines.append(
+        click.style(fmt.format("STARTUP", "DURATION"), fg="bright_blue")
+    )
+    for name, duration in timings["phases"].items():
+        lines.append(fmt.format(name, _ms(duration)))
+
+    return "\n".join(lines)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _extension_modules() -> Dict[str, List[str]]:
+    # map each installed extension to the top-level modules it ships
+    names = {e.name for e in list_extensions()}
+    if not names:
+        return {}
+
+    modules = {name: [] for name in names}
+    packages_distributions = getattr(
+        importlib_metadata, "packages_distributions", None
+    )
+    if packages_distributions is None:
+        return {n: [n.replace("-", "_")] for n in names}
+
+    for module, distributions in packages_distributions().items():
+        if module.startswith("_"):
+            continue
+        for distribution in distributions:
+            if distribution in modules:
+                modules[distribution].append(module)
+
+    return {n: sorted(m) for n, m in modules.items() if m}
+
+
+def _versions(report: Dict[str, Any]) -> str:
+    return (
+        f"chaostoolkit {report['chaostoolkit']} - "
+        f"chaoslib {report['chaoslib']} - python {report['python']}"
+    )
+
+
+def _cumulative(
+    top_level: Dict[str, Dict[str, Any]], modules: List[str]
+) -> float:
+    # a module already imported by a previous one costs nothing here
+    return sum(top_level[m]["cumulative"] for m in modules if m in top_level)
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
@@ -6,14 +6,13 @@ from typing import List
 import click
 import yaml
 from chaoslib.discovery.discover import portable_type_name_to_python_type
-from chaoslib.notification import (
-    InitFlowEvent,
-    notify,
-)
+from chaoslib.notification import InitFlowEvent
 from chaoslib.types import Activity, Experiment
-from chaoslib.settings import load_settings
 
 from chaostoolkit import encoder
+from chaostoolkit.journal import load_json
+from chaostoolkit.notification import notify
+from chaostoolkit.settings import load_settings
 
 
 logger = logging.getLogger("chaostoolkit")
@@ -61,8 +60,7 @@ def init(
 
     discovery = None
     if discovery_path and os.path.exists(discovery_path):
-        with open(discovery_path) as d:
-            discovery = json.loads(d.read())
+        discovery = load_json(discovery_path)
     else:
         click.echo("No discovery was found, let's create an empty experiment")
 
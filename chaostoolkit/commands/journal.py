@@ -0,0 +1,578 @@
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+
+from chaostoolkit.diff import (
+    DURATION_MIN_DELTA,
+    DURATION_THRESHOLD,
+    DURATION_Z_SCORE,
+    diff_journals,
+)
+from chaostoolkit.index import JournalIndex, get_index_path
+from chaostoolkit.journal import find_journals, load_journal
+from chaostoolkit.stats import RESERVOIR_SIZE, collect_stats
+
+__all__ = ["journal", "format_diff", "format_query", "format_stats"]
+logger = logging.getLogger("chaostoolkit")
+
+
+def validate_time(
+    ctx: click.Context, param: click.Parameter, value: Optional[str]
+) -> Optional[float]:
+    """
+    Parse a point in time, either relative to now such as `90m`, `12h`,
+    `7d` or `2w`, or an ISO 8601 date or date and time, in UTC unless told
+    otherwise, into a UNIX timestamp.
+    """
+    if value is None:
+        return None
+
+    m = re.match(r"^(\d+)([smhdw])$", value.strip())
+    if m:
+        return time.time() - int(m.group(1)) * _TIME_UNITS[m.group(2)]
+
+    try:
+        dt = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise click.BadParameter(
+            f"'{value}' is neither a duration, such as 7d, nor an ISO date"
+        )
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+@click.group()
+def journal():
+    """
+    Inspect and summarize experiment journals.
+    """
+    pass
+
+
+@journal.command()
+@click.option(
+    "--workers",
+    default=os.cpu_count() or 1,
+    show_default="number of CPUs",
+    type=click.IntRange(min=1),
+    help="How many processes read journals in parallel.",
+)
+@click.option(
+    "--top",
+    default=10,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="How many of the slowest and most failing activities to list.",
+)
+@click.option(
+    "--sample-size",
+    default=RESERVOIR_SIZE,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="How many durations are sampled per experiment and per activity "
+    "to estimate their percentiles.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    default="text",
+    show_default=True,
+    type=click.Choice(["text", "json"]),
+    help="Format of the report.",
+)
+@click.argument("path", nargs=-1, required=True)
+@click.pass_context
+def stats(
+    ctx: click.Context,
+    path: Tuple[str, ...],
+    workers: int = 1,
+    top: int = 10,
+    sample_size: int = RESERVOIR_SIZE,
+    output_format: str = "text",
+) -> Dict[str, Any]:
+    """Summarize the journals found at PATH.
+
+    PATH may be a journal, a directory, searched recursively, or a glob
+    pattern, and may be given more than once. Journals may be in any of the
+    formats `chaos run` saves them in.
+
+    The report gives the rates of runs which succeeded, deviated or failed,
+    the duration percentiles of each experiment and activity, and the
+    slowest and most failing activities. Percentiles are estimated from a
+    sample of `--sample-size` durations, they are exact below that."""
+    paths = find_journals(path)
+    if not paths:
+        logger.error("No journal found")
+        ctx.exit(1)
+
+    logger.debug(f"Summarizing {len(paths)} journals with {workers} workers")
+    report = collect_stats(paths, workers, sample_size).to_dict(top)
+
+    if output_format == "json":
+        click.echo(json.dumps(report, indent=2))
+    else:
+        click.echo(format_stats(report))
+
+    return report
+
+
+@journal.command()
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(dir_okay=False),
+    help="Path of the index database, journals.db next to the settings "
+    "file by default.",
+)
+@click.argument("path", nargs=-1, required=True)
+@click.pass_context
+def index(
+    ctx: click.Context, path: Tuple[str, ...], db_path: Optional[str] = None
+) -> Dict[str, int]:
+    """Add the journals found at PATH to the index.
+
+    PATH may be a journal, a directory, searched recursively, or a glob
+    pattern, and may be given more than once. Journals already indexed are
+    skipped, without being read again when their file did not change, so
+    the index can be kept up to date by running this command regularly
+    over the same directories. Journals whose file was deleted are removed
+    from the index.
+
+    Use `chaos journal query` to search the index."""
+    db_path = db_path or get_index_path(ctx.obj["settings_path"])
+    paths = find_journals(path)
+    counts = {"indexed": 0, "unchanged": 0, "skipped": 0}
+    with JournalIndex(db_path) as journal_index:
+        counts["removed"] = journal_index.remove_missing()
+        for journal_path in paths:
+            try:
+                outcome = journal_index.add_file(journal_path)
+            except OSError as x:
+                logger.debug(f"Failed to index '{journal_path}': {x}")
+                outcome = "skipped"
+            counts[outcome] += 1
+
+    logger.info(
+        f"Indexed {counts['indexed']} journals in {db_path}, "
+        f"{counts['unchanged']} already indexed and {counts['skipped']} "
+        f"skipped, {counts['removed']} removed as their file is gone"
+    )
+    return counts
+
+
+@journal.command()
+@click.option(
+    "--db",
+    "db_path",
+    type=click.Path(dir_okay=False),
+    help="Path of the index database, journals.db next to the settings "
+    "file by default.",
+)
+@click.option(
+    "--experiment",
+    help="Title of the experiment, which may contain * wildcards.",
+)
+@click.option("--status", help="Status of the runs, or of the activity.")
+@click.option(
+    "--deviated/--not-deviated",
+    default=None,
+    help="Only runs which deviated, or did not.",
+)
+@click.option(
+    "--since",
+    callback=validate_time,
+    help="Only runs started since then, either a duration such as 12h or "
+    "7d, or an ISO date.",
+)
+@click.option(
+    "--until",
+    callback=validate_time,
+    help="Only runs started before then, either a duration such as 12h or "
+    "7d, or an ISO date.",
+)
+@click.option(
+    "--activity",
+    help="List the runs of this activity rather than experiment runs.",
+)
+@click.option(
+    "--summary",
+    is_flag=True,
+    help="Aggregate the matching runs per experiment.",
+)
+@click.option(
+    "--limit",
+    default=20,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="How many rows to list at most, 0 for all of them.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    default="text",
+    show_default=True,
+    type=click.Choice(["text", "json"]),
+    help="Format of the result.",
+)
+@click.pass_context
+def query(
+    ctx: click.Context,
+    db_path: Optional[str] = None,
+    experiment: Optional[str] = None,
+    status: Optional[str] = None,
+    deviated: Optional[bool] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    activity: Optional[str] = None,
+    summary: bool = False,
+    limit: int = 20,
+    output_format: str = "text",
+) -> List[Dict[str, Any]]:
+    """Search the runs indexed by `chaos journal index`.
+
+    Runs are listed most recent first. For instance, the runs of an
+    experiment which deviated last week:
+
+    \b
+        chaos journal query --experiment "My experiment" --deviated --since 7d
+    """
+    db_path = db_path or get_index_path(ctx.obj["settings_path"])
+    if not os.path.isfile(db_path):
+        logger.error(
+            f"No index found at {db_path}, run `chaos journal index` first"
+        )
+        ctx.exit(1)
+
+    with JournalIndex(db_path) as journal_index:
+        if summary:
+            rows = journal_index.summarize(experiment, since, until)
+        elif activity:
+            rows = journal_index.query_activities(
+                activity, experiment, status, deviated, since, until, limit
+            )
+        else:
+            rows = journal_index.query_runs(
+                experiment, status, deviated, since, until, limit=limit
+            )
+
+    if output_format == "json":
+        click.echo(json.dumps(rows, indent=2))
+    else:
+        click.echo(format_query(rows))
+
+    return rows
+
+
+@journal.command()
+@click.option(
+    "--threshold",
+    default=DURATION_THRESHOLD,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Relative duration increase, in percent, to report a regression.",
+)
+@click.option(
+    "--min-delta",
+    default=DURATION_MIN_DELTA,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Duration increase, in seconds, below which it is not a "
+    "regression whatever its relative increase.",
+)
+@click.option(
+    "--z-score",
+    default=DURATION_Z_SCORE,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="With several baselines, how many standard deviations above "
+    "their mean a duration must be to be a regression.",
+)
+@click.option(
+    "--fail-on-regression",
+    is_flag=True,
+    help="Exit with an error when the duration of a steady-state probe "
+    "regressed.",
+)
+@click.option(
+    "--all-activities",
+    is_flag=True,
+    help="With --fail-on-regression, consider the duration of every "
+    "activity, not only of steady-state probes.",
+)
+@click.option(
+    "--all",
+    "show_all",
+    is_flag=True,
+    help="List every activity rather than only those which changed.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    default="text",
+    show_default=True,
+    type=click.Choice(["text", "json"]),
+    help="Format of the report.",
+)
+@click.argument("journals", nargs=-1, required=True, metavar="JOURNAL...")
+@click.pass_context
+def diff(
+    ctx: click.Context,
+    journals: Tuple[str, ...],
+    threshold: float = DURATION_THRESHOLD,
+    min_delta: float = DURATION_MIN_DELTA,
+    z_score: float = DURATION_Z_SCORE,
+    fail_on_regression: bool = False,
+    all_activities: bool = False,
+    show_all: bool = False,
+    output_format: str = "text",
+) -> Dict[str, Any]:
+    """Compare the last JOURNAL with the ones before it.
+
+    The earlier journals are the baselines. They may be directories or glob
+    patterns, so a run can be compared with many previous ones:
+
+    \b
+        chaos journal diff baselines/ journal.json
+
+    Activities are aligned by phase, name and position. The report gives
+    the changes of status and of tolerance outcome, and the duration of
+    each activity against the baselines. A duration regressed when it grew
+    by more than `--threshold` percent and `--min-delta` seconds and, with
+    several baselines, by more than `--z-score` standard deviations.
+
+    With `--fail-on-regression`, the command exits with an error when the
+    duration of a steady-state probe regressed, for CI pipelines."""
+    paths = find_journals(journals[:-1])
+    if not paths:
+        raise click.UsageError("Expected at least one baseline journal")
+
+    try:
+        baselines = [load_journal(p) for p in paths]
+        candidate = load_journal(journals[-1])
+    except (OSError, ValueError) as x:
+        logger.error(f"Failed to load journal: {x}")
+        ctx.exit(1)
+
+    report = diff_journals(baselines, candidate, threshold, min_delta, z_score)
+
+    if output_format == "json":
+        click.echo(json.dumps(report, indent=2))
+    else:
+        click.echo(format_diff(report, show_all))
+
+    regressions = report["regressions"]
+    regressed = regressions["steady_state_duration"]
+    if all_activities:
+        regressed = regressions["duration"]
+    if fail_on_regression and regressed:
+        ctx.exit(1)
+
+    return report
+
+
+def format_diff(report: Dict[str, Any], show_all: bool = False) -> str:
+    """
+    Human-readable rendering of a `chaos journal diff` report. Only the
+    activities which changed are listed, unless `show_all` is set.
+    """
+    run = report["run"]
+    fmt = "{:<24}{:<32}{:>20}{:>12}{:>12}{:>10}"
+    lines = [
+        f"{report['experiment']} - {report['baselines']} baselines",
+        f"status: {_change(run['status'])} - "
+        f"deviated: {_change(run['deviated'])} - "
+        f"duration: {_duration_change(run['duration'])}",
+        "",
+        click.style(
+            fmt.format(
+                "PHASE", "ACTIVITY", "STATUS", "BASELINE", "CANDIDATE", "DELTA"
+            ),
+            fg="bright_blue",
+        ),
+    ]
+    for a in report["activities"]:
+        duration = a["duration"]
+        changed = (
+            "change" in a
+            or a["status"]["changed"]
+            or a["tolerance_met"]["changed"]
+            or duration.get("regression")
+        )
+        if not (changed or show_all):
+            continue
+
+        status = a.get("change") or _change(a["status"])
+        if a["tolerance_met"]["changed"]:
+            status = f"tolerance {_change(a['tolerance_met'])}"
+        name = a["name"]
+        if a["occurrence"]:
+            name = f"{name} #{a['occurrence'] + 1}"
+        line = fmt.format(
+            a["phase"],
+            _truncate(name, 30),
+            status,
+            _seconds(duration["baseline"]),
+            _seconds(duration["candidate"]),
+            _relative(duration.get("relative")),
+        )
+        if duration.get("regression"):
+            line = click.style(line, fg="red")
+        lines.append(line)
+
+    regressions = report["regressions"]
+    lines.append("")
+    lines.append(
+        f"{regressions['duration']} duration regressions, "
+        f"{regressions['steady_state_duration']} in steady-state probes - "
+        f"{regressions['status']} activities no longer succeed - "
+        f"{regressions['tolerance']} tolerances no longer met"
+    )
+    return "\n".join(lines)
+
+
+def format_query(rows: List[Dict[str, Any]]) -> str:
+    """
+    Human-readable rendering of the rows returned by `chaos journal query`.
+    """
+    if not rows:
+        return "No run found"
+
+    columns = [c for c in rows[0] if c not in _HIDDEN_COLUMNS]
+    table = [[c.upper().replace("_", " ") for c in columns]]
+    for row in rows:
+        table.append([_cell(c, row[c]) for c in columns])
+
+    widths = [max(len(r[i]) for r in table) for i in range(len(columns))]
+    lines = [
+        "  ".join(cell.ljust(width) for cell, width in zip(r, widths)).rstrip()
+        for r in table
+    ]
+    lines[0] = click.style(lines[0], fg="bright_blue")
+    return "\n".join(lines)
+
+
+def format_stats(report: Dict[str, Any]) -> str:
+    """
+    Human-readable rendering of a `chaos journal stats` report.
+    """
+    rates = report["rates"]
+    fmt = "{:<40}{:>8}{:>10}{:>12}{:>12}{:>12}"
+    lines = [
+        f"{report['journals']} journals ({report['skipped']} skipped) - "
+        f"{_percent(rates['succeeded'])} succeeded, "
+        f"{_percent(rates['deviated'])} deviated, "
+        f"{_percent(rates['failed'])} failed",
+        "",
+        click.style(
+            fmt.format("EXPERIMENTS", "RUNS", "OK", "P50", "P95", "P99"),
+            fg="bright_blue",
+        ),
+    ]
+    for title, stats in report["experiments"].items():
+        ok = stats["outcomes"].get("completed", 0)
+        lines.append(_row(fmt, title, stats, _percent(ok / stats["runs"])))
+
+    lines.append("")
+    lines.append(
+        click.style(
+            fmt.format(
+                "SLOWEST ACTIVITIES", "RUNS", "FAILED", "P50", "P95", "P99"
+            ),
+            fg="bright_blue",
+        )
+    )
+    for entry in report["slowest"]:
+        stats = report["activities"][entry["name"]]
+        lines.append(_row(fmt, entry["name"], stats, str(stats["failures"])))
+
+    lines.append("")
+    lines.append(
+        click.style(
+            fmt.format("MOST FAILING ACTIVITIES", "RUNS", "FAILED", "", "", ""),
+            fg="bright_blue",
+        )
+    )
+    for entry in report["most_failing"]:
+        lines.append(
+            fmt.format(
+                _truncate(entry["name"]),
+                entry["runs"],
+                entry["failures"],
+                "",
+                "",
+                "",
+            )
+        )
+
+    return "\n".join(lines)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _row(fmt: str, name: str, stats: Dict[str, Any], column: str) -> str:
+    duration = stats["duration"]
+    return fmt.format(
+        _truncate(name),
+        stats["runs"],
+        column,
+        _seconds(duration["p50"]),
+        _seconds(duration["p95"]),
+        _seconds(duration["p99"]),
+    )
+
+
+def _truncate(name: str, width: int = 38) -> str:
+    return name if len(name) <= width else f"{name[: width - 3]}..."
+
+
+def _percent(rate: float) -> str:
+    return f"{rate * 100:.1f}%"
+
+
+def _seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.3f}s"
+
+
+def _change(comparison: Dict[str, Any]) -> str:
+    baseline = comparison["baseline"]
+    candidate = comparison["candidate"]
+    if comparison["changed"]:
+        return f"{baseline} -> {candidate}"
+    return str(candidate if candidate is not None else baseline)
+
+
+def _duration_change(comparison: Dict[str, Any]) -> str:
+    return (
+        f"{_seconds(comparison['baseline'])} -> "
+        f"{_seconds(comparison['candidate'])} "
+        f"({_relative(comparison.get('relative'))})"
+    )
+
+
+def _relative(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:+.1f}%"
+
+
+_TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_HIDDEN_COLUMNS = ("id", "run_id", "end", "node", "path", "position")
+
+
+def _cell(column: str, value: Any) -> str:
+    if value is None:
+        return "-"
+    if column in ("start", "last_run"):
+        dt = datetime.fromtimestamp(value, timezone.utc)
+        return dt.strftime("%Y-%m-%d %H:%M:%S")
+    if column.endswith("duration"):
+        return _seconds(value)
+    if column in ("deviated", "tolerance_met") and value in (0, 1):
+        return "yes" if value else "no"
+    return str(value)
@@ -1,34 +1,53 @@
+import copy
+import glob
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import click
 from chaoslib import __version__ as chaoslib_version
 from chaoslib import convert_vars, merge_vars
 from chaoslib.control import load_global_controls
 from chaoslib.exceptions import ChaosException, InvalidSource
-from chaoslib.experiment import ensure_experiment_is_valid, run_experiment
-from chaoslib.loader import load_experiment
-from chaoslib.notification import (
-    RunFlowEvent,
-    notify,
-)
-from chaoslib.settings import (
-    load_settings,
-)
+from chaoslib.experiment import run_experiment
+from chaoslib.notification import RunFlowEvent
 from chaoslib.types import (
     Dry,
+    Experiment,
     Journal,
     Schedule,
+    Settings,
 )
 
-from chaostoolkit import encoder
+from chaostoolkit.cache import (
+    get_cache_dir,
+    load_cached_experiment,
+    validate_experiment,
+)
 from chaostoolkit.check import (
     check_hypothesis_strategy_spelling,
 )
+from chaostoolkit.encoding import dumps
+from chaostoolkit.journal import (
+    JOURNAL_FORMATS,
+    JournalStreamer,
+    dump_json,
+    save_journal,
+)
+from chaostoolkit.metrics import MetricsCollector, MetricsServer
+from chaostoolkit.notification import flush_notifications, notify
+from chaostoolkit.server import get_socket_path, send_request
+from chaostoolkit.settings import load_settings
+from chaostoolkit.sources import source_name
+from chaostoolkit.timing import PhaseTimer
 
 DEFAULT_ROLLBACK_STRATEGY = "default"
 DEFAULT_HYPOTHESIS_STRATEGY = "default"
+EXPERIMENT_EXTENSIONS = (".json", ".yaml", ".yml")
 logger = logging.getLogger("chaostoolkit")
 
 
@@ -45,11 +64,50 @@ def validate_vars(
         raise click.BadParameter(str(x))
 
 
+def validate_sweep_vars(
+    ctx: click.Context, param: click.Option, value: List[str]
+) -> List[Tuple[str, List[Any]]]:
+    """
+    Process all `--sweep-var key=value1,value2` and return the list of
+    values of each key, converted to the appropriate type.
+    """
+    sweep = []
+    for v in value:
+        if "=" not in v:
+            raise click.BadParameter(
+                "sweep var needs to be in the format name[:type]=v1,v2"
+            )
+        key, values = v.split("=", 1)
+        try:
+            converted = [
+                convert_vars([f"{key}={item}"]) for item in values.split(",")
+            ]
+        except ValueError as x:
+            raise click.BadParameter(str(x))
+        name = next(iter(converted[0]))
+        sweep.append((name, [c[name] for c in converted]))
+    return sweep
+
+
 @click.command()
 @click.option(
     "--journal-path",
     default="./journal.json",
-    help="Path where to save the journal from the execution.",
+    help="Path where to save the journal from the execution. Use '-' to "
+    "write it to the standard output.",
+)
+@click.option(
+    "--journal-format",
+    type=click.Choice(JOURNAL_FORMATS),
+    help="Format of the journal: pretty-printed or compact JSON, gzip or xz "
+    "compressed JSON, or newline-delimited JSON records. Guessed from the "
+    "extension of the journal path by default.",
+)
+@click.option(
+    "--journal-stream",
+    help="Path where to stream the execution as newline-delimited JSON "
+    "records while it runs, one per phase and activity. Use '-' to write "
+    "them to the standard output.",
 )
 @click.option(
     "--dry",
@@ -65,6 +123,18 @@ def validate_vars(
 @click.option(
     "--no-verify-tls", is_flag=True, help="Do not verify TLS certificate."
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Do not use the local caches of experiments loaded over HTTP and "
+    "of validated experiments.",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Fetch experiments loaded over HTTP again and update the local "
+    "cache with them.",
+)
 @click.option(
     "--rollback-strategy",
     show_default=False,
@@ -133,16 +203,68 @@ def validate_vars(
     "experiment as soon as it deviates once. Otherwise, keeps "
     "running until the end of the experiment.",
 )
-@click.argument("source")
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="When running more than one experiment, how many of them may run "
+    "in parallel, each in its own process.",
+)
+@click.option(
+    "--sweep-var",
+    multiple=True,
+    callback=validate_sweep_vars,
+    help="Run the experiment once per value of a configuration variable. "
+    "The pattern is key=value1,value2 or key:type=value1,value2. When given "
+    "multiple times, and with --sweep-var-file, every combination runs.",
+)
+@click.option(
+    "--sweep-var-file",
+    multiple=True,
+    type=click.Path(exists=True),
+    help="Run the experiment once per var file, on top of those from "
+    "--var-file. Can be provided multiple times.",
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="Path of an OpenMetrics file to update with the metrics of the "
+    "run, such as for the textfile collector of the Prometheus node "
+    "exporter. Counters keep counting across runs.",
+)
+@click.option(
+    "--metrics-port",
+    type=click.IntRange(min=0, max=65535),
+    help="Serve the metrics of the run on http://127.0.0.1:PORT/metrics "
+    "while it is running.",
+)
+@click.option(
+    "--server",
+    is_flag=True,
+    help="Send the run to a `chaos serve` server rather than running it in "
+    "this process.",
+)
+@click.option(
+    "--server-socket",
+    type=click.Path(dir_okay=False),
+    help="Unix socket of the server, chaostoolkit.sock next to the settings "
+    "file by default.",
+)
+@click.argument("source", nargs=-1, required=True, metavar="SOURCE")
 @click.pass_context
 def run(
     ctx: click.Context,
-    source: str,
+    source: Tuple[str, ...],
     journal_path: str = "./journal.json",
+    journal_format: Optional[str] = None,
+    journal_stream: Optional[str] = None,
     dry: Optional[str] = None,
     no_validation: bool = False,
     no_exit: bool = False,
     no_verify_tls: bool = False,
+    no_cache: bool = False,
+    refresh: bool = False,
     rollback_strategy: str = None,
     var: Dict[str, Any] = None,
     var_file: List[str] = None,
@@ -150,44 +272,357 @@ def run(
     hypothesis_strategy: Optional[str] = None,
     hypothesis_frequency: float = 1.0,
     fail_fast: bool = False,
+    workers: int = 1,
+    sweep_var: List[Tuple[str, List[Any]]] = None,
+    sweep_var_file: List[str] = None,
+    metrics_file: Optional[str] = None,
+    metrics_port: Optional[int] = None,
+    server: bool = False,
+    server_socket: Optional[str] = None,
 ) -> Journal:
     """Run the experiment loaded from SOURCE, either a local file or a
-    HTTP resource. SOURCE can be formatted as JSON or YAML."""
-    settings = load_settings(ctx.obj["settings_path"]) or {}
-    has_deviated = False
-    has_failed = False
+    HTTP resource. SOURCE can be formatted as JSON or YAML.
+
+    SOURCE may be given more than once, and may also be a directory or a
+    glob pattern. In that case, each experiment gets its own journal, named
+    after the experiment file, and they run in a pool of `--workers`
+    processes. The command fails if any of them failed or deviated.
+
+    With `--sweep-var` or `--sweep-var-file`, the experiment is loaded and
+    validated once, then runs once per combination of variables, in a pool
+    of `--workers` processes. Each combination gets its own journal and an
+    index of all of them is written alongside.
+
+    Experiments loaded over HTTP are kept in a local cache and only
+    revalidated with the server once they are a few minutes old, and
+    experiments already found valid are not validated again. Use
+    `--refresh` to fetch experiments again, or `--no-cache` to bypass both
+    caches.
+
+    With `--metrics-file` or `--metrics-port`, the run duration and status,
+    the duration of each activity and the journal size are exported as
+    OpenMetrics. This only applies to a single experiment.
+
+    With `--server`, the experiment runs in a warm worker of `chaos serve`
+    rather than in this process, with the settings and controls of the
+    server. The journal is saved and the command exits as if it ran here."""
+    if isinstance(source, str):
+        source = (source,)
+
+    if journal_stream == "-" and journal_path == "-":
+        raise click.UsageError(
+            "--journal-stream and --journal-path cannot both write to the "
+            "standard output"
+        )
+
+    if server:
+        if (
+            len(source) != 1
+            or sweep_var
+            or sweep_var_file
+            or metrics_file
+            or metrics_port is not None
+            or control_file
+        ):
+            raise click.UsageError(
+                "--server runs a single experiment, without sweeps, metrics "
+                "or control files"
+            )
+        if journal_stream == "-":
+            raise click.UsageError(
+                "--server cannot stream the execution to the standard output"
+            )
+
+        # the server sends the journal back rather than writing it to its
+        # own standard output
+        to_stdout = journal_path == "-"
+        result = run_on_server(
+            server_socket or get_socket_path(ctx.obj["settings_path"]),
+            "run",
+            source[0],
+            journal_path=os.devnull if to_stdout else journal_path,
+            include_journal=to_stdout,
+            journal_format=journal_format,
+            journal_stream=journal_stream,
+            var=var,
+            var_file=var_file,
+            no_verify_tls=no_verify_tls,
+            no_cache=no_cache,
+            refresh=refresh,
+            dry=dry,
+            no_validation=no_validation,
+            rollback_strategy=rollback_strategy,
+            hypothesis_strategy=hypothesis_strategy,
+            hypothesis_frequency=hypothesis_frequency,
+            fail_fast=fail_fast,
+        )
+        if result is None:
+            ctx.exit(1)
+        if to_stdout and result.get("journal"):
+            save_journal(result["journal"], "-", journal_format)
+        if result["exit_code"] and not no_exit:
+            ctx.exit(1)
+        return result.get("journal")
+
+    timer = PhaseTimer()
+    with timer.phase("load_settings"):
+        settings = load_settings(ctx.obj["settings_path"]) or {}
+    cache_dir = None
+    if not no_cache:
+        cache_dir = get_cache_dir(ctx.obj["settings_path"])
+    options = dict(
+        journal_format=journal_format,
+        dry=dry,
+        no_validation=no_validation,
+        rollback_strategy=rollback_strategy,
+        hypothesis_strategy=hypothesis_strategy,
+        hypothesis_frequency=hypothesis_frequency,
+        fail_fast=fail_fast,
+    )
+
+    sources = expand_sources(source)
+    if not sources:
+        raise click.UsageError(f"No experiment found in {', '.join(source)}")
+
+    if (metrics_file or metrics_port is not None) and (
+        sweep_var
+        or sweep_var_file
+        or list(source) != sources
+        or len(sources) > 1
+    ):
+        raise click.UsageError(
+            "--metrics-file and --metrics-port only apply to a single "
+            "experiment"
+        )
+
+    if sweep_var or sweep_var_file:
+        if len(sources) != 1:
+            raise click.UsageError(
+                f"A sweep runs a single experiment, got {len(sources)}"
+            )
+
+        load_controls(settings, control_file)
+        experiment = load_and_validate(
+            sources[0],
+            settings,
+            no_validation,
+            no_verify_tls,
+            cache_dir=cache_dir,
+            refresh=refresh,
+        )
+        if experiment is None:
+            ctx.exit(1)
+
+        options["no_validation"] = True
+        results = run_sweep(
+            sources[0],
+            experiment,
+            expand_sweep(sweep_var, sweep_var_file),
+            settings,
+            control_file,
+            workers,
+            journal_path=journal_path,
+            journal_stream=journal_stream,
+            var=var,
+            var_file=var_file,
+            **options,
+        )
+        if any(r["exit_code"] for r in results) and not no_exit:
+            ctx.exit(1)
+        return results
 
     experiment_vars = merge_vars(var, var_file)
+    if list(source) != sources or len(sources) > 1:
+        results = run_many(
+            sources,
+            settings,
+            control_file,
+            workers,
+            journal_path=journal_path,
+            journal_stream=journal_stream,
+            experiment_vars=experiment_vars,
+            no_verify_tls=no_verify_tls,
+            cache_dir=cache_dir,
+            refresh=refresh,
+            **options,
+        )
+        if any(r["exit_code"] for r in results) and not no_exit:
+            ctx.exit(1)
+        return results
 
+    with timer.phase("load_global_controls"):
+        load_controls(settings, control_file)
+
+    journal = run_from_source(
+        sources[0],
+        settings,
+        timer=timer,
+        metrics_file=metrics_file,
+        metrics_port=metrics_port,
+        journal_path=journal_path,
+        journal_stream=journal_stream,
+        experiment_vars=experiment_vars,
+        no_verify_tls=no_verify_tls,
+        cache_dir=cache_dir,
+        refresh=refresh,
+        **options,
+    )
+    if journal is None:
+        ctx.exit(1)
+
+    if get_exit_code(journal) and not no_exit:
+        ctx.exit(1)
+
+    return journal
+
+
+def expand_sweep(
+    sweep_vars: List[Tuple[str, List[Any]]] = None,
+    sweep_var_files: List[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Expand the matrix of sweep variables and var files into the list of
+    their combinations. Each combination has a `var` mapping and a
+    `var_file` list.
+    """
+    combinations = [{"var": {}, "var_file": []}]
+    for name, values in sweep_vars or []:
+        combinations = [
+            {"var": dict(c["var"], **{name: v}), "var_file": c["var_file"]}
+            for c in combinations
+            for v in values
+        ]
+
+    if sweep_var_files:
+        combinations = [
+            {"var": c["var"], "var_file": c["var_file"] + [f]}
+            for c in combinations
+            for f in sweep_var_files
+        ]
+
+    return combinations
+
+
+def load_and_validate(
+    source: str,
+    settings: Settings,
+    no_validation: bool = False,
+    no_verify_tls: bool = False,
+    cache_dir: str = None,
+    refresh: bool = False,
+) -> Optional[Experiment]:
+    """
+    Load the experiment from `source` and validate it unless told not to.
+    Returns `None` when the experiment could not be loaded or was invalid.
+
+    See `load_cached_experiment` for `cache_dir` and `refresh`.
+    """
     try:
-        load_global_controls(settings, control_file)
-    except TypeError:
-        logger.debug("Failed to load controls", exc_info=True)
-        logger.warning(
-            "Passing control files only work with chaostoolkit-lib 1.33+, you "
-            f"run {chaoslib_version}. The control files will be ignored."
-            "Please upgrade with `pip install -U chaostoolkit-lib`"
+        experiment = load_cached_experiment(
+            source,
+            settings,
+            verify_tls=not no_verify_tls,
+            cache_dir=cache_dir,
+            refresh=refresh,
         )
-        load_global_controls(settings)
+    except InvalidSource as x:
+        logger.error(str(x))
+        logger.debug(x)
+        return
 
+    if not no_validation:
+        try:
+            validate_experiment(experiment, cache_dir)
+        except ChaosException as x:
+            logger.error(str(x))
+            logger.debug(x)
+            return
+
+    return experiment
+
+
+def run_from_source(
+    source: str,
+    settings: Settings,
+    no_verify_tls: bool = False,
+    cache_dir: str = None,
+    refresh: bool = False,
+    timer: PhaseTimer = None,
+    **options: Any,
+) -> Optional[Journal]:
+    """
+    Load the experiment from `source` and run it.
+
+    See `load_cached_experiment` for `cache_dir` and `refresh`, and
+    `run_loaded_experiment` for `timer` and the supported `options`.
+    Returns `None` when the experiment could not be loaded or was invalid.
+    """
+    timer = timer or PhaseTimer()
     try:
-        experiment = load_experiment(
-            source, settings, verify_tls=not no_verify_tls
-        )
+        with timer.phase("load_experiment"):
+            experiment = load_cached_experiment(
+                source,
+                settings,
+                verify_tls=not no_verify_tls,
+                cache_dir=cache_dir,
+                refresh=refresh,
+            )
     except InvalidSource as x:
         logger.error(str(x))
         logger.debug(x)
-        ctx.exit(1)
+        return
+
+    return run_loaded_experiment(
+        experiment, settings, cache_dir=cache_dir, timer=timer, **options
+    )
 
-    notify(settings, RunFlowEvent.RunStarted, experiment)
+
+def run_loaded_experiment(
+    experiment: Experiment,
+    settings: Settings,
+    experiment_vars: Dict[str, Any] = None,
+    journal_path: str = "./journal.json",
+    journal_format: Optional[str] = None,
+    journal_stream: Optional[str] = None,
+    dry: Optional[str] = None,
+    no_validation: bool = False,
+    rollback_strategy: str = None,
+    hypothesis_strategy: Optional[str] = None,
+    hypothesis_frequency: float = 1.0,
+    fail_fast: bool = False,
+    cache_dir: str = None,
+    timer: PhaseTimer = None,
+    metrics_file: Optional[str] = None,
+    metrics_port: Optional[int] = None,
+) -> Optional[Journal]:
+    """
+    Run an already loaded experiment, save its journal and send the run
+    notifications. Returns `None` when the experiment was invalid.
+
+    Experiments found valid are remembered under `cache_dir`, when set, and
+    not validated again. See `validate_experiment`.
+
+    The duration of each phase handled here, and of those already recorded
+    by `timer`, is saved in the `"chaostoolkit"` section of the journal, in
+    seconds. Saving the journal and the notifications sent after that are
+    only logged at debug level.
+
+    Metrics of the run are added to the OpenMetrics file at `metrics_file`
+    once it is over, and served on `metrics_port` while it runs. See
+    `chaostoolkit.metrics.MetricsCollector`.
+    """
+    timer = timer or PhaseTimer()
+    with timer.phase(f"notify:{RunFlowEvent.RunStarted.value}"):
+        notify(settings, RunFlowEvent.RunStarted, experiment)
 
     if not no_validation:
         try:
-            ensure_experiment_is_valid(experiment)
+            with timer.phase("ensure_experiment_is_valid"):
+                validate_experiment(experiment, cache_dir)
         except ChaosException as x:
             logger.error(str(x))
             logger.debug(x)
-            ctx.exit(1)
+            return
 
     experiment["dry"] = Dry.from_string(dry)
 
@@ -233,29 +668,541 @@ def run(
         fail_fast=fail_fast,
     )
 
-    journal = run_experiment(
-        experiment,
-        settings=settings,
-        strategy=ssh_strategy,
-        schedule=schedule,
-        experiment_vars=experiment_vars,
-    )
+    event_handlers = []
+    streamer = None
+    if journal_stream:
+        logger.debug(f"Streaming the execution to '{journal_stream}'")
+        streamer = JournalStreamer(journal_stream).open()
+        event_handlers.append(streamer)
+
+    collector = None
+    metrics_server = None
+    if metrics_file or metrics_port is not None:
+        collector = MetricsCollector()
+        event_handlers.append(collector)
+        if metrics_port is not None:
+            try:
+                metrics_server = MetricsServer(collector, metrics_port).start()
+            except OSError as x:
+                logger.warning(f"Failed to serve metrics: {x}")
+
+    try:
+        with timer.phase("run_experiment"):
+            journal = run_experiment(
+                experiment,
+                settings=settings,
+                strategy=ssh_strategy,
+                schedule=schedule,
+                experiment_vars=experiment_vars,
+                event_handlers=event_handlers,
+            )
+    finally:
+        if streamer:
+            streamer.close()
+        if metrics_server:
+            metrics_server.stop()
+
     has_deviated = journal.get("deviated", False)
     has_failed = journal["status"] != "completed"
     if "dry" in journal["experiment"]:
         journal["experiment"]["dry"] = dry
-    with open(journal_path, "w") as r:
-        json.dump(journal, r, indent=2, ensure_ascii=False, default=encoder)
 
+    # what comes next cannot be part of the journal which is being saved
+    journal.setdefault("chaostoolkit", {})["timings"] = dict(timer.durations)
+    with timer.phase("save_journal"):
+        save_journal(journal, journal_path, journal_format)
+
+    if collector:
+        collector.journal_saved(journal_path)
+        if metrics_file:
+            collector.write_textfile(metrics_file)
+
+    events = []
     if journal["status"] == "completed":
-        notify(settings, RunFlowEvent.RunCompleted, journal)
+        events.append(RunFlowEvent.RunCompleted)
     elif has_failed:
-        notify(settings, RunFlowEvent.RunFailed, journal)
-
+        events.append(RunFlowEvent.RunFailed)
     if has_deviated:
-        notify(settings, RunFlowEvent.RunDeviated, journal)
+        events.append(RunFlowEvent.RunDeviated)
 
-    if (has_failed or has_deviated) and not no_exit:
-        ctx.exit(1)
+    for event in events:
+        with timer.phase(f"notify:{event.value}"):
+            notify(settings, event, journal)
 
+    logger.debug(
+        "Phase timings: "
+        + ", ".join(
+            f"{name} {duration * 1000:.1f}ms"
+            for name, duration in timer.durations.items()
+        )
+    )
     return journal
+
+
+def get_exit_code(journal: Optional[Journal]) -> int:
+    """
+    Exit code of a run: `1` when it was invalid, failed or deviated.
+    """
+    if journal is None:
+        return 1
+
+    has_deviated = journal.get("deviated", False)
+    has_failed = journal["status"] != "completed"
+    return 1 if has_failed or has_deviated else 0
+
+
+def load_controls(settings: Settings, control_files: List[str] = None):
+    """
+    Load the global controls from the settings and the given files.
+    """
+    try:
+        load_global_controls(settings, control_files)
+    except TypeError:
+        logger.debug("Failed to load controls", exc_info=True)
+        logger.warning(
+            "Passing control files only work with chaostoolkit-lib 1.33+, you "
+            f"run {chaoslib_version}. The control files will be ignored."
+            "Please upgrade with `pip install -U chaostoolkit-lib`"
+        )
+        load_global_controls(settings)
+
+
+def expand_sources(sources: Tuple[str, ...]) -> List[str]:
+    """
+    Expand directories and glob patterns into the experiment files they
+    contain. Anything else, URLs included, is kept as-is.
+    """
+    expanded = []
+    for source in sources:
+        if os.path.isdir(source):
+            expanded.extend(
+                sorted(
+                    os.path.join(source, name)
+                    for name in os.listdir(source)
+                    if name.lower().endswith(EXPERIMENT_EXTENSIONS)
+                )
+            )
+        elif "://" not in source and glob.has_magic(source):
+            matches = sorted(glob.glob(source, recursive=True))
+            if not matches:
+                logger.warning(f"No experiment matched '{source}'")
+            expanded.extend(matches)
+        else:
+            expanded.append(source)
+
+    return expanded
+
+
+def make_output_paths(
+    path: Optional[str], names: List[str], ext: str = None
+) -> List[Optional[str]]:
+    """
+    Derive one output path per name from `path`, which is used as a template.
+
+    When `path` is a directory, outputs are created in it. Otherwise, each
+    name is appended to the file name, such as `journal-<name>.json`, unless
+    another `ext` is given. Standard output, `-`, is kept untouched.
+    """
+    if not path or path == "-":
+        return [path] * len(names)
+
+    if os.path.isdir(path):
+        directory, prefix, path_ext = path, "", ".json"
+    else:
+        directory, filename = os.path.split(path)
+        prefix, path_ext = os.path.splitext(filename)
+        if path_ext.lower() in (".gz", ".xz"):
+            prefix, inner_ext = os.path.splitext(prefix)
+            path_ext = f"{inner_ext}{path_ext}"
+        prefix = f"{prefix}-"
+    ext = ext or path_ext
+
+    paths = []
+    seen = set()
+    for name in names:
+        candidate = name
+        index = 1
+        while candidate in seen:
+            index += 1
+            candidate = f"{name}-{index}"
+        seen.add(candidate)
+        paths.append(os.path.join(directory, f"{prefix}{candidate}{ext}"))
+
+    return paths
+
+
+def run_many(
+    sources: List[str],
+    settings: Settings,
+    control_files: List[str] = None,
+    workers: int = 1,
+    journal_path: str = "./journal.json",
+    journal_stream: Optional[str] = None,
+    **options: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Run each experiment from `sources` in a pool of `workers` processes.
+
+    Returns a summary of each run, in the order of `sources`.
+    """
+    names = [source_name(s) for s in sources]
+    journal_paths = make_output_paths(journal_path, names)
+    stream_paths = make_output_paths(journal_stream, names)
+
+    logger.info(f"Running {len(sources)} experiments with {workers} workers")
+    runs = [
+        dict(
+            options,
+            source=source,
+            journal_path=journal_paths[index],
+            journal_stream=stream_paths[index],
+        )
+        for index, source in enumerate(sources)
+    ]
+    results = run_in_pool(runs, settings, control_files, workers)
+    for index, result in enumerate(results):
+        result["source"] = sources[index]
+        result["journal_path"] = journal_paths[index]
+
+    log_summary(results)
+    return results
+
+
+def run_sweep(
+    source: str,
+    experiment: Experiment,
+    combinations: List[Dict[str, Any]],
+    settings: Settings,
+    control_files: List[str] = None,
+    workers: int = 1,
+    journal_path: str = "./journal.json",
+    journal_stream: Optional[str] = None,
+    var: Dict[str, Any] = None,
+    var_file: List[str] = None,
+    **options: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Run the loaded `experiment` once per combination of variables in a pool
+    of `workers` processes, as returned by `expand_sweep`.
+
+    Variables are merged with `merge_vars` by the worker running each
+    combination, which restores its environment after each run so `.env`
+    var files do not leak from one to another.
+    An index of all the journals is saved next to them.
+    """
+    width = len(str(len(combinations)))
+    names = [str(i).zfill(width) for i in range(1, len(combinations) + 1)]
+    journal_paths = make_output_paths(journal_path, names)
+    stream_paths = make_output_paths(journal_stream, names)
+
+    logger.info(
+        f"Running {len(combinations)} combinations of '{source}' with "
+        f"{workers} workers"
+    )
+    runs = [
+        dict(
+            options,
+            experiment=experiment,
+            var=dict(var or {}, **combination["var"]),
+            var_file=list(var_file or []) + combination["var_file"],
+            journal_path=journal_paths[index],
+            journal_stream=stream_paths[index],
+        )
+        for index, combination in enumerate(combinations)
+    ]
+    results = run_in_pool(runs, settings, control_files, workers)
+    for index, result in enumerate(results):
+        result["source"] = source
+        result["combination"] = index + 1
+        result["var"] = combinations[index]["var"]
+        result["var_file"] = combinations[index]["var_file"]
+        result["journal_path"] = journal_paths[index]
+
+    index_path = make_output_paths(journal_path, ["index"], ext=".json")[0]
+    if index_path != "-":
+        dump_json({"source": source, "runs": results}, index_path)
+        logger.info(f"Sweep index saved in {index_path}")
+
+    log_summary(results)
+    return results
+
+
+def create_pool(
+    settings: Settings,
+    control_files: List[str] = None,
+    workers: int = 1,
+    prefork: bool = False,
+    max_runs: int = None,
+    preload: List[str] = None,
+) -> ProcessPoolExecutor:
+    """
+    A pool of `workers` processes to execute runs, with `submit_run`, or
+    validations, with `submit_validation`. Settings and global controls are
+    loaded once per worker process rather than once per run.
+
+    With `prefork`, all the workers are started before returning so the
+    first runs do not wait for them.
+
+    With `max_runs`, a worker is replaced by a new one after that many
+    runs, so whatever a run leaves behind in its process does not outlive
+    it for long. This needs Python 3.11. Such workers are started by a fork
+    server, which imports the `preload` modules once for all of them, and
+    are not preforked.
+    """
+    options = {}
+    if max_runs:
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__] + list(preload or []))
+        options = {"mp_context": context, "max_tasks_per_child": max_runs}
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_initialize_worker,
+        initargs=(settings, control_files),
+        **options,
+    )
+    # starting a worker counts as one of its runs
+    if prefork and not max_runs:
+        pids = [pool.submit(os.getpid) for _ in range(workers)]
+        logger.debug(
+            f"Started workers {', '.join(str(p.result()) for p in pids)}"
+        )
+    return pool
+
+
+def submit_run(pool: ProcessPoolExecutor, **options: Any) -> Future:
+    """
+    Execute a run in a worker of a pool from `create_pool`. The future gives
+    the summary of the run.
+
+    A run is the keyword arguments of `run_from_source`, or of
+    `run_loaded_experiment` when it carries an `experiment`. It may also
+    carry the `cwd` and `env` the run needs, which the worker switches to
+    for the run only, and `include_journal` to add the JSON-encoded journal
+    to the summary. Its `var` and `var_file` are loaded by the worker, on
+    top of the `experiment_vars`, if any.
+    """
+    return pool.submit(_run_in_worker, **options)
+
+
+def submit_validation(
+    pool: ProcessPoolExecutor, source: str, **options: Any
+) -> Future:
+    """
+    Load and validate the experiment at `source` in a worker of a pool from
+    `create_pool`. The future gives a summary of the validation, whose
+    status is either `"valid"` or `"invalid"`.
+
+    The `options` are those of `load_and_validate`, as well as `cwd` and
+    `env`, as in `submit_run`.
+    """
+    return pool.submit(_validate_in_worker, source, **options)
+
+
+def shutdown_pool(pool: ProcessPoolExecutor, futures: Iterable[Future]):
+    """
+    Cancel the `futures` which did not start yet, then wait for the others
+    before shutting the pool down.
+
+    This is `pool.shutdown(cancel_futures=True)`, which only exists from
+    Python 3.9, for the futures the caller kept track of.
+    """
+    for future in list(futures):
+        future.cancel()
+    pool.shutdown(wait=True)
+
+
+def run_on_server(
+    socket_path: str, command: str, source: str, **options: Any
+) -> Optional[Dict[str, Any]]:
+    """
+    Send a `run` or `validate` `command` to the `chaos serve` server on
+    `socket_path` and return the summary of its outcome, or `None` when the
+    server could not be reached or rejected the request.
+
+    Paths are made absolute, and the current directory and environment
+    variables are sent along, so the experiment runs as if it ran here.
+    """
+    if "://" not in source and os.path.exists(source):
+        source = os.path.abspath(source)
+    for key in ("journal_path", "journal_stream"):
+        path = options.get(key)
+        if path and path != "-":
+            options[key] = os.path.abspath(path)
+    if options.get("var_file"):
+        options["var_file"] = [os.path.abspath(p) for p in options["var_file"]]
+
+    request = {
+        "command": command,
+        "source": source,
+        "options": options,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+    }
+    logger.info(f"Sending the {command} of '{source}' to {socket_path}")
+    try:
+        for message in send_request(socket_path, request):
+            if message["type"] == "accepted":
+                logger.debug(f"Accepted by worker {message.get('worker')}")
+            elif message["type"] == "error":
+                logger.error(f"The server failed: {message.get('message')}")
+                return None
+            elif message["type"] == "result":
+                return message
+    except OSError as x:
+        logger.error(f"Failed to reach the server on {socket_path}: {x}")
+        return None
+
+
+def run_in_pool(
+    runs: List[Dict[str, Any]],
+    settings: Settings,
+    control_files: List[str] = None,
+    workers: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    Execute each run in a pool of `workers` processes and return their
+    summary, in the same order.
+
+    See `create_pool` and `submit_run`.
+    """
+    results = [None] * len(runs)
+    with create_pool(settings, control_files, workers) as pool:
+        futures = {submit_run(pool, **r): index for index, r in enumerate(runs)}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as x:
+                logger.debug("Experiment run crashed", exc_info=True)
+                result = {
+                    "status": "crashed",
+                    "deviated": False,
+                    "exit_code": 1,
+                    "error": str(x),
+                }
+            results[futures[future]] = result
+
+    return results
+
+
+def log_summary(results: List[Dict[str, Any]]):
+    """
+    Log the outcome of each run and the aggregated counts.
+    """
+    counts = {}
+    for result in results:
+        status = result["status"]
+        if result["deviated"]:
+            status = f"{status} (deviated)"
+        counts[status] = counts.get(status, 0) + 1
+        name = result.get("name") or result["source"]
+        if "combination" in result:
+            name = f"{name} #{result['combination']}"
+        log = logger.error if result["exit_code"] else logger.info
+        if result.get("journal_path"):
+            log(f"{name}: {status} - {result['journal_path']}")
+        else:
+            log(f"{name}: {status}")
+
+    summary = ", ".join(f"{c} {s}" for s, c in sorted(counts.items()))
+    logger.info(f"Ran {len(results)} experiments: {summary}")
+
+
+###############################################################################
+# Internals
+###############################################################################
+_worker_settings: Settings = None
+
+
+def _initialize_worker(settings: Settings, control_files: List[str]):
+    global _worker_settings
+    _worker_settings = settings
+    load_controls(settings, control_files)
+
+
+def _run_in_worker(
+    cwd: str = None,
+    env: Dict[str, str] = None,
+    include_journal: bool = False,
+    **options: Any,
+) -> Dict[str, Any]:
+    # runs may alter the settings, keep the worker's copy pristine
+    settings = copy.deepcopy(_worker_settings)
+
+    with _client_context(cwd, env):
+        # `.env` var files are loaded into the environment of the client
+        if "var" in options or "var_file" in options:
+            config, secrets = merge_vars(
+                options.pop("var", None), options.pop("var_file", None)
+            )
+            # on top of the variables already loaded for all the runs, if any
+            base = options.get("experiment_vars") or ({}, {})
+            options["experiment_vars"] = (
+                dict(base[0], **config),
+                dict(base[1], **secrets),
+            )
+
+        if "experiment" in options:
+            journal = run_loaded_experiment(
+                options.pop("experiment"), settings, **options
+            )
+        else:
+            journal = run_from_source(
+                options.pop("source"), settings, **options
+            )
+
+        # workers do not run the exit handlers which would flush them
+        flush_notifications()
+
+    result = _summarize(journal)
+    if include_journal and journal is not None:
+        # journals may hold anything, only send back what JSON supports
+        result["journal"] = json.loads(dumps(journal))
+    return result
+
+
+def _validate_in_worker(
+    source: str, cwd: str = None, env: Dict[str, str] = None, **options: Any
+) -> Dict[str, Any]:
+    settings = copy.deepcopy(_worker_settings)
+    with _client_context(cwd, env):
+        experiment = load_and_validate(source, settings, **options)
+
+    valid = experiment is not None
+    return {
+        "status": "valid" if valid else "invalid",
+        "deviated": False,
+        "exit_code": 0 if valid else 1,
+    }
+
+
+@contextmanager
+def _client_context(
+    cwd: str = None, env: Dict[str, str] = None
+) -> Iterator[None]:
+    # a worker runs one experiment at a time, on behalf of a client which
+    # may have another working directory and environment than the server,
+    # and `.env` var files change the environment of the run only
+    previous_cwd = os.getcwd()
+    previous_env = dict(os.environ)
+    try:
+        if cwd:
+            os.chdir(cwd)
+        if env is not None:
+            os.environ.clear()
+            os.environ.update(env)
+        yield
+    finally:
+        os.chdir(previous_cwd)
+        os.environ.clear()
+        os.environ.update(previous_env)
+
+
+def _summarize(journal: Optional[Journal]) -> Dict[str, Any]:
+    if journal is None:
+        return {"status": "invalid", "deviated": False, "exit_code": 1}
+
+    return {
+        "status": journal["status"],
+        "deviated": journal.get("deviated", False),
+        "exit_code": get_exit_code(journal),
+    }
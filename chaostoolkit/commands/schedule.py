@@ -0,0 +1,152 @@
+import logging
+import os
+import signal
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import List, Optional, Set
+
+import click
+import yaml
+
+from chaostoolkit.cache import get_cache_dir
+from chaostoolkit.commands.run import (
+    create_pool,
+    make_output_paths,
+    shutdown_pool,
+    submit_run,
+)
+from chaostoolkit.scheduler import ScheduledExperiment, Scheduler, load_schedule
+from chaostoolkit.settings import load_settings
+
+__all__ = ["schedule"]
+
+logger = logging.getLogger("chaostoolkit")
+
+
+@click.command()
+@click.option(
+    "--max-concurrency",
+    type=click.IntRange(min=1),
+    help="Maximum number of experiments running at once, overriding the "
+    "schedule file. 1 by default.",
+)
+@click.option(
+    "--state-file",
+    type=click.Path(dir_okay=False),
+    help="File keeping track of past runs to catch up missed ones, "
+    "<schedule>.state.json by default.",
+)
+@click.option(
+    "--journal-path",
+    default="./journal.json",
+    show_default=True,
+    help="Path where to save the journals, suffixed with the name of the "
+    "experiment and the time of the run, when the schedule does not say "
+    "otherwise.",
+)
+@click.option(
+    "--control-file",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Python module or JSON/YAML file declaring global controls, "
+    "loaded once per worker.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Do not use the local caches of experiments loaded over HTTP and "
+    "of validated experiments.",
+)
+@click.option(
+    "--list",
+    "list_only",
+    is_flag=True,
+    help="Display when each experiment runs next, then exit.",
+)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.pass_context
+def schedule(
+    ctx: click.Context,
+    path: str,
+    max_concurrency: Optional[int] = None,
+    state_file: Optional[str] = None,
+    journal_path: str = "./journal.json",
+    control_file: List[str] = None,
+    no_cache: bool = False,
+    list_only: bool = False,
+):
+    """Run the experiments of the schedule at PATH when they are due.
+
+    Each experiment of the schedule fires on a cron expression or at an
+    interval, with an optional random `jitter`. Settings and global controls
+    are loaded once, for a pool of `--max-concurrency` worker processes
+    which then run the experiments, so each run skips the start-up costs
+    of `chaos run`.
+
+    An experiment never overlaps its previous run. Runs missed while the
+    scheduler was stopped or busy are skipped, run once, or all run,
+    according to the `catch_up` policy of the experiment."""
+    try:
+        experiments, config = load_schedule(path)
+    except (OSError, ValueError, yaml.YAMLError) as x:
+        raise click.BadParameter(str(x), param_hint="PATH")
+
+    max_concurrency = max_concurrency or config.get("max_concurrency") or 1
+    state_file = state_file or f"{os.path.splitext(path)[0]}.state.json"
+
+    if list_only:
+        scheduler = Scheduler(experiments, None, state_path=state_file)
+        scheduler.start(time.time())
+        firings = scheduler.next_firings()
+        for experiment in experiments:
+            at = datetime.fromtimestamp(firings[experiment.name])
+            click.echo(
+                f"{experiment.name:<32}{at.isoformat(' ', 'seconds')}  "
+                f"{experiment.source}"
+            )
+        return
+
+    settings = load_settings(ctx.obj["settings_path"]) or {}
+    cache_dir = None
+    if not no_cache:
+        cache_dir = get_cache_dir(ctx.obj["settings_path"])
+
+    pool = create_pool(settings, control_file, max_concurrency, prefork=True)
+    pending: Set[Future] = set()
+
+    def submit(experiment: ScheduledExperiment, at: float) -> Future:
+        stamp = datetime.fromtimestamp(at).strftime("%Y%m%dT%H%M%S")
+        path = make_output_paths(
+            experiment.journal_path or journal_path,
+            [f"{experiment.name}-{stamp}"],
+        )[0]
+        logger.debug(f"Saving the journal of '{experiment.name}' in {path}")
+        future = submit_run(
+            pool,
+            source=experiment.source,
+            journal_path=path,
+            cache_dir=cache_dir,
+            **experiment.options,
+        )
+        pending.add(future)
+        future.add_done_callback(pending.discard)
+        return future
+
+    scheduler = Scheduler(
+        experiments, submit, max_concurrency, state_path=state_file
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    logger.info(
+        f"Scheduling {len(experiments)} experiments, at most "
+        f"{max_concurrency} at once"
+    )
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    finally:
+        running = scheduler.running()
+        if running:
+            logger.info(f"Waiting for {', '.join(running)} to complete")
+        shutdown_pool(pool, pending)
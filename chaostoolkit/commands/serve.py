@@ -0,0 +1,288 @@
+import importlib
+import logging
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+import click
+
+from chaostoolkit import __version__
+from chaostoolkit.cache import get_cache_dir
+from chaostoolkit.commands.run import (
+    create_pool,
+    shutdown_pool,
+    submit_run,
+    submit_validation,
+)
+from chaostoolkit.server import ChaosServer, get_socket_path
+from chaostoolkit.settings import Settings, load_settings
+
+__all__ = ["serve", "handle_request", "WorkerPool"]
+
+logger = logging.getLogger("chaostoolkit")
+
+# options of `chaos run` and `chaos validate` a client may send
+RUN_OPTIONS = (
+    "journal_path",
+    "journal_format",
+    "journal_stream",
+    "var",
+    "var_file",
+    "no_verify_tls",
+    "refresh",
+    "dry",
+    "no_validation",
+    "rollback_strategy",
+    "hypothesis_strategy",
+    "hypothesis_frequency",
+    "fail_fast",
+    "include_journal",
+)
+VALIDATE_OPTIONS = ("no_verify_tls", "refresh")
+
+
+@click.command()
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    help="Unix socket to listen on, chaostoolkit.sock next to the settings "
+    "file by default.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=lambda: os.cpu_count() or 1,
+    show_default="number of CPUs",
+    help="Number of worker processes running experiments.",
+)
+@click.option(
+    "--control-file",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Python module or JSON/YAML file declaring global controls, "
+    "loaded once per worker.",
+)
+@click.option(
+    "--preload",
+    multiple=True,
+    metavar="MODULE",
+    help="Python module, such as an extension, to import before starting "
+    "the workers so they do not import it on each run. May be given more "
+    "than once.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Do not use the local caches of experiments loaded over HTTP and "
+    "of validated experiments.",
+)
+@click.option(
+    "--max-runs-per-worker",
+    type=click.IntRange(min=1),
+    help="Replace a worker by a new one after that many runs. Requires "
+    "Python 3.11 or later.",
+)
+@click.pass_context
+def serve(
+    ctx: click.Context,
+    socket_path: Optional[str] = None,
+    workers: int = 1,
+    control_file: List[str] = None,
+    preload: List[str] = None,
+    no_cache: bool = False,
+    max_runs_per_worker: Optional[int] = None,
+):
+    """Run experiments sent by `chaos run --server` in warm workers.
+
+    Settings and global controls are loaded once, and the `--preload`
+    modules imported once, before starting `--workers` processes which then
+    run experiments as they are sent over a Unix socket. Clients skip the
+    start-up costs of a run, such as loading settings, controls and
+    extensions.
+
+    Experiments run with the current directory and environment variables of
+    the client, and the settings of the server.
+
+    A worker runs one experiment after another, so what a run leaves behind
+    in its process, such as imported modules, patched functions or the
+    state of controls, is seen by the next runs of that worker. Use
+    `--max-runs-per-worker 1` to run each experiment in a new worker, at the
+    cost of starting it, which then only imports the `--preload` modules
+    once in a fork server."""
+    socket_path = socket_path or get_socket_path(ctx.obj["settings_path"])
+    settings = load_settings(ctx.obj["settings_path"]) or {}
+    cache_dir = None
+    if not no_cache:
+        cache_dir = get_cache_dir(ctx.obj["settings_path"])
+
+    if max_runs_per_worker and sys.version_info < (3, 11):
+        raise click.BadParameter(
+            "Recycling workers requires Python 3.11 or later",
+            param_hint="--max-runs-per-worker",
+        )
+
+    for module in preload or ():
+        try:
+            importlib.import_module(module)
+        except ImportError as x:
+            raise click.BadParameter(
+                f"Cannot import '{module}': {x}", param_hint="--preload"
+            )
+
+    pool = WorkerPool(
+        settings, control_file, workers, max_runs_per_worker, preload
+    )
+    pending: Set[Future] = set()
+    server = ChaosServer(
+        socket_path,
+        lambda request: handle_request(pool, cache_dir, request, pending),
+    )
+    try:
+        server.start()
+    except OSError as x:
+        pool.shutdown()
+        logger.error(str(x))
+        ctx.exit(1)
+
+    # exit cleanly, removing the socket, when asked to stop
+    signal.signal(signal.SIGTERM, _terminate)
+    logger.info(f"Serving with {workers} workers on {socket_path}")
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Stopping the server")
+    finally:
+        server.close()
+        shutdown_pool(pool, pending)
+
+
+class WorkerPool:
+    """
+    The pool of workers of `chaos serve`, see `create_pool`.
+
+    A worker which dies abruptly, such as when it is killed or runs out of
+    memory, breaks the whole pool. The runs it had then fail, and the pool
+    is replaced by a new one for the next runs.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        control_files: List[str] = None,
+        workers: int = 1,
+        max_runs: int = None,
+        preload: List[str] = None,
+    ):
+        self.settings = settings
+        self.control_files = control_files
+        self.workers = workers
+        self.max_runs = max_runs
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._pool = self._create()
+
+    def submit(
+        self, fn: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Future:
+        """
+        Like `ProcessPoolExecutor.submit`, on a new pool when the current
+        one is broken.
+        """
+        pool = self._pool
+        try:
+            return pool.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            return self._replace(pool).submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def _create(self) -> ProcessPoolExecutor:
+        return create_pool(
+            self.settings,
+            self.control_files,
+            self.workers,
+            prefork=True,
+            max_runs=self.max_runs,
+            preload=self.preload,
+        )
+
+    def _replace(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        with self._lock:
+            # another request may have replaced it already
+            if self._pool is broken:
+                logger.warning("A worker died, starting new workers")
+                broken.shutdown(wait=False)
+                self._pool = self._create()
+            return self._pool
+
+
+def handle_request(
+    pool: WorkerPool,
+    cache_dir: Optional[str],
+    request: Dict[str, Any],
+    pending: Optional[Set[Future]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Answer a request sent to `chaos serve`, see `ChaosServer`, with the
+    workers of `pool`.
+
+    The `"ping"` command answers with the version of the server. The
+    `"run"` and `"validate"` commands are first `"accepted"`, then answered
+    with the summary of their outcome once a worker is done with them.
+    Their futures are kept in `pending`, if given, until they are done.
+    """
+    command = request.get("command")
+    if command == "ping":
+        yield {"type": "result", "version": __version__}
+        return
+
+    if command not in ("run", "validate"):
+        yield {"type": "error", "message": f"Unknown command '{command}'"}
+        return
+
+    source = request.get("source")
+    if not isinstance(source, str):
+        yield {"type": "error", "message": "Missing the experiment source"}
+        return
+
+    allowed = RUN_OPTIONS if command == "run" else VALIDATE_OPTIONS
+    given = request.get("options") or {}
+    unknown = sorted(set(given) - set(allowed) - {"no_cache"})
+    if unknown:
+        yield {
+            "type": "error",
+            "message": f"Unsupported options: {', '.join(unknown)}",
+        }
+        return
+
+    options = {k: v for k, v in given.items() if k in allowed}
+    options["cache_dir"] = None if given.get("no_cache") else cache_dir
+    options["cwd"] = request.get("cwd")
+    options["env"] = request.get("env")
+
+    logger.info(f"Received the {command} of '{source}'")
+    if command == "run":
+        future = submit_run(pool, source=source, **options)
+    else:
+        future = submit_validation(pool, source, **options)
+    if pending is not None:
+        pending.add(future)
+        future.add_done_callback(pending.discard)
+    yield {"type": "accepted"}
+
+    result = future.result()
+    logger.info(f"The {command} of '{source}' is over: {result['status']}")
+    yield dict(result, type="result")
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _terminate(signum: int, frame: Any) -> None:
+    raise SystemExit(0)
@@ -1,15 +1,24 @@
 import json
+import logging
 import os
+from typing import IO, Any, Dict, List, Optional, Tuple
 
 import click
 import yaml
 
-from chaoslib.settings import (
+from chaoslib.settings import locate_settings_entry
+
+from chaostoolkit.settings import (
+    InvalidSettings,
+    SettingsConflict,
+    apply_json_patch,
+    apply_settings_changes,
     load_settings,
-    locate_settings_entry,
-    save_settings,
+    update_settings,
 )
 
+logger = logging.getLogger("chaostoolkit")
+
 
 @click.group()
 def settings():
@@ -65,18 +74,8 @@ def set_settings_value(ctx: click.Context, key: str, value: str = None):
     if not os.path.isfile(ctx.obj["settings_path"]):
         ctx.exit(1)
 
-    settings = load_settings(ctx.obj["settings_path"]) or {}
-    item = locate_settings_entry(settings, key)
-    if not item:
-        ctx.exit(1)
-    parent, entry, key_tail, index = item
-
     value = json.loads(value)
-    if key_tail is not None:
-        parent[key_tail] = value
-    elif index is not None:
-        parent[index] = value
-    save_settings(settings, ctx.obj["settings_path"])
+    _update(ctx, [("set", key, value)])
 
 
 settings.add_command(set_settings_value)
@@ -94,20 +93,81 @@ def remove_settings_value(ctx: click.Context, key: str):
     if not os.path.isfile(ctx.obj["settings_path"]):
         ctx.exit(1)
 
-    settings = load_settings(ctx.obj["settings_path"]) or {}
-    item = locate_settings_entry(settings, key)
-    if not item:
+    _update(ctx, [("remove", key, None)])
+
+
+settings.add_command(remove_settings_value)
+
+
+@settings.command("apply", context_settings={"ignore_unknown_options": True})
+@click.option(
+    "--patch",
+    "patch_file",
+    type=click.File("r"),
+    help="JSON patch (RFC 6902) to apply before the operations given as "
+    "arguments. Use - to read it from the standard input.",
+)
+@click.argument("operations", nargs=-1)
+@click.pass_context
+def apply_settings(
+    ctx: click.Context,
+    operations: List[str],
+    patch_file: Optional[IO] = None,
+):
+    """
+    Apply many changes to the settings, then save them once.
+
+    Each operation is either `key=value`, to set the key like
+    `chaos settings set` does, or `-key`, to remove it like
+    `chaos settings remove` does. Keys are dotted paths to their location
+    in the settings file and values must be valid JSON strings.
+
+    The settings file is read once and only written when all the changes
+    applied, atomically, so it is never left half-changed. Like `set` and
+    `remove`, the file is locked meanwhile and the changes are applied again
+    if another process changed it without locking it.
+    """
+    settings_path = ctx.obj["settings_path"]
+    if not os.path.isfile(settings_path):
+        logger.error(f"No settings file found at {settings_path}")
         ctx.exit(1)
-    parent, entry, key_tail, index = item
 
-    if key_tail is not None:
-        parent.pop(key_tail, None)
-    elif index is not None:
-        parent.remove(parent[index])
-    save_settings(settings, ctx.obj["settings_path"])
+    changes = []
+    for operation in operations:
+        if operation.startswith("-"):
+            changes.append(("remove", operation[1:], None))
+            continue
 
+        key, sep, value = operation.partition("=")
+        if not sep or not key:
+            raise click.BadParameter(
+                f"'{operation}' is neither key=value nor -key",
+                param_hint="OPERATIONS",
+            )
+        try:
+            changes.append(("set", key, json.loads(value)))
+        except ValueError:
+            raise click.BadParameter(
+                f"The value of '{key}' is not valid JSON: {value}",
+                param_hint="OPERATIONS",
+            )
 
-settings.add_command(remove_settings_value)
+    patch = None
+    if patch_file is not None:
+        try:
+            patch = json.load(patch_file)
+        except ValueError as x:
+            raise click.BadParameter(
+                f"Invalid JSON patch: {x}", param_hint="--patch"
+            )
+
+    if not changes and patch is None:
+        raise click.UsageError("Expected operations or a --patch file")
+
+    _update(ctx, changes, patch)
+
+
+settings.add_command(apply_settings)
 
 
 @settings.command("get")
@@ -145,3 +205,26 @@ def get_settings_value(ctx: click.Context, key: str, fmt: str = "json"):
 
 
 settings.add_command(get_settings_value)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _update(
+    ctx: click.Context,
+    changes: List[Tuple[str, str, Any]],
+    patch: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    def update(settings: Dict[str, Any]) -> None:
+        if patch is not None:
+            apply_json_patch(settings, patch)
+        apply_settings_changes(settings, changes)
+
+    try:
+        update_settings(ctx.obj["settings_path"], update)
+    except ValueError as x:
+        logger.error(f"The settings were left unchanged: {x}")
+        ctx.exit(1)
+    except (InvalidSettings, SettingsConflict, TimeoutError) as x:
+        logger.error(str(x))
+        ctx.exit(1)
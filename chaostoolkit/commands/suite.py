@@ -0,0 +1,125 @@
+import logging
+import os
+from concurrent.futures import Future
+from typing import List, Optional
+
+import click
+import yaml
+from chaoslib import merge_vars
+
+from chaostoolkit.cache import get_cache_dir
+from chaostoolkit.commands.run import (
+    create_pool,
+    log_summary,
+    make_output_paths,
+    submit_run,
+)
+from chaostoolkit.journal import dump_json
+from chaostoolkit.settings import load_settings
+from chaostoolkit.suite import SuiteNode, load_suite, run_suite
+
+__all__ = ["suite"]
+
+logger = logging.getLogger("chaostoolkit")
+
+
+@click.command()
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    help="Number of experiments running at once, overriding the suite "
+    "file. The number of CPUs by default.",
+)
+@click.option(
+    "--journal-path",
+    default="./journal.json",
+    show_default=True,
+    help="Path where to save the journals, suffixed with the name of each "
+    "experiment, or a directory to save them in.",
+)
+@click.option(
+    "--control-file",
+    multiple=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Python module or JSON/YAML file declaring global controls, "
+    "loaded once per worker.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Do not use the local caches of experiments loaded over HTTP and "
+    "of validated experiments.",
+)
+@click.option(
+    "--no-exit",
+    is_flag=True,
+    help="Exit successfully even when an experiment failed or deviated.",
+)
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.pass_context
+def suite(
+    ctx: click.Context,
+    path: str,
+    workers: Optional[int] = None,
+    journal_path: str = "./journal.json",
+    control_file: List[str] = None,
+    no_cache: bool = False,
+    no_exit: bool = False,
+):
+    """Run the experiments of the suite at PATH in dependency order.
+
+    An experiment of the suite may come `after` others, and only runs once
+    they completed without deviating. Otherwise it is skipped, as well as
+    the experiments depending on it. Independent experiments run at the
+    same time in a pool of `--workers` processes.
+
+    Settings, global controls and the variables shared by the suite are
+    loaded once for all the experiments. Each experiment gets its own
+    journal, and an index of all of them is written alongside."""
+    try:
+        nodes, config = load_suite(path)
+    except (OSError, ValueError, yaml.YAMLError) as x:
+        raise click.BadParameter(str(x), param_hint="PATH")
+
+    workers = workers or config.get("workers") or os.cpu_count() or 1
+    settings = load_settings(ctx.obj["settings_path"]) or {}
+    cache_dir = None
+    if not no_cache:
+        cache_dir = get_cache_dir(ctx.obj["settings_path"])
+
+    # before the workers start, so they inherit the variables of .env files
+    experiment_vars = merge_vars(config["var"], config["var_file"])
+    journal_paths = dict(
+        zip(
+            [n.name for n in nodes],
+            make_output_paths(journal_path, [n.name for n in nodes]),
+        )
+    )
+
+    def submit(node: SuiteNode) -> Future:
+        return submit_run(
+            pool,
+            source=node.source,
+            journal_path=journal_paths[node.name],
+            experiment_vars=experiment_vars,
+            cache_dir=cache_dir,
+            **node.options,
+        )
+
+    logger.info(f"Running a suite of {len(nodes)} experiments")
+    with create_pool(settings, control_file, workers) as pool:
+        results = run_suite(nodes, submit)
+
+    for result in results:
+        if result["status"] != "skipped":
+            result["journal_path"] = journal_paths[result["name"]]
+
+    index_path = make_output_paths(journal_path, ["index"], ext=".json")[0]
+    if index_path != "-":
+        dump_json({"suite": path, "runs": results}, index_path)
+        logger.info(f"Suite index saved in {index_path}")
+
+    log_summary(results)
+    if any(r["exit_code"] for r in results) and not no_exit:
+        ctx.exit(1)
+    return results
@@ -3,14 +3,16 @@ import logging
 import click
 
 from chaoslib.exceptions import ChaosException, InvalidSource
-from chaoslib.experiment import ensure_experiment_is_valid
-from chaoslib.loader import load_experiment
-from chaoslib.notification import (
-    ValidateFlowEvent,
-    notify,
-)
+from chaoslib.notification import ValidateFlowEvent
 from chaoslib.types import Experiment
-from chaoslib.settings import load_settings
+
+from chaostoolkit.cache import (
+    get_cache_dir,
+    load_cached_experiment,
+    validate_experiment,
+)
+from chaostoolkit.notification import notify
+from chaostoolkit.settings import load_settings
 
 logger = logging.getLogger("chaostoolkit")
 
@@ -19,17 +21,40 @@ logger = logging.getLogger("chaostoolkit")
 @click.option(
     "--no-verify-tls", is_flag=True, help="Do not verify TLS certificate."
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Do not use the local caches of experiments loaded over HTTP and "
+    "of validated experiments.",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Fetch the experiment again when loaded over HTTP and update the "
+    "local cache with it.",
+)
 @click.argument("source")
 @click.pass_context
 def validate(
-    ctx: click.Context, source: str, no_verify_tls: bool = False
+    ctx: click.Context,
+    source: str,
+    no_verify_tls: bool = False,
+    no_cache: bool = False,
+    refresh: bool = False,
 ) -> Experiment:
     """Validate the experiment at SOURCE."""
     settings = load_settings(ctx.obj["settings_path"])
+    cache_dir = None
+    if not no_cache:
+        cache_dir = get_cache_dir(ctx.obj["settings_path"])
 
     try:
-        experiment = load_experiment(
-            source, settings, verify_tls=not no_verify_tls
+        experiment = load_cached_experiment(
+            source,
+            settings,
+            verify_tls=not no_verify_tls,
+            cache_dir=cache_dir,
+            refresh=refresh,
         )
     except InvalidSource as x:
         logger.error(str(x))
@@ -38,7 +63,7 @@ def validate(
 
     try:
         notify(settings, ValidateFlowEvent.ValidateStarted, experiment)
-        ensure_experiment_is_valid(experiment)
+        validate_experiment(experiment, cache_dir)
         notify(settings, ValidateFlowEvent.ValidateCompleted, experiment)
         logger.info("experiment syntax and semantic look valid")
     except ChaosException as x:
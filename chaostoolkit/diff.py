@@ -0,0 +1,205 @@
+import statistics
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from chaoslib.types import Journal
+
+from chaostoolkit.journal import iter_phase_runs
+
+__all__ = ["diff_journals"]
+
+# relative duration increase, in percent, before it is a regression
+DURATION_THRESHOLD = 20.0
+# absolute duration increase, in seconds, below which it is noise
+DURATION_MIN_DELTA = 0.01
+# standard deviations from the baselines mean, when there are several
+DURATION_Z_SCORE = 3.0
+STEADY_STATE_PHASES = (
+    "hypothesis-before",
+    "hypothesis-after",
+    "hypothesis-continuous",
+)
+
+Key = Tuple[str, str, int]
+
+
+def diff_journals(
+    baselines: List[Journal],
+    candidate: Journal,
+    threshold: float = DURATION_THRESHOLD,
+    min_delta: float = DURATION_MIN_DELTA,
+    z_score: float = DURATION_Z_SCORE,
+) -> Dict[str, Any]:
+    """
+    Compare the `candidate` journal with one or more `baselines` journals of
+    the same experiment.
+
+    Activities are aligned by phase, name and occurrence of that name in the
+    phase, so an activity running twice is compared with its counterpart.
+    For each of them, the report tells whether its status or tolerance
+    outcome changed, from the most common one among baselines, and how its
+    duration compares with the baselines mean.
+
+    The `regressions` of the report count the durations which regressed,
+    overall and for steady-state probes, the activities which no longer
+    succeed and the probes whose tolerance is no longer met.
+
+    A duration is a regression when it grew by at least `min_delta` seconds
+    and `threshold` percent and, given more than one baseline with some
+    variance, by at least `z_score` standard deviations.
+    """
+    baseline_runs = [_index_runs(b) for b in baselines]
+    candidate_runs = _index_runs(candidate)
+
+    keys = list(candidate_runs)
+    for runs in baseline_runs:
+        keys.extend(k for k in runs if k not in candidate_runs)
+    keys = list(dict.fromkeys(keys))
+
+    activities = []
+    for key in keys:
+        phase, name, occurrence = key
+        before = [runs[key] for runs in baseline_runs if key in runs]
+        after = candidate_runs.get(key)
+        entry = {
+            "phase": phase,
+            "name": name,
+            "occurrence": occurrence,
+            "steady_state": phase in STEADY_STATE_PHASES,
+        }
+        if not before:
+            entry["change"] = "added"
+        elif after is None:
+            entry["change"] = "removed"
+
+        entry["status"] = _compare_value(
+            [r.get("status") for r in before], after, "status"
+        )
+        entry["tolerance_met"] = _compare_value(
+            [r.get("tolerance_met") for r in before], after, "tolerance_met"
+        )
+        entry["duration"] = _compare_duration(
+            [r.get("duration") for r in before],
+            after.get("duration") if after else None,
+            threshold,
+            min_delta,
+            z_score,
+        )
+        activities.append(entry)
+
+    run = {
+        "status": _compare_value(
+            [b.get("status") for b in baselines], candidate, "status"
+        ),
+        "deviated": _compare_value(
+            [b.get("deviated", False) for b in baselines],
+            candidate,
+            "deviated",
+        ),
+        "duration": _compare_duration(
+            [b.get("duration") for b in baselines],
+            candidate.get("duration"),
+            threshold,
+            min_delta,
+            z_score,
+        ),
+    }
+
+    regressions = [
+        a for a in activities if a["duration"].get("regression", False)
+    ]
+    return {
+        "experiment": (candidate.get("experiment") or {}).get("title"),
+        "baselines": len(baselines),
+        "run": run,
+        "activities": activities,
+        "regressions": {
+            "duration": len(regressions),
+            "steady_state_duration": len(
+                [a for a in regressions if a["steady_state"]]
+            ),
+            "status": len(
+                [
+                    a
+                    for a in activities
+                    if a["status"].get("changed")
+                    and a["status"].get("candidate") != "succeeded"
+                ]
+            ),
+            "tolerance": len(
+                [
+                    a
+                    for a in activities
+                    if a["tolerance_met"].get("candidate") is False
+                    and a["tolerance_met"].get("changed")
+                ]
+            ),
+        },
+    }
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _index_runs(journal: Journal) -> Dict[Key, Dict[str, Any]]:
+    runs = {}
+    occurrences: Counter = Counter()
+    for phase, run in iter_phase_runs(journal):
+        if not isinstance(run, dict):
+            continue
+        name = (run.get("activity") or {}).get("name") or ""
+        occurrence = occurrences[(phase, name)]
+        occurrences[(phase, name)] += 1
+        runs[(phase, name, occurrence)] = run
+    return runs
+
+
+def _compare_value(
+    before: List[Any], after: Optional[Dict[str, Any]], field: str
+) -> Dict[str, Any]:
+    before = [v for v in before if v is not None]
+    baseline = Counter(before).most_common(1)[0][0] if before else None
+    candidate = after.get(field) if after else None
+    return {
+        "baseline": baseline,
+        "candidate": candidate,
+        "changed": (
+            baseline is not None
+            and candidate is not None
+            and baseline != candidate
+        ),
+    }
+
+
+def _compare_duration(
+    before: List[Any],
+    after: Any,
+    threshold: float,
+    min_delta: float,
+    z_score: float,
+) -> Dict[str, Any]:
+    before = [v for v in before if isinstance(v, (int, float))]
+    if not isinstance(after, (int, float)):
+        after = None
+    mean = statistics.fmean(before) if before else None
+    stdev = statistics.stdev(before) if len(before) > 1 else None
+    result = {"baseline": mean, "stdev": stdev, "candidate": after}
+    if mean is None or after is None:
+        return result
+
+    delta = after - mean
+    relative = delta / mean * 100 if mean else None
+    z = delta / stdev if stdev else None
+    result.update(
+        {
+            "delta": delta,
+            "relative": relative,
+            "z_score": z,
+            "regression": (
+                delta >= min_delta
+                and (relative is None or relative >= threshold)
+                and (z is None or z >= z_score)
+            ),
+        }
+    )
+    return result
@@ -0,0 +1,197 @@
+import decimal
+import enum
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, Optional
+
+__all__ = ["dumps", "encoder", "register_encoder"]
+
+# raw bytes per base64 chunk, a multiple of 3 so chunks can be concatenated
+BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
+Handler = Callable[[Any], Any]
+
+
+def encoder(o: object) -> Any:
+    """
+    Perform some additional encoding for types JSON doesn't support natively.
+
+    We don't try to respect any ECMA specification here as we want to retain
+    as much information as we can.
+
+    The handler of each type is looked up once, along its MRO, in the
+    handlers registered with `register_encoder`. Dataclasses, NumPy values
+    and path-like objects are recognized without importing their modules.
+    """
+    cls = type(o)
+    try:
+        handler = _handlers[cls]
+    except KeyError:
+        handler = _find_handler(cls)
+        _handlers[cls] = handler
+
+    if handler is None:
+        raise TypeError(f"Object of type '{cls}' is not JSON serializable")
+    return handler(o)
+
+
+def register_encoder(cls: type, handler: Handler) -> None:
+    """
+    Encode instances of `cls`, and of its subclasses, with `handler` when
+    they are serialized to JSON, by the journal for instance.
+
+    The `handler` returns a value JSON supports natively, or one this
+    encoder knows about. Extensions typically call this when imported.
+    """
+    global _customized, _overrides_orjson
+    with _lock:
+        _registry[cls] = handler
+        _handlers.clear()
+        _customized = True
+        if _is_native_to_orjson(cls):
+            _overrides_orjson = True
+
+
+def dumps(doc: Any, indent: Optional[int] = None) -> str:
+    """
+    Serialize `doc` to JSON with `encoder` for non-native types, compact
+    unless `indent` is set.
+
+    The `orjson` package is used when it is installed, and supports the
+    document, as it is several times faster than the standard library. Once
+    an encoder was registered, dates and dataclasses are left to `encoder`
+    rather than to orjson, so they can be overridden. orjson cannot leave
+    UUIDs, enums and NumPy values to `encoder`, so the standard library is
+    used instead once an encoder was registered for any of them.
+
+    The output is the same with both, except for NaN and infinite floats:
+    the standard library writes them as `NaN`, `Infinity` and `-Infinity`,
+    which are not valid JSON, and orjson as `null`. Telling whether a
+    document holds any would cost as much as serializing it without orjson.
+    """
+    orjson = None if _overrides_orjson else _get_orjson()
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if _customized:
+            option |= (
+                orjson.OPT_PASSTHROUGH_DATACLASS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        try:
+            return orjson.dumps(doc, default=encoder, option=option).decode(
+                "utf-8"
+            )
+        except TypeError:
+            # such as integers larger than 64 bits
+            pass
+
+    if indent:
+        return json.dumps(
+            doc, indent=indent, ensure_ascii=False, default=encoder
+        )
+    return json.dumps(
+        doc, ensure_ascii=False, separators=(",", ":"), default=encoder
+    )
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _encode_datetime(o: date) -> str:
+    # we do not meddle with the timezone and assume the date was
+    # stored with the right information of timezone as +-HH:MM
+    return o.isoformat()
+
+
+def _encode_bytes(o: bytes) -> Dict[str, Any]:
+    import base64
+
+    o = bytes(o)
+    if len(o) <= BASE64_CHUNK_SIZE:
+        return {"encoding": "base64", "data": base64.b64encode(o).decode()}
+
+    return {
+        "encoding": "base64",
+        "chunks": [
+            base64.b64encode(o[i : i + BASE64_CHUNK_SIZE]).decode()
+            for i in range(0, len(o), BASE64_CHUNK_SIZE)
+        ],
+    }
+
+
+def _encode_set(o: frozenset) -> list:
+    try:
+        return sorted(o)
+    except TypeError:
+        return list(o)
+
+
+def _encode_dataclass(o: Any) -> Dict[str, Any]:
+    import dataclasses
+
+    return {f.name: getattr(o, f.name) for f in dataclasses.fields(o)}
+
+
+def _encode_numpy(o: Any) -> Any:
+    # scalars become Python numbers and arrays nested lists
+    return o.tolist()
+
+
+def _find_handler(cls: type) -> Optional[Handler]:
+    for base in cls.__mro__:
+        handler = _registry.get(base)
+        if handler is not None:
+            return handler
+
+    if hasattr(cls, "__dataclass_fields__"):
+        return _encode_dataclass
+    if cls.__module__.split(".", 1)[0] == "numpy" and hasattr(cls, "tolist"):
+        return _encode_numpy
+    if hasattr(cls, "__fspath__"):
+        return os.fspath
+    return None
+
+
+def _is_native_to_orjson(cls: type) -> bool:
+    # types orjson serializes itself, whatever its `default`
+    for native in (uuid.UUID, enum.Enum):
+        if issubclass(cls, native) or issubclass(native, cls):
+            return True
+    return cls.__module__.split(".", 1)[0] == "numpy"
+
+
+def _get_orjson() -> Any:
+    global _orjson
+    if _orjson is False:
+        try:
+            import orjson
+        except ImportError:
+            orjson = None
+        _orjson = orjson
+    return _orjson
+
+
+_lock = threading.Lock()
+_customized = False
+_overrides_orjson = False
+_orjson: Any = False
+_registry: Dict[type, Handler] = {
+    date: _encode_datetime,
+    datetime: _encode_datetime,
+    time: _encode_datetime,
+    decimal.Decimal: str,
+    uuid.UUID: str,
+    bytes: _encode_bytes,
+    bytearray: _encode_bytes,
+    memoryview: _encode_bytes,
+    set: _encode_set,
+    frozenset: _encode_set,
+    enum.Enum: lambda o: o.value,
+}
+# type -> handler found for it, None when there is none
+_handlers: Dict[type, Optional[Handler]] = {}
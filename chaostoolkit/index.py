@@ -0,0 +1,402 @@
+import hashlib
+import logging
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from chaoslib.types import Journal
+
+from chaostoolkit.journal import iter_phase_runs, load_journal
+
+__all__ = ["JournalIndex", "get_index_path"]
+
+INDEX_FILENAME = "journals.db"
+INDEX_SCHEMA_VERSION = 1
+logger = logging.getLogger("chaostoolkit")
+
+
+def get_index_path(settings_path: str) -> str:
+    """
+    The journals index lives next to the settings file.
+    """
+    return os.path.join(
+        os.path.dirname(os.path.abspath(settings_path)), INDEX_FILENAME
+    )
+
+
+class JournalIndex:
+    """
+    A SQLite database of the runs found in journals and of their activities,
+    to answer questions about past runs without reading journals again.
+
+    Journals are keyed by the SHA-256 of their content. A file whose size
+    and modification time did not change since it was indexed is not read
+    again, and one whose content was already indexed, under another path
+    or because it was only touched, is not parsed again.
+
+    Times are stored as UNIX timestamps, durations in seconds.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self) -> "JournalIndex":
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != INDEX_SCHEMA_VERSION:
+            with self._conn:
+                self._conn.executescript(_SCHEMA)
+        return self
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "JournalIndex":
+        return self.open()
+
+    def __exit__(self, exc_type: Any, exc_value: Any, tb: Any) -> None:
+        self.close()
+
+    def add_file(self, path: str) -> str:
+        """
+        Index the journal at `path` and tell whether it was `"indexed"`,
+        `"unchanged"` or `"skipped"`, as it is not a journal.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, digest FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row and (row["size"], row["mtime_ns"]) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            return "unchanged"
+
+        digest = _file_digest(path)
+        with self._conn:
+            outcome = "unchanged"
+            known = self._conn.execute(
+                "SELECT 1 FROM runs WHERE digest = ?", (digest,)
+            ).fetchone()
+            if not known:
+                journal = _load(path)
+                if journal is None:
+                    # remembered so it is not read again until it changes
+                    outcome = "skipped"
+                else:
+                    self.add_journal(journal, digest, path)
+                    outcome = "indexed"
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) "
+                "VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest),
+            )
+            if row and row["digest"] != digest:
+                self._remove_orphan(row["digest"])
+
+        return outcome
+
+    def remove_missing(self) -> int:
+        """
+        Forget the files which no longer exist, and the runs only found in
+        them. Returns how many files were forgotten.
+        """
+        rows = self._conn.execute("SELECT path, digest FROM files").fetchall()
+        missing = [r for r in rows if not os.path.exists(r["path"])]
+        with self._conn:
+            for row in missing:
+                self._conn.execute(
+                    "DELETE FROM files WHERE path = ?", (row["path"],)
+                )
+                # still indexed when another file holds the same journal
+                self._conn.execute(
+                    "UPDATE runs SET path = (SELECT path FROM files "
+                    "WHERE files.digest = runs.digest LIMIT 1) "
+                    "WHERE digest = ? AND path = ? AND EXISTS "
+                    "(SELECT 1 FROM files WHERE files.digest = runs.digest)",
+                    (row["digest"], row["path"]),
+                )
+                self._remove_orphan(row["digest"])
+        return len(missing)
+
+    def add_journal(self, journal: Journal, digest: str, path: str) -> int:
+        """
+        Store the run of the `journal`, whose content hashes to `digest`,
+        and its activities. Returns the identifier of the run.
+        """
+        experiment = journal.get("experiment") or {}
+        cursor = self._conn.execute(
+            "INSERT INTO runs (digest, path, experiment, status, deviated, "
+            "start, end, duration, node, chaoslib_version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                digest,
+                path,
+                experiment.get("title") or "",
+                journal.get("status"),
+                int(bool(journal.get("deviated"))),
+                _timestamp(journal.get("start")),
+                _timestamp(journal.get("end")),
+                _number(journal.get("duration")),
+                journal.get("node"),
+                journal.get("chaoslib-version"),
+            ),
+        )
+        run_id = cursor.lastrowid
+
+        rows = []
+        positions: Dict[str, int] = {}
+        for phase, run in iter_phase_runs(journal):
+            if not isinstance(run, dict):
+                continue
+            activity = run.get("activity") or {}
+            position = positions.get(phase, 0)
+            positions[phase] = position + 1
+            tolerance_met = run.get("tolerance_met")
+            rows.append(
+                (
+                    run_id,
+                    phase,
+                    position,
+                    activity.get("name") or "",
+                    activity.get("type"),
+                    run.get("status"),
+                    None if tolerance_met is None else int(tolerance_met),
+                    _timestamp(run.get("start")),
+                    _number(run.get("duration")),
+                )
+            )
+        self._conn.executemany(
+            "INSERT INTO activities (run_id, phase, position, name, type, "
+            "status, tolerance_met, start, duration) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        return run_id
+
+    def query_runs(
+        self,
+        experiment: str = None,
+        status: str = None,
+        deviated: bool = None,
+        since: float = None,
+        until: float = None,
+        activity: str = None,
+        limit: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The runs matching all the given criteria, most recent first.
+
+        `experiment` is a title which may contain `*` wildcards, `since` and
+        `until` are UNIX timestamps bounding the start of the runs, and
+        `activity` only keeps runs with an activity of that name.
+        """
+        where, params = _filters(
+            experiment, status, deviated, since, until, activity
+        )
+        sql = (
+            "SELECT id, experiment, status, deviated, start, end, duration, "
+            f"node, path FROM runs{where} ORDER BY start DESC, id DESC"
+        )
+        return self._select(sql, params, limit)
+
+    def query_activities(
+        self,
+        name: str,
+        experiment: str = None,
+        status: str = None,
+        deviated: bool = None,
+        since: float = None,
+        until: float = None,
+        limit: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The runs of the activity called `name`, most recent first, in runs
+        matching all the given criteria, as in `query_runs`. `status` is
+        the one of the activity.
+        """
+        where, params = _filters(
+            experiment, None, deviated, since, until, prefix="r."
+        )
+        clauses = ["a.name = ?"]
+        params.insert(0, name)
+        if status:
+            clauses.append("a.status = ?")
+            params.append(status)
+        if where:
+            clauses.append(where[len(" WHERE ") :])
+        sql = (
+            "SELECT a.run_id, r.experiment, a.phase, a.position, a.name, "
+            "a.type, a.status, a.tolerance_met, a.start, a.duration "
+            "FROM activities a JOIN runs r ON r.id = a.run_id "
+            f"WHERE {' AND '.join(clauses)} "
+            "ORDER BY a.start DESC, a.run_id DESC"
+        )
+        return self._select(sql, params, limit)
+
+    def summarize(
+        self,
+        experiment: str = None,
+        since: float = None,
+        until: float = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per experiment, how many runs there were, how many deviated or did
+        not complete, and their mean and maximum durations.
+        """
+        where, params = _filters(experiment, None, None, since, until)
+        sql = (
+            "SELECT experiment, COUNT(*) AS runs, "
+            "SUM(deviated) AS deviations, "
+            "SUM(status != 'completed') AS failures, "
+            "AVG(duration) AS mean_duration, MAX(duration) AS max_duration, "
+            f"MAX(start) AS last_run FROM runs{where} "
+            "GROUP BY experiment ORDER BY experiment"
+        )
+        return self._select(sql, params)
+
+    def _select(
+        self, sql: str, params: List[Any], limit: int = None
+    ) -> List[Dict[str, Any]]:
+        if limit:
+            sql += " LIMIT ?"
+            params = params + [limit]
+        return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def _remove_orphan(self, digest: str) -> None:
+        self._conn.execute(
+            "DELETE FROM runs WHERE digest = ? AND NOT EXISTS "
+            "(SELECT 1 FROM files WHERE files.digest = runs.digest)",
+            (digest,),
+        )
+
+
+###############################################################################
+# Internals
+###############################################################################
+# the index is rebuilt from scratch whenever its schema changes
+_SCHEMA = f"""
+DROP TABLE IF EXISTS activities;
+DROP TABLE IF EXISTS runs;
+DROP TABLE IF EXISTS files;
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE runs (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    experiment TEXT NOT NULL,
+    status TEXT,
+    deviated INTEGER NOT NULL,
+    start REAL,
+    end REAL,
+    duration REAL,
+    node TEXT,
+    chaoslib_version TEXT
+);
+CREATE TABLE activities (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    phase TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT,
+    status TEXT,
+    tolerance_met INTEGER,
+    start REAL,
+    duration REAL
+);
+CREATE INDEX runs_experiment_start ON runs (experiment, start);
+CREATE INDEX runs_start ON runs (start);
+CREATE INDEX activities_run ON activities (run_id);
+CREATE INDEX activities_name_start ON activities (name, start);
+PRAGMA user_version = {INDEX_SCHEMA_VERSION};
+"""
+
+
+def _load(path: str) -> Optional[Journal]:
+    try:
+        journal = load_journal(path)
+    except Exception as x:
+        logger.debug(f"Skipping unreadable journal '{path}': {x}")
+        return None
+    if not isinstance(journal, dict) or "experiment" not in journal:
+        logger.debug(f"Skipping '{path}', which is not a journal")
+        return None
+    return journal
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if not isinstance(value, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        # older journals hold naive UTC times
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _number(value: Any) -> Optional[float]:
+    return value if isinstance(value, (int, float)) else None
+
+
+def _filters(
+    experiment: str = None,
+    status: str = None,
+    deviated: bool = None,
+    since: float = None,
+    until: float = None,
+    activity: str = None,
+    prefix: str = "",
+) -> Tuple[str, List[Any]]:
+    clauses = []
+    params: List[Any] = []
+    if experiment:
+        clauses.append(f"{prefix}experiment GLOB ?")
+        params.append(experiment)
+    if status:
+        clauses.append(f"{prefix}status = ?")
+        params.append(status)
+    if deviated is not None:
+        clauses.append(f"{prefix}deviated = ?")
+        params.append(int(deviated))
+    if since is not None:
+        clauses.append(f"{prefix}start >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append(f"{prefix}start < ?")
+        params.append(until)
+    if activity:
+        clauses.append(
+            f"{prefix}id IN (SELECT run_id FROM activities WHERE name = ?)"
+        )
+        params.append(activity)
+
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
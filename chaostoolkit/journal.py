@@ -0,0 +1,493 @@
+import glob
+import gzip
+import io
+import json
+import logging
+import lzma
+import os
+import re
+import sys
+import threading
+import time
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+)
+
+from chaoslib.run import RunEventHandler
+from chaoslib.types import Activity, Experiment, Journal, Run
+
+from chaostoolkit.encoding import dumps
+
+__all__ = [
+    "JOURNAL_FORMATS",
+    "JournalStreamer",
+    "dump_json",
+    "find_journals",
+    "guess_journal_format",
+    "iter_activity_runs",
+    "iter_phase_runs",
+    "is_journal",
+    "load_journal",
+    "load_json",
+    "save_journal",
+]
+
+JOURNAL_FORMATS = ("json", "compact", "gzip", "xz", "ndjson")
+JOURNAL_EXTENSIONS = (".json", ".ndjson", ".jsonl", ".gz", ".xz")
+# how much of a file is read to tell whether it is a journal
+JOURNAL_SNIFF_SIZE = 4096
+GZIP_COMPRESS_LEVEL = 6
+XZ_PRESET = 1
+GZIP_MAGIC = b"\x1f\x8b"
+XZ_MAGIC = b"\xfd7zXZ\x00"
+logger = logging.getLogger("chaostoolkit")
+
+
+class JournalStreamer(RunEventHandler):
+    """
+    Stream the execution as newline-delimited JSON records, one per phase
+    and per activity, flushed as soon as they are known.
+
+    Each record is a JSON object with at least a `"type"` and a `"ts"`
+    (UNIX timestamp) entries. This is not a replacement for the final journal
+    but it means partial results survive a crash or a forceful interruption
+    of the process.
+
+    When `path` is `"-"`, records are written to the standard output.
+
+    The continuous hypothesis runs alongside the method, in its own thread,
+    so the activities completed from that thread are recorded in the
+    `"hypothesis-continuous"` phase, whatever the current `phase` is.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.phase = None
+        self._lock = threading.Lock()
+        self._fp: TextIO = None
+        self._continuous_thread: Optional[int] = None
+
+    def open(self) -> "JournalStreamer":
+        if self.path == "-":
+            self._fp = sys.stdout
+        else:
+            self._fp = open(self.path, "w", encoding="utf-8")
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fp and self._fp is not sys.stdout:
+                self._fp.close()
+            self._fp = None
+
+    def __enter__(self) -> "JournalStreamer":
+        return self.open()
+
+    def __exit__(self, exc_type: Any, exc_value: Any, tb: Any) -> None:
+        self.close()
+
+    def write(self, record_type: str, **data: Any) -> None:
+        record: Dict[str, Any] = {"type": record_type, "ts": time.time()}
+        record.update(data)
+        line = dumps(record)
+
+        # background activities complete from their own threads
+        with self._lock:
+            if not self._fp:
+                return
+            self._fp.write(line)
+            self._fp.write("\n")
+            self._fp.flush()
+
+    def started(self, experiment: Experiment, journal: Journal) -> None:
+        self.write("started", journal=journal)
+
+    def interrupted(self, experiment: Experiment, journal: Journal) -> None:
+        self.write("interrupted", phase=self.phase)
+
+    def start_hypothesis_before(self, experiment: Experiment) -> None:
+        self.phase = "hypothesis-before"
+
+    def hypothesis_before_completed(
+        self, experiment: Experiment, state: Dict[str, Any], journal: Journal
+    ) -> None:
+        self.write(
+            "phase",
+            phase="hypothesis-before",
+            steady_state_met=_steady_state_met(state),
+        )
+
+    def start_continuous_hypothesis(self, frequency: int) -> None:
+        self._continuous_thread = threading.get_ident()
+
+    def continuous_hypothesis_iteration(
+        self, iteration_index: int, state: Any
+    ) -> None:
+        self.write(
+            "phase",
+            phase="hypothesis-continuous",
+            iteration=iteration_index,
+            steady_state_met=_steady_state_met(state),
+        )
+
+    def continuous_hypothesis_completed(
+        self,
+        experiment: Experiment,
+        journal: Journal,
+        exception: Exception = None,
+    ) -> None:
+        self._continuous_thread = None
+
+    def start_method(self, experiment: Experiment) -> None:
+        self.phase = "method"
+
+    def method_completed(self, experiment: Experiment, state: Any) -> None:
+        self.write("phase", phase="method")
+
+    def start_hypothesis_after(self, experiment: Experiment) -> None:
+        self.phase = "hypothesis-after"
+
+    def hypothesis_after_completed(
+        self, experiment: Experiment, state: Dict[str, Any], journal: Journal
+    ) -> None:
+        self.write(
+            "phase",
+            phase="hypothesis-after",
+            steady_state_met=_steady_state_met(state),
+        )
+
+    def start_rollbacks(self, experiment: Experiment) -> None:
+        self.phase = "rollbacks"
+
+    def rollbacks_completed(
+        self, experiment: Experiment, journal: Journal
+    ) -> None:
+        self.write("phase", phase="rollbacks")
+
+    def activity_completed(self, activity: Activity, run: Run) -> None:
+        phase = self.phase
+        if threading.get_ident() == self._continuous_thread:
+            phase = "hypothesis-continuous"
+        self.write("activity", phase=phase, run=run)
+
+    def finish(self, journal: Journal) -> None:
+        self.write(
+            "finished",
+            status=journal.get("status"),
+            deviated=journal.get("deviated", False),
+            end=journal.get("end"),
+            duration=journal.get("duration"),
+        )
+
+
+def guess_journal_format(path: str) -> str:
+    """
+    Guess the format of a journal from the extension of its `path`,
+    defaulting to pretty-printed JSON.
+    """
+    path = path.lower()
+    if path.endswith(".gz"):
+        return "gzip"
+    elif path.endswith(".xz"):
+        return "xz"
+    elif path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "json"
+
+
+def save_journal(journal: Journal, path: str, fmt: str = None) -> None:
+    """
+    Save the `journal` at `path` in one of the `JOURNAL_FORMATS`, guessed
+    from the file extension when `fmt` is not set:
+
+    * `json`: pretty-printed JSON
+    * `compact`: JSON without any whitespace
+    * `gzip` and `xz`: compressed compact JSON
+    * `ndjson`: one JSON record per line, a `"journal"` record with all
+      but the `"run"` entries, followed by one `"run"` record per activity
+      of the method
+
+    When `path` is `"-"`, the journal is written to the standard output.
+
+    Use `load_journal` to read it back, whatever its format.
+    """
+    fmt = fmt or guess_journal_format(path)
+    if fmt != "ndjson":
+        dump_json(journal, path, fmt)
+        return
+
+    with _open_for_writing(path, fmt) as f:
+        header = {k: v for k, v in journal.items() if k != "run"}
+        f.write(dumps({"type": "journal", "journal": header}))
+        f.write("\n")
+        for run in journal.get("run", []):
+            f.write(dumps({"type": "run", "run": run}))
+            f.write("\n")
+
+
+def load_journal(path: str) -> Journal:
+    """
+    Load the journal at `path`, detecting the format it was saved with.
+
+    Streams from `--journal-stream` are supported as well. When the stream
+    was interrupted, the journal is partial and its `"status"` is
+    `"interrupted"`.
+    """
+    with _open_for_reading(path) as f:
+        first_line = f.readline()
+        try:
+            record = json.loads(first_line)
+        except json.JSONDecodeError:
+            record = None
+
+        if isinstance(record, dict) and record.get("type") in (
+            "journal",
+            "started",
+        ):
+            return _journal_from_records(_iter_records(first_line, f))
+
+        rest = f.read()
+        if isinstance(record, dict) and not rest.strip():
+            # compact journals fit on a single line
+            return record
+        return json.loads(first_line + rest)
+
+
+def find_journals(paths: Iterable[str]) -> List[str]:
+    """
+    Expand directories, searched recursively, and glob patterns into the
+    journal files they contain, by extension and then by content, see
+    `is_journal`, so experiments and indexes saved alongside journals are
+    left out. Files are kept as-is.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = []
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                matches.extend(
+                    os.path.join(root, name)
+                    for name in files
+                    if name.lower().endswith(JOURNAL_EXTENSIONS)
+                )
+            found.extend(m for m in sorted(matches) if is_journal(m))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+            if not matches:
+                logger.warning(f"No journal matched '{path}'")
+            found.extend(
+                m for m in matches if os.path.isfile(m) and is_journal(m)
+            )
+        else:
+            found.append(path)
+
+    return found
+
+
+def is_journal(path: str) -> bool:
+    """
+    Whether the file at `path` holds a journal, or a stream of one, in any
+    of the formats `chaos run` saves them in.
+
+    Only the first `JOURNAL_SNIFF_SIZE` characters are read: journals start
+    with the `"chaoslib-version"` of the run, or declare an `"experiment"`
+    and a `"status"`, and streams start with a `"journal"` or `"started"`
+    record.
+    """
+    try:
+        with _open_for_reading(path) as f:
+            head = f.read(JOURNAL_SNIFF_SIZE)
+    except (OSError, EOFError, ValueError, lzma.LZMAError):
+        return False
+
+    if _STREAM_HEAD.match(head) or _VERSION_KEY.search(head):
+        return True
+    return bool(_EXPERIMENT_KEY.search(head) and _STATUS_KEY.search(head))
+
+
+def iter_activity_runs(journal: Journal) -> Iterator[Run]:
+    """
+    Iterate over the runs of every activity of the `journal`: the probes of
+    the steady-state hypothesis, the method and the rollbacks.
+    """
+    for _, run in iter_phase_runs(journal):
+        yield run
+
+
+def iter_phase_runs(journal: Journal) -> Iterator[Tuple[str, Run]]:
+    """
+    Like `iter_activity_runs` but along with the phase each activity ran in,
+    named as in the records of `JournalStreamer`.
+    """
+    steady_states = journal.get("steady_states") or {}
+    for key in ("before", "after"):
+        state = steady_states.get(key)
+        if isinstance(state, dict):
+            for run in state.get("probes") or []:
+                yield f"hypothesis-{key}", run
+    for state in steady_states.get("during") or []:
+        if isinstance(state, dict):
+            for run in state.get("probes") or []:
+                yield "hypothesis-continuous", run
+    for run in journal.get("run") or []:
+        yield "method", run
+    for run in journal.get("rollbacks") or []:
+        yield "rollbacks", run
+
+
+def dump_json(doc: Any, path: str, fmt: str = "json") -> None:
+    """
+    Save `doc` as JSON at `path` (`"-"` for the standard output) with the
+    `json`, `compact`, `gzip` or `xz` format.
+    """
+    with _open_for_writing(path, fmt) as f:
+        # serialized in one shot, which is much faster than streaming it
+        f.write(dumps(doc, indent=2 if fmt == "json" else None))
+        if path == "-" and fmt in ("json", "compact"):
+            f.write("\n")
+
+
+def load_json(path: str) -> Any:
+    """
+    Load a JSON document saved by `dump_json`, whatever its format.
+    """
+    with _open_for_reading(path) as f:
+        return json.load(f)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _steady_state_met(state: Any) -> Any:
+    # probe runs were already streamed as they completed, only keep the verdict
+    if isinstance(state, dict):
+        return state.get("steady_state_met")
+    return None
+
+
+def _open_for_writing(path: str, fmt: str) -> IO[str]:
+    if path == "-":
+        if fmt == "gzip":
+            return io.TextIOWrapper(
+                gzip.GzipFile(
+                    fileobj=sys.stdout.buffer,
+                    mode="wb",
+                    compresslevel=GZIP_COMPRESS_LEVEL,
+                ),
+                encoding="utf-8",
+            )
+        elif fmt == "xz":
+            return io.TextIOWrapper(
+                lzma.LZMAFile(sys.stdout.buffer, mode="wb", preset=XZ_PRESET),
+                encoding="utf-8",
+            )
+        return _KeepOpen(sys.stdout)
+
+    if fmt == "gzip":
+        return gzip.open(
+            path, "wt", encoding="utf-8", compresslevel=GZIP_COMPRESS_LEVEL
+        )
+    elif fmt == "xz":
+        return lzma.open(path, "wt", encoding="utf-8", preset=XZ_PRESET)
+    return open(path, "w", encoding="utf-8")
+
+
+_STREAM_HEAD = re.compile(r'\s*\{\s*"type"\s*:\s*"(journal|started)"')
+_VERSION_KEY = re.compile(r'"chaoslib-version"\s*:')
+_EXPERIMENT_KEY = re.compile(r'"experiment"\s*:')
+_STATUS_KEY = re.compile(r'"status"\s*:')
+
+
+def _open_for_reading(path: str) -> IO[str]:
+    with open(path, "rb") as f:
+        magic = f.read(len(XZ_MAGIC))
+
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, "rt", encoding="utf-8")
+    elif magic.startswith(XZ_MAGIC):
+        return lzma.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def _iter_records(first_line: str, f: IO[str]) -> Iterator[Dict[str, Any]]:
+    yield json.loads(first_line)
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _journal_from_records(records: Iterator[Dict[str, Any]]) -> Journal:
+    journal = None
+    streamed = False
+    # probes of the continuous iteration not recorded as over yet
+    during = []
+    for record in records:
+        record_type = record.get("type")
+        if record_type == "journal":
+            journal = record["journal"]
+            journal.setdefault("run", [])
+        elif record_type == "run":
+            journal["run"].append(record["run"])
+        elif record_type == "started":
+            streamed = True
+            journal = record["journal"]
+            journal["status"] = "interrupted"
+            journal.setdefault("run", [])
+            journal.setdefault("rollbacks", [])
+            journal.setdefault("steady_states", {})
+        elif record_type == "activity":
+            run = record["run"]
+            phase = record.get("phase")
+            if phase == "method":
+                journal["run"].append(run)
+            elif phase == "rollbacks":
+                journal["rollbacks"].append(run)
+            elif phase == "hypothesis-continuous":
+                during.append(run)
+            elif phase in ("hypothesis-before", "hypothesis-after"):
+                key = phase.split("-", 1)[1]
+                state = journal["steady_states"].get(key) or {"probes": []}
+                state["probes"].append(run)
+                journal["steady_states"][key] = state
+        elif record_type == "phase" and streamed:
+            phase = record.get("phase")
+            if phase in ("hypothesis-before", "hypothesis-after"):
+                key = phase.split("-", 1)[1]
+                state = journal["steady_states"].get(key) or {"probes": []}
+                state["steady_state_met"] = record.get("steady_state_met")
+                journal["steady_states"][key] = state
+            elif phase == "hypothesis-continuous":
+                journal["steady_states"].setdefault("during", []).append(
+                    {
+                        "steady_state_met": record.get("steady_state_met"),
+                        "probes": during,
+                    }
+                )
+                during = []
+        elif record_type == "finished":
+            for key in ("status", "deviated", "end", "duration"):
+                journal[key] = record.get(key)
+
+    return journal
+
+
+class _KeepOpen:
+    # let us use the standard output as a context manager without closing it
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def __enter__(self) -> TextIO:
+        return self.stream
+
+    def __exit__(self, exc_type: Any, exc_value: Any, tb: Any) -> None:
+        self.stream.flush()
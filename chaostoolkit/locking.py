@@ -0,0 +1,48 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+__all__ = ["lock_file"]
+
+LOCK_TIMEOUT = 30.0
+
+
+@contextmanager
+def lock_file(path: str, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+    """
+    Hold an exclusive advisory lock on the file at `path`, so processes
+    changing it do so one at a time.
+
+    The lock is taken with `fcntl.flock` on a `.lock` file next to it, as
+    files written atomically are replaced on each write. Raises
+    `TimeoutError` when the lock could not be taken within `timeout`
+    seconds. Where `fcntl` is not available, nothing is locked.
+    """
+    if fcntl is None:  # pragma: no cover
+        yield
+        return
+
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(
+                        f"Could not lock '{path}' within {timeout}s"
+                    )
+                time.sleep(0.05)
+        yield
+    finally:
+        os.close(fd)
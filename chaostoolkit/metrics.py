@@ -0,0 +1,321 @@
+import logging
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+from chaoslib.run import RunEventHandler
+from chaoslib.types import Activity, Experiment, Journal, Run
+
+from chaostoolkit.locking import lock_file
+
+__all__ = ["MetricsCollector", "MetricsServer", "OPENMETRICS_CONTENT_TYPE"]
+
+OPENMETRICS_CONTENT_TYPE = (
+    "application/openmetrics-text; version=1.0.0; charset=utf-8"
+)
+# metric family: (type, help)
+METRICS = {
+    "chaostoolkit_runs": ("counter", "Experiment runs, by final status."),
+    "chaostoolkit_runs_deviated": (
+        "counter",
+        "Experiment runs whose steady-state hypothesis deviated.",
+    ),
+    "chaostoolkit_run_in_progress": (
+        "gauge",
+        "Whether the experiment is currently running.",
+    ),
+    "chaostoolkit_run_duration_seconds": (
+        "summary",
+        "Duration of experiment runs.",
+    ),
+    "chaostoolkit_last_run_duration_seconds": (
+        "gauge",
+        "Duration of the last run of the experiment.",
+    ),
+    "chaostoolkit_activity_duration_seconds": (
+        "summary",
+        "Duration of activities, by status.",
+    ),
+    "chaostoolkit_journal_size_bytes": (
+        "gauge",
+        "Size of the last journal saved for the experiment.",
+    ),
+}
+CUMULATIVE_TYPES = ("counter", "summary")
+logger = logging.getLogger("chaostoolkit")
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Labels]
+
+
+class MetricsCollector(RunEventHandler):
+    """
+    Collect OpenMetrics samples about an experiment run from its execution
+    events and its journal.
+
+    Every sample carries the title of the experiment as its `experiment`
+    label. Counters and summaries only cover the run being collected, use
+    `write_textfile` to add them to those saved by previous runs.
+    """
+
+    def __init__(self):
+        self.experiment = ""
+        self._lock = threading.Lock()
+        self._values: Dict[Sample, float] = {}
+
+    def started(self, experiment: Experiment, journal: Journal) -> None:
+        self.experiment = experiment.get("title") or ""
+        self.set("chaostoolkit_run_in_progress", 1)
+
+    def activity_completed(self, activity: Activity, run: Run) -> None:
+        if not run:
+            return
+        labels = {
+            "activity": activity.get("name", ""),
+            "type": activity.get("type", ""),
+            "status": run.get("status", ""),
+        }
+        self.observe(
+            "chaostoolkit_activity_duration_seconds",
+            run.get("duration") or 0.0,
+            **labels,
+        )
+
+    def finish(self, journal: Journal) -> None:
+        duration = journal.get("duration") or 0.0
+        self.set("chaostoolkit_run_in_progress", 0)
+        self.inc("chaostoolkit_runs", status=journal.get("status", ""))
+        deviated = journal.get("deviated", False)
+        self.inc("chaostoolkit_runs_deviated", 1 if deviated else 0)
+        self.observe("chaostoolkit_run_duration_seconds", duration)
+        self.set("chaostoolkit_last_run_duration_seconds", duration)
+
+    def journal_saved(self, path: str) -> None:
+        if path == "-":
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self.set("chaostoolkit_journal_size_bytes", size)
+
+    def inc(self, family: str, amount: float = 1, **labels: str) -> None:
+        self._add(f"{family}_total", amount, labels)
+
+    def set(self, family: str, value: float, **labels: str) -> None:
+        key = (family, self._labels(labels))
+        with self._lock:
+            self._values[key] = value
+
+    def observe(self, family: str, value: float, **labels: str) -> None:
+        self._add(f"{family}_sum", value, labels)
+        self._add(f"{family}_count", 1, labels)
+
+    def samples(self) -> Dict[Sample, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> str:
+        """
+        The collected samples in the OpenMetrics text format.
+        """
+        return render_samples(self.samples())
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Atomically write the samples at `path`, for the textfile collector of
+        the Prometheus node exporter.
+
+        Counters and summaries already in that file are incremented rather
+        than replaced, so they keep counting across runs. Samples of other
+        experiments are kept as-is. The file is locked meanwhile, see
+        `lock_file`, so concurrent runs do not lose each other's samples.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with lock_file(path):
+            samples = parse_samples(path)
+            for key, value in self.samples().items():
+                sample_name = key[0]
+                if _family_type(sample_name) in CUMULATIVE_TYPES:
+                    samples[key] = samples.get(key, 0) + value
+                else:
+                    samples[key] = value
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(render_samples(samples))
+            os.replace(tmp_path, path)
+
+    def _add(self, sample_name: str, amount: float, labels: Dict[str, str]):
+        key = (sample_name, self._labels(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _labels(self, labels: Dict[str, str]) -> Labels:
+        labels = dict(labels, experiment=self.experiment)
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsServer:
+    """
+    Serve the samples of a `MetricsCollector` on `/metrics` from a
+    background thread, for Prometheus to scrape while the run is live.
+
+    It binds to `host`, the loopback interface by default, and `port`. Use
+    port `0` to let the system pick a free one, see `port` once started.
+    """
+
+    def __init__(
+        self, collector: MetricsCollector, port: int, host: str = "127.0.0.1"
+    ):
+        self.collector = collector
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsServer":
+        collector = self.collector
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = collector.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(f"Metrics endpoint: {format % args}")
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="chaostoolkit-metrics",
+            daemon=True,
+        )
+        self._thread.start()
+        logger.debug(
+            f"Serving metrics on http://{self.host}:{self.port}/metrics"
+        )
+        return self
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+
+
+def render_samples(samples: Dict[Sample, float]) -> str:
+    """
+    Render `samples` in the OpenMetrics text format, grouped by family.
+    """
+    families: Dict[str, list] = {}
+    for (sample_name, labels), value in samples.items():
+        family = _family_of(sample_name)
+        families.setdefault(family, []).append((sample_name, labels, value))
+
+    lines = []
+    for family in sorted(families, key=_family_order):
+        metric_type, help_text = METRICS.get(family, ("unknown", ""))
+        if help_text:
+            lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        for sample_name, labels, value in sorted(families[family]):
+            lines.append(
+                f"{sample_name}{_format_labels(labels)} {_format_value(value)}"
+            )
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def parse_samples(path: str) -> Dict[Sample, float]:
+    """
+    Read back the samples of a file written by `render_samples`. A missing
+    or unreadable file has none.
+    """
+    samples = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                m = _SAMPLE_RE.match(line)
+                if not m:
+                    continue
+                labels = tuple(
+                    sorted(
+                        (k, _unescape(v))
+                        for k, v in _LABEL_RE.findall(m.group(2) or "")
+                    )
+                )
+                try:
+                    samples[(m.group(1), labels)] = float(m.group(3))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return samples
+
+
+###############################################################################
+# Internals
+###############################################################################
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)$")
+_LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def _family_of(sample_name: str) -> str:
+    if sample_name in METRICS:
+        return sample_name
+    for suffix in ("_total", "_sum", "_count"):
+        if sample_name.endswith(suffix):
+            family = sample_name[: -len(suffix)]
+            if family in METRICS:
+                return family
+    return sample_name
+
+
+def _family_type(sample_name: str) -> str:
+    return METRICS.get(_family_of(sample_name), ("unknown", ""))[0]
+
+
+def _family_order(family: str) -> Tuple[int, str]:
+    names = list(METRICS)
+    return (names.index(family) if family in names else len(names), family)
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(
+        r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value
+    )
@@ -0,0 +1,323 @@
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+import requests
+from chaoslib import PayloadEncoder
+from chaoslib.notification import (
+    DiscoverFlowEvent,
+    FlowEvent,
+    InitFlowEvent,
+    RunFlowEvent,
+    ValidateFlowEvent,
+    notify_via_plugin,
+)
+from chaoslib.types import EventPayload, Settings
+
+__all__ = [
+    "NotificationDispatcher",
+    "flush_notifications",
+    "get_dispatcher",
+    "notify",
+]
+
+NOTIFICATION_QUEUE_SIZE = 64
+NOTIFICATION_TIMEOUT = (2, 5)
+NOTIFICATION_FLUSH_DEADLINE = 5.0
+logger = logging.getLogger("chaostoolkit")
+
+
+def notify(
+    settings: Settings,
+    event: FlowEvent,
+    payload: Any = None,
+    error: Any = None,
+) -> None:
+    """
+    Send the `event` to the notification channels declared in the settings,
+    like `chaoslib.notification.notify` does, but without waiting for them.
+
+    See `NotificationDispatcher` for how notifications are delivered.
+    """
+    get_dispatcher().notify(settings, event, payload, error)
+
+
+def flush_notifications(timeout: float = NOTIFICATION_FLUSH_DEADLINE) -> bool:
+    """
+    Wait up to `timeout` seconds for pending notifications to be delivered.
+    Returns whether all of them were.
+    """
+    if _dispatcher is None:
+        return True
+    return _dispatcher.flush(timeout)
+
+
+def get_dispatcher() -> "NotificationDispatcher":
+    """
+    The dispatcher of this process, created on first use. Pending
+    notifications are flushed when the process exits, for at most
+    `NOTIFICATION_FLUSH_DEADLINE` seconds.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher()
+            atexit.register(_dispatcher.close)
+        return _dispatcher
+
+
+class NotificationDispatcher:
+    """
+    Deliver notifications from background threads so slow channels do not
+    hold the experiment back.
+
+    Each channel gets its own worker thread and a queue of at most
+    `queue_size` events, the oldest ones being dropped once full. A worker
+    takes all the events pending for its channel at once and coalesces them:
+    only the latest event of a given name, about the same payload object,
+    such as the experiment or journal of a run, is sent, with the number of
+    events it replaced in its `"coalesced"` entry. HTTP channels setting
+    `batch` to `true` receive those events as a single JSON list.
+
+    HTTP channels may set their own `timeout`, in seconds, either a single
+    number or a `[connect, read]` pair. Plugin channels cannot be
+    interrupted, but only hold back their own worker.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = NOTIFICATION_QUEUE_SIZE,
+        flush_deadline: float = NOTIFICATION_FLUSH_DEADLINE,
+    ):
+        self.queue_size = queue_size
+        self.flush_deadline = flush_deadline
+        self._lock = threading.Lock()
+        self._workers: Dict[str, _ChannelWorker] = {}
+
+    def notify(
+        self,
+        settings: Settings,
+        event: FlowEvent,
+        payload: Any = None,
+        error: Any = None,
+    ) -> None:
+        if not settings:
+            return
+
+        notification_channels = settings.get("notifications")
+        if not notification_channels:
+            return
+
+        event_payload = None
+        for channel in notification_channels:
+            events = channel.get("events")
+            if events and event.value not in events:
+                continue
+
+            if event_payload is None:
+                event_payload = make_event_payload(event, payload, error)
+            self._worker_for(channel).put(payload, event_payload)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait up to `timeout` seconds, `flush_deadline` by default, for all
+        pending notifications to be delivered.
+        """
+        timeout = self.flush_deadline if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            workers = list(self._workers.values())
+
+        done = True
+        for worker in workers:
+            done = worker.wait(max(0.0, deadline - time.monotonic())) and done
+        return done
+
+    def close(self) -> None:
+        if not self.flush():
+            logger.debug("Gave up waiting for pending notifications")
+
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            if worker.dropped:
+                logger.debug(
+                    f"Dropped {worker.dropped} notifications, too many were "
+                    "pending"
+                )
+
+    def _worker_for(self, channel: Dict[str, Any]) -> "_ChannelWorker":
+        key = json.dumps(channel, sort_keys=True, default=str)
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = _ChannelWorker(channel, self.queue_size)
+                self._workers[key] = worker
+            return worker
+
+
+def make_event_payload(
+    event: FlowEvent, payload: Any = None, error: Any = None
+) -> EventPayload:
+    """
+    The payload sent to channels for the `event`, as
+    `chaoslib.notification.notify` builds it.
+
+    The top level of the `payload` is copied, which is cheap, so it can be
+    sent later on even if the caller keeps setting its entries, such as the
+    status of a journal. Nested values are shared with the caller.
+    """
+    if isinstance(payload, dict):
+        payload = dict(payload)
+    elif isinstance(payload, list):
+        payload = list(payload)
+
+    event_payload = {
+        "name": event.value,
+        "payload": payload,
+        "phase": _PHASES.get(event.__class__, "unknown"),
+        "ts": datetime.now(timezone.utc).timestamp(),
+    }
+    if error:
+        event_payload["error"] = error
+    return event_payload
+
+
+def notify_with_http(
+    channel: Dict[str, Any],
+    payload: Union[EventPayload, List[EventPayload]],
+) -> None:
+    """
+    Call a notification endpoint over HTTP, like
+    `chaoslib.notification.notify_with_http` does, with the `timeout` of the
+    channel.
+    """
+    url = channel.get("url")
+    if not url:
+        logger.debug("missing url in notification channel")
+        return
+
+    headers = channel.get("headers")
+    verify_tls = channel.get("verify_tls", True)
+    timeout = _timeout(channel.get("timeout"))
+    try:
+        if channel.get("forward_event_payload", True):
+            resp = requests.post(
+                url,
+                headers=headers,
+                verify=verify_tls,
+                timeout=timeout,
+                json=json.loads(json.dumps(payload, cls=PayloadEncoder)),
+            )
+        else:
+            resp = requests.get(
+                url, headers=headers, verify=verify_tls, timeout=timeout
+            )
+        resp.raise_for_status()
+    except requests.HTTPError as ex:
+        logger.debug(f"notification sent to {url} failed with: {ex}")
+    except Exception as ex:
+        logger.debug("failed calling notification endpoint", exc_info=ex)
+
+
+###############################################################################
+# Internals
+###############################################################################
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+_PHASES = {
+    DiscoverFlowEvent: "discovery",
+    InitFlowEvent: "init",
+    RunFlowEvent: "run",
+    ValidateFlowEvent: "validate",
+}
+
+
+class _ChannelWorker:
+    def __init__(self, channel: Dict[str, Any], queue_size: int):
+        self.channel = channel
+        self.queue_size = queue_size
+        self.dropped = 0
+        # the payload given by the caller, kept alive to coalesce on its id,
+        # and the event payload to send
+        self._pending: Deque[Tuple[Any, EventPayload]] = deque()
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="chaostoolkit-notification", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, source: Any, event_payload: EventPayload) -> None:
+        with self._cond:
+            if len(self._pending) >= self.queue_size:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((source, event_payload))
+            self._cond.notify_all()
+
+    def wait(self, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._busy, timeout
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                batch = list(self._pending)
+                self._pending.clear()
+                self._busy = True
+
+            try:
+                self._send(_coalesce(batch))
+            except Exception:
+                logger.debug("Failed sending notifications", exc_info=True)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _send(self, batch: List[EventPayload]) -> None:
+        channel_type = self.channel.get("type")
+        if channel_type == "http":
+            if self.channel.get("batch") and len(batch) > 1:
+                notify_with_http(self.channel, batch)
+                return
+            for event_payload in batch:
+                notify_with_http(self.channel, event_payload)
+        elif channel_type == "plugin":
+            for event_payload in batch:
+                notify_via_plugin(self.channel, event_payload)
+
+
+def _coalesce(batch: List[Tuple[Any, EventPayload]]) -> List[EventPayload]:
+    # events of distinct runs have distinct payloads, all alive in the batch
+    latest: Dict[Tuple[str, str, int], EventPayload] = OrderedDict()
+    counts: Dict[Tuple[str, str, int], int] = {}
+    for source, event_payload in batch:
+        key = (event_payload["phase"], event_payload["name"], id(source))
+        latest.pop(key, None)
+        latest[key] = event_payload
+        counts[key] = counts.get(key, 0) + 1
+
+    coalesced = []
+    for key, event_payload in latest.items():
+        if counts[key] > 1:
+            event_payload = dict(event_payload, coalesced=counts[key] - 1)
+        coalesced.append(event_payload)
+    return coalesced
+
+
+def _timeout(value: Any) -> Any:
+    if value is None:
+        return NOTIFICATION_TIMEOUT
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return value
@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List
+
+from chaoslib.settings import CHAOSTOOLKIT_CONFIG_PATH
+
+try:
+    import importlib.metadata as importlib_metadata
+except ImportError:
+    import importlib_metadata
+
+__all__ = [
+    "CLI_PLUGINS_GROUP",
+    "get_cli_plugins_index_path",
+    "load_cli_plugins",
+]
+
+CLI_PLUGINS_GROUP = "chaostoolkit.cli_plugins"
+CLI_PLUGINS_INDEX_FILENAME = "cli-plugins.json"
+logger = logging.getLogger("chaostoolkit")
+
+
+def get_cli_plugins_index_path() -> str:
+    """
+    Path of the index of CLI plugins, in the cache directory next to the
+    default settings file. Plugins are registered before the `--settings`
+    flag is even parsed.
+    """
+    return os.path.join(
+        os.path.dirname(CHAOSTOOLKIT_CONFIG_PATH),
+        "cache",
+        CLI_PLUGINS_INDEX_FILENAME,
+    )
+
+
+def load_cli_plugins(index_path: str = None) -> List[Any]:
+    """
+    Entry points of the `chaostoolkit.cli_plugins` group.
+
+    Finding them means reading the metadata of every installed distribution,
+    so they are indexed in a small file at `index_path`. The index is used as
+    long as the directories of `sys.path` were not modified since, which is
+    what installing, upgrading or removing a distribution does. Remove the
+    file to force a new scan.
+    """
+    if not index_path:
+        return _scan_entry_points()
+
+    fingerprint = _fingerprint()
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+        if index.get("fingerprint") == fingerprint:
+            return [
+                importlib_metadata.EntryPoint(
+                    name=ep["name"], value=ep["value"], group=ep["group"]
+                )
+                for ep in index["entry_points"]
+            ]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    entry_points = _scan_entry_points()
+    _write_index(
+        index_path,
+        {
+            "fingerprint": fingerprint,
+            "entry_points": [
+                {"name": ep.name, "value": ep.value, "group": ep.group}
+                for ep in entry_points
+            ],
+        },
+    )
+    return entry_points
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _fingerprint() -> List[Any]:
+    # adding or removing a distribution changes the mtime of its directory.
+    # The current directory is left out, it changes from run to run and
+    # its files are touched all the time
+    paths = [sys.version]
+    cwd = os.getcwd()
+    for path in sys.path:
+        if not path or os.path.abspath(path) == cwd:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        paths.append([path, st.st_mtime_ns])
+    return paths
+
+
+def _scan_entry_points() -> List[Any]:
+    # knowing which version of importlib is actually installed is dark magic
+    # because everyone wants a different versions that may not compatible
+    # between each other. Easier to just see what works and what doesn't here.
+    # https://github.com/python/importlib_metadata/issues/411#issuecomment-1494336052
+    try:
+        entry_points = importlib_metadata.entry_points().get(CLI_PLUGINS_GROUP)
+    except AttributeError:
+        entry_points = importlib_metadata.entry_points(group=CLI_PLUGINS_GROUP)
+    return list(entry_points or [])
+
+
+def _write_index(path: str, index: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.debug(f"Failed to write plugins index '{path}'", exc_info=True)
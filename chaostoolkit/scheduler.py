@@ -0,0 +1,569 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from chaostoolkit.sources import normalize_keys, resolve_path, source_name
+
+__all__ = [
+    "CronExpression",
+    "ScheduledExperiment",
+    "Scheduler",
+    "load_schedule",
+    "parse_duration",
+]
+
+CATCH_UP_POLICIES = ("skip", "once", "all")
+# how late, in seconds, a firing may be before it counts as missed
+MISFIRE_GRACE = 60.0
+# missed firings of an experiment which the "all" policy runs at most
+MAX_CATCH_UP = 100
+# longest sleep of the scheduler, so it notices clock changes in time
+MAX_SLEEP = 60.0
+# options of `chaos run` an experiment of the schedule may set
+RUN_OPTIONS = (
+    "var",
+    "var_file",
+    "dry",
+    "no_validation",
+    "no_verify_tls",
+    "rollback_strategy",
+    "hypothesis_strategy",
+    "hypothesis_frequency",
+    "fail_fast",
+)
+CRON_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+logger = logging.getLogger("chaostoolkit")
+
+Submit = Callable[["ScheduledExperiment", float], Future]
+
+
+def parse_duration(value: Any) -> float:
+    """
+    A duration in seconds, from a number of seconds or a string such as
+    `"30s"`, `"5m"`, `"1h"` or `"1d"`.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+    elif isinstance(value, str) and value.strip():
+        value = value.strip()
+        unit = DURATION_UNITS.get(value[-1].lower())
+        try:
+            if unit:
+                seconds = float(value[:-1]) * unit
+            else:
+                seconds = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid duration '{value}'")
+    else:
+        raise ValueError(f"Invalid duration '{value}'")
+
+    if seconds < 0:
+        raise ValueError(f"Durations cannot be negative, got '{value}'")
+    return seconds
+
+
+class CronExpression:
+    """
+    A cron expression of five fields, minute, hour, day of the month, month
+    and day of the week, or one of the `@hourly`, `@daily`, `@weekly`,
+    `@monthly` and `@yearly` aliases. Times are local.
+
+    Fields support `*`, values, `a-b` ranges, `/n` steps and comma-separated
+    lists. Months and days of the week may be named, such as `jan` or `mon`,
+    and Sunday is either 0 or 7. As with cron, when both days of the month
+    and days of the week are restricted, either of them may match.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(
+                f"Cron expressions have 5 fields, got '{expression}'"
+            )
+
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12, _MONTHS)
+        self.weekdays = {
+            d % 7 for d in _parse_cron_field(fields[4], 0, 7, _WEEKDAYS)
+        }
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def next_after(self, timestamp: float) -> float:
+        """
+        The UNIX timestamp of the first time after `timestamp` matching the
+        expression.
+        """
+        start = datetime.fromtimestamp(timestamp)
+        dt = start.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # about the longest a valid expression, such as 29 Feb, may wait
+        horizon = start.year + 9
+        while dt.year <= horizon:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1) + timedelta(days=32)).replace(
+                    day=1, hour=0, minute=0
+                )
+            elif not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt.timestamp()
+
+        raise ValueError(f"'{self.expression}' never matches")
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day = dt.day in self.days
+        weekday = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+
+class ScheduledExperiment:
+    """
+    An experiment of a schedule, firing on a `cron` expression or `every`
+    so many seconds, at most `jitter` seconds late. See `Scheduler` for the
+    `catch_up` policy.
+
+    `options` are passed to the run, along with the `journal_path`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        cron: str = None,
+        every: float = None,
+        jitter: float = 0.0,
+        catch_up: str = "skip",
+        journal_path: str = None,
+        options: Dict[str, Any] = None,
+    ):
+        if (cron is None) == (every is None):
+            raise ValueError(
+                f"Experiment '{name}' needs either a cron expression or an "
+                "interval"
+            )
+        if every is not None and every <= 0:
+            raise ValueError(f"The interval of '{name}' must be positive")
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(
+                f"Unknown catch-up policy '{catch_up}' of '{name}', expected "
+                f"one of {', '.join(CATCH_UP_POLICIES)}"
+            )
+
+        self.name = name
+        self.source = source
+        self.cron = CronExpression(cron) if cron is not None else None
+        self.every = every
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.journal_path = journal_path
+        self.options = options or {}
+
+    def next_after(self, timestamp: float) -> float:
+        if self.cron:
+            return self.cron.next_after(timestamp)
+        return timestamp + self.every
+
+
+def load_schedule(
+    path: str,
+) -> Tuple[List[ScheduledExperiment], Dict[str, Any]]:
+    """
+    Load the experiments of the schedule file at `path`, in JSON or YAML,
+    and its top-level settings: `max_concurrency`, and the defaults of the
+    experiments, `jitter`, `catch_up` and `journal_path`.
+
+        max_concurrency: 2
+        jitter: 30s
+        experiments:
+          - source: experiments/latency.json
+            cron: "*/15 * * * *"
+          - source: experiments/failover.yaml
+            every: 1h
+            catch_up: once
+            var:
+              region: eu-west-1
+
+    Relative experiment and var file paths are relative to the schedule
+    file. Keys may be spelled with dashes or underscores.
+    """
+    with open(path) as f:
+        if path.lower().endswith(".json"):
+            doc = json.load(f)
+        else:
+            doc = yaml.safe_load(f)
+
+    if not isinstance(doc, dict) or not isinstance(
+        doc.get("experiments"), list
+    ):
+        raise ValueError(f"'{path}' does not declare a list of experiments")
+
+    doc = normalize_keys(doc)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = {
+        "jitter": parse_duration(doc.get("jitter", 0)),
+        "catch_up": doc.get("catch_up", "skip"),
+        "journal_path": doc.get("journal_path"),
+    }
+    config = {"max_concurrency": doc.get("max_concurrency")}
+
+    experiments = []
+    names: Set[str] = set()
+    for index, entry in enumerate(doc["experiments"], 1):
+        if not isinstance(entry, dict) or not entry.get("source"):
+            raise ValueError(f"Experiment #{index} has no source")
+        entry = normalize_keys(entry)
+        known = {"name", "source", "cron", "every", "jitter", "catch_up"}
+        known.update(("journal_path",), RUN_OPTIONS)
+        unknown = sorted(set(entry) - known)
+        if unknown:
+            raise ValueError(
+                f"Unknown keys of experiment #{index}: {', '.join(unknown)}"
+            )
+
+        source = resolve_path(base_dir, entry["source"])
+        name = entry.get("name") or source_name(source)
+        if name in names:
+            raise ValueError(
+                f"Experiment #{index} is named '{name}' as another one, "
+                "give them a distinct name"
+            )
+        names.add(name)
+
+        options = {k: entry[k] for k in RUN_OPTIONS if k in entry}
+        if "var_file" in options:
+            var_files = options["var_file"]
+            if isinstance(var_files, str):
+                var_files = [var_files]
+            options["var_file"] = [resolve_path(base_dir, p) for p in var_files]
+
+        every = entry.get("every")
+        experiments.append(
+            ScheduledExperiment(
+                name,
+                source,
+                cron=entry.get("cron"),
+                every=parse_duration(every) if every is not None else None,
+                jitter=parse_duration(entry.get("jitter", defaults["jitter"])),
+                catch_up=entry.get("catch_up", defaults["catch_up"]),
+                journal_path=entry.get(
+                    "journal_path", defaults["journal_path"]
+                ),
+                options=options,
+            )
+        )
+
+    return experiments, config
+
+
+class Scheduler:
+    """
+    Fire the runs of `experiments` when they are due, through `submit`,
+    which is given the experiment and the time it was scheduled for and
+    returns the future of its summary.
+
+    At most `max_concurrency` runs happen at once, firings waiting for a
+    slot are queued. An experiment never overlaps itself: a firing due
+    while the previous run is still going, or waiting, is skipped.
+
+    Firings more than `MISFIRE_GRACE` seconds late, because the scheduler
+    was not running or was busy, are missed and handled according to the
+    `catch_up` policy of each experiment:
+
+    * `skip` forgets about them
+    * `once` runs the experiment once for all of them
+    * `all` runs it once for each of them, one after the other, up to
+      `MAX_CATCH_UP` times
+
+    The time of the last firing and the outcome of the last run of each
+    experiment are saved to `state_path`, so missed firings are caught up
+    when the scheduler starts again. An experiment with no such history
+    first fires on its next cron time or, for an interval, right away.
+    """
+
+    def __init__(
+        self,
+        experiments: List[ScheduledExperiment],
+        submit: Submit,
+        max_concurrency: int = 1,
+        state_path: str = None,
+        clock: Callable[[], float] = time.time,
+        rng: random.Random = None,
+    ):
+        self.experiments = {e.name: e for e in experiments}
+        self.submit = submit
+        self.max_concurrency = max_concurrency
+        self.state_path = state_path
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.state = _load_state(state_path)
+        self._next: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+        self._pending: List[Tuple[ScheduledExperiment, float]] = []
+        self._running: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def start(self, now: float) -> None:
+        """
+        Plan the first firing of each experiment, from its history.
+        """
+        with self._lock:
+            for name, experiment in self.experiments.items():
+                last = self.state.get(name, {}).get("last_scheduled")
+                if last is not None:
+                    self._plan(experiment, experiment.next_after(last))
+                elif experiment.every:
+                    self._plan(experiment, now)
+                else:
+                    self._plan(experiment, experiment.next_after(now))
+
+    def tick(self, now: float) -> float:
+        """
+        Fire the experiments due at `now` and return how long to wait until
+        the next one is.
+        """
+        with self._lock:
+            for name, experiment in self.experiments.items():
+                if self._next[name] + self._delays[name] <= now:
+                    self._fire(experiment, now)
+            self._dispatch(now)
+
+            if not self._next:
+                return MAX_SLEEP
+            due = min(t + self._delays[n] for n, t in self._next.items())
+            return min(max(due - now, 0), MAX_SLEEP)
+
+    def run_forever(self) -> None:
+        """
+        Fire experiments until `stop` is called, from another thread or a
+        signal handler.
+        """
+        self.start(self.clock())
+        while not self._stopped:
+            delay = self.tick(self.clock())
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+    def stop(self) -> None:
+        """
+        Stop firing experiments. Runs already submitted are not cancelled
+        but the queued ones are dropped.
+        """
+        self._stopped = True
+        self._wakeup.set()
+        with self._lock:
+            for experiment, _ in self._pending:
+                logger.info(f"Dropping the queued run of '{experiment.name}'")
+            self._pending = []
+
+    def next_firings(self) -> Dict[str, float]:
+        """
+        When each experiment is next due, jitter included.
+        """
+        with self._lock:
+            return {n: t + self._delays[n] for n, t in self._next.items()}
+
+    def running(self) -> List[str]:
+        with self._lock:
+            return list(self._running)
+
+    def _plan(self, experiment: ScheduledExperiment, at: float) -> None:
+        self._next[experiment.name] = at
+        self._delays[experiment.name] = (
+            self.rng.uniform(0, experiment.jitter) if experiment.jitter else 0
+        )
+
+    def _fire(self, experiment: ScheduledExperiment, now: float) -> None:
+        # only the most recent firings may run, however long it has been
+        firings = deque(maxlen=MAX_CATCH_UP + 1)
+        count = 0
+        at = self._next[experiment.name]
+        while at <= now:
+            firings.append(at)
+            count += 1
+            at = experiment.next_after(at)
+        self._plan(experiment, at)
+
+        grace = MISFIRE_GRACE + experiment.jitter
+        on_time = [f for f in firings if now - f <= grace]
+        missed = count - len(on_time)
+        firings = list(firings)
+        if experiment.catch_up == "once":
+            firings = firings[-1:]
+        elif experiment.catch_up == "skip":
+            firings = on_time[-1:]
+
+        if missed:
+            logger.warning(
+                f"'{experiment.name}' missed {missed} firings, "
+                f"{experiment.catch_up} policy: running it "
+                f"{len(firings)} times"
+            )
+
+        for at in firings:
+            busy = experiment.name in self._running or any(
+                e.name == experiment.name for e, _ in self._pending
+            )
+            if busy and experiment.catch_up != "all":
+                logger.warning(
+                    f"Skipping '{experiment.name}', its previous run is "
+                    "not over yet"
+                )
+                continue
+            self._pending.append((experiment, at))
+
+    def _dispatch(self, now: float) -> None:
+        waiting = []
+        dispatched = False
+        for experiment, at in self._pending:
+            # stop() may run in a signal handler while dispatching
+            if self._stopped:
+                break
+            name = experiment.name
+            if name in self._running or len(self._running) >= (
+                self.max_concurrency
+            ):
+                waiting.append((experiment, at))
+                continue
+
+            logger.info(f"Running '{name}'")
+            future = self.submit(experiment, at)
+            dispatched = True
+            self._running[name] = future
+            self.state[name] = dict(
+                self.state.get(name, {}), last_scheduled=at, last_start=now
+            )
+            future.add_done_callback(
+                lambda f, name=name: self._completed(name, f)
+            )
+        self._pending = [] if self._stopped else waiting
+        if dispatched:
+            _save_state(self.state_path, self.state)
+
+    def _completed(self, name: str, future: Future) -> None:
+        if future.cancelled():
+            result = {"status": "cancelled", "exit_code": 1}
+        elif future.exception() is not None:
+            logger.error(f"Run of '{name}' failed: {future.exception()}")
+            result = {"status": "error", "exit_code": 1}
+        else:
+            result = future.result()
+
+        log = logger.error if result.get("exit_code") else logger.info
+        status = result.get("status")
+        if result.get("deviated"):
+            status = f"{status} (deviated)"
+        log(f"'{name}': {status}")
+
+        with self._lock:
+            self._running.pop(name, None)
+            entry = self.state.setdefault(name, {})
+            entry.update(
+                last_end=self.clock(),
+                last_status=result.get("status"),
+                last_deviated=result.get("deviated", False),
+                runs=entry.get("runs", 0) + 1,
+            )
+            _save_state(self.state_path, self.state)
+        # queued firings may now have a slot
+        self._wakeup.set()
+
+
+###############################################################################
+# Internals
+###############################################################################
+_MONTHS = (
+    "jan feb mar apr may jun jul aug sep oct nov dec".split(),
+    1,
+)
+_WEEKDAYS = ("sun mon tue wed thu fri sat".split(), 0)
+
+
+def _parse_cron_field(
+    field: str, low: int, high: int, names: Tuple[List[str], int] = None
+) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.lower().split(","):
+        expr, _, step = part.partition("/")
+        try:
+            step = int(step) if step else 1
+            if expr == "*":
+                start, end = low, high
+            elif "-" in expr:
+                start, end = (_cron_value(v, names) for v in expr.split("-"))
+            else:
+                start = _cron_value(expr, names)
+                end = high if step > 1 else start
+        except ValueError:
+            raise ValueError(f"Invalid cron field '{field}'")
+
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(
+                f"Invalid cron field '{field}', expected values from {low} "
+                f"to {high}"
+            )
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _cron_value(value: str, names: Tuple[List[str], int] = None) -> int:
+    if names and value in names[0]:
+        return names[0].index(value) + names[1]
+    return int(value)
+
+
+def _load_state(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning(f"Ignoring unreadable schedule state '{path}'")
+        return {}
+    return state.get("experiments", {}) if isinstance(state, dict) else {}
+
+
+def _save_state(path: Optional[str], state: Dict[str, Dict[str, Any]]):
+    if not path:
+        return
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"experiments": state}, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning(f"Failed to save the schedule state '{path}'")
+        logger.debug("", exc_info=True)
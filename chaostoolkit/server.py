@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from chaostoolkit.encoding import dumps
+
+__all__ = ["ChaosServer", "get_socket_path", "send_request"]
+
+SOCKET_FILENAME = "chaostoolkit.sock"
+# messages which end the answer to a request
+FINAL_MESSAGES = ("result", "error")
+logger = logging.getLogger("chaostoolkit")
+
+Handler = Callable[[Dict[str, Any]], Iterator[Dict[str, Any]]]
+
+
+def get_socket_path(settings_path: str) -> str:
+    """
+    The socket of `chaos serve` lives next to the settings file by default.
+    """
+    return os.path.join(
+        os.path.dirname(os.path.abspath(settings_path)), SOCKET_FILENAME
+    )
+
+
+class ChaosServer:
+    """
+    Serve requests on a Unix socket, only accessible to the current user.
+
+    The protocol is newline-delimited JSON: a client sends a request as a
+    single JSON object on one line and the server answers with the messages
+    the `handler` yields for it, one JSON object per line. Each message has
+    a `"type"`, the last one being either `"result"` or `"error"`. A
+    connection may carry several requests, one after the other.
+
+    Each connection is served by its own thread.
+    """
+
+    def __init__(self, socket_path: str, handler: Handler):
+        self.socket_path = socket_path
+        self.handler = handler
+        self._server: Optional[socketserver.UnixStreamServer] = None
+
+    def start(self) -> "ChaosServer":
+        """
+        Bind the socket, replacing a stale one left by a server which did
+        not exit cleanly. Fails when another server is listening on it.
+        """
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise OSError(
+                    f"Another server is listening on {self.socket_path}"
+                )
+            os.unlink(self.socket_path)
+
+        directory = os.path.dirname(os.path.abspath(self.socket_path))
+        os.makedirs(directory, exist_ok=True)
+
+        handler = self.handler
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    for message in _answer(handler, line):
+                        self.wfile.write(dumps(message).encode("utf-8"))
+                        self.wfile.write(b"\n")
+                        self.wfile.flush()
+
+        umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(
+                self.socket_path, RequestHandler
+            )
+        finally:
+            os.umask(umask)
+        self._server.daemon_threads = True
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        """
+        Stop `serve_forever`, from another thread.
+        """
+        self._server.shutdown()
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.server_close()
+        self._server = None
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+def send_request(
+    socket_path: str, request: Dict[str, Any], timeout: float = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Send the `request` to the server listening on `socket_path` and yield
+    the messages it answers with, up to the final one.
+
+    Raises `OSError` when no server is listening and `ConnectionError` when
+    the server went away before its final message.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            for line in f:
+                message = json.loads(line)
+                yield message
+                if message.get("type") in FINAL_MESSAGES:
+                    return
+
+    raise ConnectionError("The server closed the connection")
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _answer(handler: Handler, line: bytes) -> Iterator[Dict[str, Any]]:
+    try:
+        request = json.loads(line)
+    except ValueError as x:
+        yield {"type": "error", "message": f"Invalid request: {x}"}
+        return
+
+    if not isinstance(request, dict):
+        yield {"type": "error", "message": "Requests must be JSON objects"}
+        return
+
+    try:
+        yield from handler(request)
+    except Exception as x:
+        logger.debug("Failed handling request", exc_info=True)
+        yield {"type": "error", "message": str(x)}
+
+
+def _is_listening(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
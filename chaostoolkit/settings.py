@@ -0,0 +1,495 @@
+import copy
+import hashlib
+import logging
+import marshal
+import os
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import yaml
+from chaoslib.exceptions import ChaosException
+from chaoslib.settings import (
+    CHAOSTOOLKIT_CONFIG_PATH,
+    loaded_settings,
+    locate_settings_entry,
+)
+from chaoslib.types import Settings
+
+from chaostoolkit import __version__
+from chaostoolkit.locking import lock_file
+
+__all__ = [
+    "InvalidSettings",
+    "SettingsConflict",
+    "apply_json_patch",
+    "apply_settings_changes",
+    "get_cache_dir",
+    "get_settings_cache_path",
+    "load_settings",
+    "lock_settings",
+    "save_settings",
+    "update_settings",
+]
+
+CACHE_DIRNAME = "cache"
+SETTINGS_CACHE_FORMAT = 2
+# files modified more recently than this, in nanoseconds, are not cached as
+# they may change again within the resolution of their modification time
+SETTINGS_CACHE_MIN_AGE = 2_000_000_000
+SETTINGS_LOCK_TIMEOUT = 30.0
+SETTINGS_UPDATE_RETRIES = 3
+logger = logging.getLogger("chaostoolkit")
+
+
+class InvalidSettings(ChaosException):
+    """
+    The settings file exists but does not hold valid settings.
+    """
+
+    pass
+
+
+class SettingsConflict(ChaosException):
+    """
+    The settings file changed between the moment it was read and the moment
+    it was about to be saved.
+    """
+
+    pass
+
+
+def get_cache_dir(settings_path: str) -> str:
+    """
+    Directory where the chaostoolkit keeps its caches, next to the settings
+    file.
+    """
+    return os.path.join(
+        os.path.dirname(os.path.abspath(settings_path)), CACHE_DIRNAME
+    )
+
+
+def get_settings_cache_path(settings_path: str, cache_dir: str = None) -> str:
+    """
+    The parsed snapshot of the settings file at `settings_path`, under the
+    `cache_dir` or, by default, the cache directory next to that file.
+    """
+    path = os.path.abspath(settings_path)
+    digest = hashlib.sha256(path.encode("utf-8")).hexdigest()[:16]
+    cache_dir = cache_dir or get_cache_dir(settings_path)
+    return os.path.join(cache_dir, "settings", f"{digest}.marshal")
+
+
+def load_settings(
+    settings_path: str = CHAOSTOOLKIT_CONFIG_PATH, cache_dir: str = None
+) -> Optional[Settings]:
+    """
+    Load the settings like `chaoslib.settings.load_settings` does, from a
+    parsed snapshot when the file did not change since it was last parsed.
+
+    Snapshots are kept in memory and marshalled under `cache_dir`, see
+    `get_settings_cache_path`, keyed by the path, modification time, size
+    and inode of the file. Unlike pickles, they cannot run code when read,
+    and those not owned by the current user, or writable by others, are
+    ignored. Files are parsed with the C YAML loader when available. Each
+    call returns its own copy of the settings, which callers are free to
+    modify.
+
+    Returns `None` when the file does not exist or is not valid YAML.
+    """
+    try:
+        stat = os.stat(settings_path)
+    except OSError:
+        logger.debug(
+            "The Chaos Toolkit settings file could not be found at "
+            f"'{settings_path}'."
+        )
+        return
+
+    key = (
+        SETTINGS_CACHE_FORMAT,
+        marshal.version,
+        __version__,
+        os.path.abspath(settings_path),
+        stat.st_mtime_ns,
+        stat.st_size,
+        stat.st_ino,
+    )
+    snapshot = _memory.get(key[3])
+    if snapshot is None or snapshot[0] != key:
+        cache_path = get_settings_cache_path(settings_path, cache_dir)
+        snapshot = _read_snapshot(cache_path, key)
+        if snapshot is None:
+            snapshot = _parse(settings_path, key)
+            if snapshot is None:
+                return
+            if time.time_ns() - stat.st_mtime_ns >= SETTINGS_CACHE_MIN_AGE:
+                _write_snapshot(cache_path, snapshot)
+        _memory[key[3]] = snapshot
+
+    settings = marshal.loads(snapshot[1])
+    if snapshot[2]:
+        settings = _decode_dates(settings)
+    loaded_settings.set(settings)
+    return settings
+
+
+def save_settings(
+    settings: Settings,
+    settings_path: str = CHAOSTOOLKIT_CONFIG_PATH,
+    if_unchanged_since: Optional[tuple] = None,
+) -> None:
+    """
+    Save the settings like `chaoslib.settings.save_settings` does, but
+    atomically: they are written to a temporary file next to the settings
+    file, which then replaces it, so readers never see a partial file.
+
+    The permissions of an existing settings file are kept.
+
+    When `if_unchanged_since` is the `(mtime_ns, size, inode)` of the file
+    when it was read, or an empty tuple if it did not exist, the file is
+    only replaced if it still is the same one, otherwise `SettingsConflict`
+    is raised.
+    """
+    settings_dir = os.path.dirname(os.path.abspath(settings_path))
+    os.makedirs(settings_dir, exist_ok=True)
+
+    try:
+        mode = os.stat(settings_path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o666
+
+    tmp_path = f"{settings_path}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(fd, "w") as f:
+            yaml.dump(settings, f, default_flow_style=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        if if_unchanged_since is not None:
+            if _identity(settings_path) != if_unchanged_since:
+                raise SettingsConflict(
+                    f"The settings file '{settings_path}' was changed by "
+                    "another process"
+                )
+        os.replace(tmp_path, settings_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    loaded_settings.set(settings)
+
+
+@contextmanager
+def lock_settings(
+    settings_path: str = CHAOSTOOLKIT_CONFIG_PATH,
+    timeout: float = SETTINGS_LOCK_TIMEOUT,
+) -> Iterator[None]:
+    """
+    Hold an exclusive advisory lock on the settings file, so processes
+    changing it do so one at a time.
+
+    See `chaostoolkit.locking.lock_file`. Where `fcntl` is not available,
+    nothing is locked and `update_settings` only relies on detecting
+    conflicts.
+    """
+    with lock_file(settings_path, timeout):
+        yield
+
+
+def update_settings(
+    settings_path: str,
+    update: Callable[[Settings], None],
+    retries: int = SETTINGS_UPDATE_RETRIES,
+) -> Settings:
+    """
+    Read the settings, change them in place with `update` and save them,
+    while holding `lock_settings`.
+
+    Writers which do not take the lock, such as editors or older versions
+    of the chaostoolkit, may still change the file in the meantime. When
+    they do, the update is not saved over their change, it is applied again
+    to the settings they saved, up to `retries` times before raising
+    `SettingsConflict`.
+
+    Returns the saved settings. Errors raised by `update` are not caught and
+    leave the file unchanged. A file which cannot be parsed is never
+    replaced, `InvalidSettings` is raised instead.
+    """
+    with lock_settings(settings_path):
+        for attempt in range(retries + 1):
+            identity = _identity(settings_path)
+            settings = _load_for_update(settings_path)
+            update(settings)
+            try:
+                save_settings(
+                    settings, settings_path, if_unchanged_since=identity
+                )
+                return settings
+            except SettingsConflict:
+                logger.debug(
+                    f"The settings file changed while updating it, "
+                    f"attempt {attempt + 1} of {retries + 1}"
+                )
+
+    raise SettingsConflict(
+        f"The settings file '{settings_path}' kept changing while updating it"
+    )
+
+
+def apply_settings_changes(
+    settings: Settings, changes: List[Tuple[str, str, Any]]
+) -> None:
+    """
+    Apply the `changes` to the settings, in place and in order. Each change
+    is a `("set", key, value)` or a `("remove", key, None)` tuple, where the
+    key is a dotted path as understood by
+    `chaoslib.settings.locate_settings_entry`, which must already exist, like
+    for `chaos settings set` and `chaos settings remove`.
+
+    Raises `ValueError` on the first change which cannot be applied.
+    """
+    for op, key, value in changes:
+        item = locate_settings_entry(settings, key)
+        if not item:
+            raise ValueError(f"No settings entry at '{key}'")
+        parent, _, key_tail, index = item
+
+        if op == "set":
+            parent[index if key_tail is None else key_tail] = value
+        elif op == "remove":
+            del parent[index if key_tail is None else key_tail]
+        else:
+            raise ValueError(f"Unknown settings change '{op}'")
+
+
+def apply_json_patch(settings: Settings, patch: List[Dict[str, Any]]) -> None:
+    """
+    Apply a JSON patch, as defined by RFC 6902, to the settings, in place.
+
+    All of the `add`, `remove`, `replace`, `move`, `copy` and `test`
+    operations are supported, with their `path` and `from` as JSON pointers
+    such as `/auths/chaos.example.com/type`.
+
+    Raises `ValueError` on the first operation which cannot be applied.
+    """
+    if not isinstance(patch, list):
+        raise ValueError("A JSON patch must be a list of operations")
+
+    for index, operation in enumerate(patch, 1):
+        if not isinstance(operation, dict) or "path" not in operation:
+            raise ValueError(f"Operation #{index} of the patch has no path")
+        op = operation.get("op")
+        path = operation["path"]
+        try:
+            if op == "add":
+                _add(settings, path, operation["value"])
+            elif op == "remove":
+                _remove(settings, path)
+            elif op == "replace":
+                _remove(settings, path)
+                _add(settings, path, operation["value"])
+            elif op == "move":
+                value = _remove(settings, operation["from"])
+                _add(settings, path, value)
+            elif op == "copy":
+                value = _get(settings, operation["from"])
+                _add(settings, path, copy.deepcopy(value))
+            elif op == "test":
+                if _get(settings, path) != operation["value"]:
+                    raise ValueError(f"'{path}' does not have the tested value")
+            else:
+                raise ValueError(f"unknown operation '{op}'")
+        except KeyError as x:
+            raise ValueError(f"Operation #{index} of the patch has no {x}")
+        except ValueError as x:
+            raise ValueError(f"Operation #{index} of the patch failed: {x}")
+
+
+###############################################################################
+# Internals
+###############################################################################
+# the key, the marshalled settings and whether they hold dates
+Snapshot = Tuple[tuple, bytes, bool]
+_YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# snapshots already read by this process, by absolute path of the file
+_memory = {}
+
+
+def _identity(settings_path: str) -> tuple:
+    try:
+        stat = os.stat(settings_path)
+    except FileNotFoundError:
+        return ()
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _load_for_update(settings_path: str) -> Settings:
+    settings = load_settings(settings_path)
+    if settings is None and os.path.exists(settings_path):
+        # either empty, or invalid and then not to be overwritten
+        with open(settings_path) as f:
+            try:
+                settings = yaml.load(f.read(), Loader=_YAMLLoader)
+            except yaml.YAMLError:
+                raise InvalidSettings(
+                    f"The settings file '{settings_path}' could not be parsed"
+                )
+    if settings is None:
+        return {}
+    if not isinstance(settings, dict):
+        raise InvalidSettings(
+            f"The settings file '{settings_path}' does not hold a mapping"
+        )
+    return settings
+
+
+def _parse(settings_path: str, key: tuple) -> Optional[Snapshot]:
+    with open(settings_path) as f:
+        try:
+            settings = yaml.load(f.read(), Loader=_YAMLLoader)
+        except yaml.YAMLError as ye:
+            logger.error(f"Failed parsing YAML settings: {str(ye)}")
+            return
+
+    dates = []
+    settings = _encode_dates(settings, dates)
+    return key, marshal.dumps(settings), bool(dates)
+
+
+def _read_snapshot(cache_path: str, key: tuple) -> Optional[Snapshot]:
+    try:
+        with open(cache_path, "rb") as f:
+            if not _is_trusted(os.fstat(f.fileno())):
+                logger.debug(
+                    f"Ignoring settings cache '{cache_path}', which is not "
+                    "owned by the current user or is writable by others"
+                )
+                return
+            snapshot = marshal.load(f)
+    except FileNotFoundError:
+        return
+    except Exception:
+        logger.debug(f"Ignoring unreadable settings cache '{cache_path}'")
+        return
+
+    if (
+        not isinstance(snapshot, tuple)
+        or len(snapshot) != 3
+        or snapshot[0] != key
+    ):
+        return
+    return snapshot
+
+
+def _is_trusted(stat: os.stat_result) -> bool:
+    if stat.st_mode & 0o022:
+        return False
+    if hasattr(os, "getuid"):
+        return stat.st_uid == os.getuid()
+    return True  # pragma: no cover
+
+
+def _encode_dates(o: Any, dates: List[Any]) -> Any:
+    # YAML dates are the only values marshal does not support, they are
+    # stored as tuples, which the YAML safe loader never creates
+    if isinstance(o, datetime):
+        dates.append(o)
+        return ("datetime", o.isoformat())
+    if isinstance(o, date):
+        dates.append(o)
+        return ("date", o.isoformat())
+    if isinstance(o, dict):
+        return {
+            _encode_dates(k, dates): _encode_dates(v, dates)
+            for k, v in o.items()
+        }
+    if isinstance(o, (list, set, frozenset)):
+        return type(o)(_encode_dates(v, dates) for v in o)
+    return o
+
+
+def _decode_dates(o: Any) -> Any:
+    if isinstance(o, tuple):
+        kind, value = o
+        if kind == "datetime":
+            return datetime.fromisoformat(value)
+        return date.fromisoformat(value)
+    if isinstance(o, dict):
+        return {_decode_dates(k): _decode_dates(v) for k, v in o.items()}
+    if isinstance(o, (list, set, frozenset)):
+        return type(o)(_decode_dates(v) for v in o)
+    return o
+
+
+def _write_snapshot(cache_path: str, snapshot: Snapshot) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            marshal.dump(snapshot, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        logger.debug(
+            f"Failed to write settings cache '{cache_path}'", exc_info=True
+        )
+
+
+def _split_pointer(
+    settings: Settings, pointer: str
+) -> Tuple[Union[Dict[str, Any], List], str]:
+    if pointer == "":
+        raise ValueError("the whole settings cannot be changed")
+    if not pointer.startswith("/"):
+        raise ValueError(f"'{pointer}' is not a JSON pointer")
+    tokens = [
+        t.replace("~1", "/").replace("~0", "~") for t in pointer.split("/")
+    ]
+    parent = settings
+    for token in tokens[1:-1]:
+        parent = _child(parent, token, pointer)
+    return parent, tokens[-1]
+
+
+def _child(parent: Any, token: str, pointer: str) -> Any:
+    if isinstance(parent, dict) and token in parent:
+        return parent[token]
+    if (
+        isinstance(parent, list)
+        and token.isdigit()
+        and int(token) < len(parent)
+    ):
+        return parent[int(token)]
+    raise ValueError(f"'{pointer}' does not exist")
+
+
+def _get(settings: Settings, pointer: str) -> Any:
+    if pointer == "":
+        return settings
+    parent, token = _split_pointer(settings, pointer)
+    return _child(parent, token, pointer)
+
+
+def _add(settings: Settings, pointer: str, value: Any) -> None:
+    parent, token = _split_pointer(settings, pointer)
+    if isinstance(parent, dict):
+        parent[token] = value
+    elif isinstance(parent, list):
+        if token == "-":
+            parent.append(value)
+        elif token.isdigit() and int(token) <= len(parent):
+            parent.insert(int(token), value)
+        else:
+            raise ValueError(f"'{pointer}' is out of bounds")
+    else:
+        raise ValueError(f"The parent of '{pointer}' is not a container")
+
+
+def _remove(settings: Settings, pointer: str) -> Any:
+    parent, token = _split_pointer(settings, pointer)
+    value = _child(parent, token, pointer)
+    del parent[int(token) if isinstance(parent, list) else token]
+    return value
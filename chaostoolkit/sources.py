@@ -0,0 +1,29 @@
+import os
+from typing import Any, Dict
+
+__all__ = ["normalize_keys", "resolve_path", "source_name"]
+
+
+def normalize_keys(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The keys of `doc` spelled with underscores rather than dashes, so
+    schedule and suite files may use either.
+    """
+    return {k.replace("-", "_"): v for k, v in doc.items()}
+
+
+def resolve_path(base_dir: str, path: str) -> str:
+    """
+    The `path` relative to `base_dir`, unless it is absolute or a URL.
+    """
+    if "://" in path or os.path.isabs(path):
+        return path
+    return os.path.join(base_dir, path)
+
+
+def source_name(source: str) -> str:
+    """
+    Name of an experiment after its file or URL, without extension.
+    """
+    name = source.rstrip("/").rsplit("/", 1)[-1]
+    return os.path.splitext(name)[0] or "experiment"
@@ -0,0 +1,320 @@
+import logging
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from chaoslib.types import Journal
+
+from chaostoolkit.journal import iter_activity_runs, load_journal
+
+__all__ = ["DurationStats", "JournalStats", "Reservoir", "collect_stats"]
+
+RESERVOIR_SIZE = 1024
+PERCENTILES = (50, 90, 95, 99)
+# journals summarized by a worker process before it reports back
+STATS_CHUNK_SIZE = 64
+logger = logging.getLogger("chaostoolkit")
+
+
+class Reservoir:
+    """
+    A uniform sample of at most `size` values out of all those added, so
+    percentiles can be estimated in bounded memory. They are exact as long
+    as no more than `size` values were added.
+    """
+
+    def __init__(self, size: int = RESERVOIR_SIZE):
+        self.size = size
+        self.count = 0
+        self.values: List[float] = []
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+            return
+
+        index = _random.randrange(self.count)
+        if index < self.size:
+            self.values[index] = value
+
+    def merge(self, other: "Reservoir") -> None:
+        """
+        Sample from both reservoirs, each weighted by how many values it
+        stands for.
+        """
+        if len(self.values) + len(other.values) <= self.size:
+            self.values.extend(other.values)
+            self.count += other.count
+            return
+
+        mine = list(self.values)
+        theirs = list(other.values)
+        _random.shuffle(mine)
+        _random.shuffle(theirs)
+        total = self.count + other.count
+        values = []
+        while len(values) < self.size and (mine or theirs):
+            if theirs and (not mine or _random.random() * total >= self.count):
+                values.append(theirs.pop())
+            else:
+                values.append(mine.pop())
+
+        self.values = values
+        self.count = total
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        The `q`th percentile of the values, by nearest rank.
+        """
+        if not self.values:
+            return None
+        values = sorted(self.values)
+        rank = max(1, -(-len(values) * q // 100))
+        return values[int(rank) - 1]
+
+
+class DurationStats:
+    """
+    Aggregated durations, in seconds, and outcomes of runs of the same
+    experiment or activity.
+    """
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.outcomes: Dict[str, int] = {}
+        self.durations = Reservoir(reservoir_size)
+
+    def add(self, outcome: str, duration: Optional[float] = None) -> None:
+        self.count += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if isinstance(duration, (int, float)):
+            self.total += duration
+            self.max = max(self.max, duration)
+            self.durations.add(duration)
+
+    def merge(self, other: "DurationStats") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+        self.durations.merge(other.durations)
+
+    def to_dict(self) -> Dict[str, Any]:
+        timed = self.durations.count
+        duration = {
+            "mean": self.total / timed if timed else None,
+            "max": self.max if timed else None,
+        }
+        for q in PERCENTILES:
+            duration[f"p{q}"] = self.durations.percentile(q)
+        return {
+            "runs": self.count,
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "duration": duration,
+        }
+
+
+class JournalStats:
+    """
+    Aggregate journals into run outcomes, and durations per experiment and
+    per activity.
+
+    Only aggregates are kept, journals are not. Two instances can be merged,
+    so journals may be aggregated by separate processes.
+
+    A run succeeded when it completed without deviating, deviated whatever
+    its status, and failed otherwise. Experiments are keyed by their title
+    and activities by their name.
+    """
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self.journals = 0
+        self.skipped = 0
+        self.statuses: Dict[str, int] = {}
+        self.succeeded = 0
+        self.deviated = 0
+        self.failed = 0
+        self.experiments: Dict[str, DurationStats] = {}
+        self.activities: Dict[str, DurationStats] = {}
+
+    def add_journal(self, journal: Journal) -> None:
+        self.journals += 1
+        status = journal.get("status") or "unknown"
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        deviated = bool(journal.get("deviated"))
+        if deviated:
+            self.deviated += 1
+        elif status == "completed":
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+        title = (journal.get("experiment") or {}).get("title") or ""
+        outcome = "deviated" if deviated else status
+        self._stats_of(self.experiments, title).add(
+            outcome, journal.get("duration")
+        )
+
+        for run in iter_activity_runs(journal):
+            if not isinstance(run, dict):
+                continue
+            name = (run.get("activity") or {}).get("name") or ""
+            self._stats_of(self.activities, name).add(
+                run.get("status") or "unknown", run.get("duration")
+            )
+
+    def add_file(self, path: str) -> None:
+        """
+        Load and add the journal at `path`, which is skipped when it cannot
+        be read or is not a journal.
+        """
+        try:
+            journal = load_journal(path)
+        except Exception as x:
+            logger.debug(f"Skipping unreadable journal '{path}': {x}")
+            self.skipped += 1
+            return
+
+        if not isinstance(journal, dict) or "experiment" not in journal:
+            logger.debug(f"Skipping '{path}', which is not a journal")
+            self.skipped += 1
+            return
+
+        self.add_journal(journal)
+
+    def merge(self, other: "JournalStats") -> None:
+        self.journals += other.journals
+        self.skipped += other.skipped
+        self.succeeded += other.succeeded
+        self.deviated += other.deviated
+        self.failed += other.failed
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        for mine, theirs in (
+            (self.experiments, other.experiments),
+            (self.activities, other.activities),
+        ):
+            for key, stats in theirs.items():
+                self._stats_of(mine, key).merge(stats)
+
+    def to_dict(self, top: int = 10) -> Dict[str, Any]:
+        """
+        The aggregates, with the `top` slowest activities, by their 95th
+        percentile duration, and those which failed the most. Skipped
+        activities are not failures, they are only counted in the outcomes.
+        """
+        rates = {
+            "succeeded": _rate(self.succeeded, self.journals),
+            "deviated": _rate(self.deviated, self.journals),
+            "failed": _rate(self.failed, self.journals),
+        }
+
+        activities = {
+            name: stats.to_dict()
+            for name, stats in sorted(self.activities.items())
+        }
+        for stats in activities.values():
+            outcomes = stats["outcomes"]
+            stats["failures"] = outcomes.get("failed", 0)
+
+        timed = [n for n, a in activities.items() if a["duration"]["p95"]]
+        slowest = sorted(
+            timed, key=lambda n: activities[n]["duration"]["p95"], reverse=True
+        )[:top]
+        failing = [n for n, a in activities.items() if a["failures"]]
+        most_failing = sorted(
+            failing,
+            key=lambda n: (
+                activities[n]["failures"],
+                activities[n]["failures"] / activities[n]["runs"],
+            ),
+            reverse=True,
+        )[:top]
+
+        return {
+            "journals": self.journals,
+            "skipped": self.skipped,
+            "statuses": dict(sorted(self.statuses.items())),
+            "deviated": self.deviated,
+            "rates": rates,
+            "experiments": {
+                title: stats.to_dict()
+                for title, stats in sorted(self.experiments.items())
+            },
+            "activities": activities,
+            "slowest": [
+                {"name": n, "p95": activities[n]["duration"]["p95"]}
+                for n in slowest
+            ],
+            "most_failing": [
+                {
+                    "name": n,
+                    "failures": activities[n]["failures"],
+                    "runs": activities[n]["runs"],
+                }
+                for n in most_failing
+            ],
+        }
+
+    def _stats_of(
+        self, stats: Dict[str, DurationStats], key: str
+    ) -> DurationStats:
+        if key not in stats:
+            stats[key] = DurationStats(self.reservoir_size)
+        return stats[key]
+
+
+def collect_stats(
+    paths: List[str],
+    workers: int = 1,
+    reservoir_size: int = RESERVOIR_SIZE,
+    chunk_size: int = STATS_CHUNK_SIZE,
+) -> JournalStats:
+    """
+    Aggregate the journals at `paths` in a pool of `workers` processes.
+
+    Each worker loads its journals one at a time and only reports their
+    aggregates back, so memory is bounded by the largest journal and the
+    number of distinct experiments and activities, not by the number of
+    journals.
+    """
+    stats = JournalStats(reservoir_size)
+    if workers <= 1 or len(paths) <= chunk_size:
+        for path in paths:
+            stats.add_file(path)
+        return stats
+
+    chunks = [
+        paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_collect_chunk, chunk, reservoir_size)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            stats.merge(future.result())
+
+    return stats
+
+
+###############################################################################
+# Internals
+###############################################################################
+_random = random.Random()
+
+
+def _collect_chunk(paths: List[str], reservoir_size: int) -> JournalStats:
+    stats = JournalStats(reservoir_size)
+    for path in paths:
+        stats.add_file(path)
+    return stats
+
+
+def _rate(count: int, total: int) -> float:
+    return count / total if total else 0.0
@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import yaml
+
+from chaostoolkit.scheduler import RUN_OPTIONS
+from chaostoolkit.sources import normalize_keys, resolve_path, source_name
+
+__all__ = ["SuiteNode", "load_suite", "run_suite", "topological_order"]
+
+logger = logging.getLogger("chaostoolkit")
+
+
+class SuiteNode:
+    """
+    An experiment of a suite, which only runs once all the experiments it
+    comes `after` completed without deviating.
+
+    `options` are passed to the run, such as its own `var` and `var_file`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        after: List[str] = None,
+        options: Dict[str, Any] = None,
+    ):
+        self.name = name
+        self.source = source
+        self.after = list(after or [])
+        self.options = options or {}
+
+
+def load_suite(path: str) -> Tuple[List[SuiteNode], Dict[str, Any]]:
+    """
+    Load the experiments of the suite file at `path`, in JSON or YAML, and
+    its top-level settings: `workers`, and the `var` and `var_file` shared
+    by all the experiments.
+
+        workers: 4
+        var-file: [shared.yaml, .env]
+        experiments:
+          - name: baseline-latency
+            source: experiments/latency.json
+          - name: kill-replica
+            source: experiments/kill-replica.json
+            after: [baseline-latency]
+            var:
+              replicas: 1
+
+    Experiments are named after their file unless they have a `name`.
+    Relative experiment and var file paths are relative to the suite file.
+    Keys may be spelled with dashes or underscores.
+    """
+    with open(path) as f:
+        if path.lower().endswith(".json"):
+            doc = json.load(f)
+        else:
+            doc = yaml.safe_load(f)
+
+    if not isinstance(doc, dict) or not isinstance(
+        doc.get("experiments"), list
+    ):
+        raise ValueError(f"'{path}' does not declare a list of experiments")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    def var_files(value: Any) -> List[str]:
+        return [
+            resolve_path(base_dir, p)
+            for p in ([value] if isinstance(value, str) else value)
+        ]
+
+    doc = normalize_keys(doc)
+    config = {
+        "workers": doc.get("workers"),
+        "var": doc.get("var") or {},
+        "var_file": var_files(doc.get("var_file") or []),
+    }
+
+    nodes = []
+    for index, entry in enumerate(doc["experiments"], 1):
+        if not isinstance(entry, dict) or not entry.get("source"):
+            raise ValueError(f"Experiment #{index} has no source")
+        entry = normalize_keys(entry)
+        unknown = sorted(set(entry) - {"name", "source", "after", *RUN_OPTIONS})
+        if unknown:
+            raise ValueError(
+                f"Unknown keys of experiment #{index}: {', '.join(unknown)}"
+            )
+
+        source = resolve_path(base_dir, entry["source"])
+        name = entry.get("name") or source_name(source)
+        after = entry.get("after") or []
+        if isinstance(after, str):
+            after = [after]
+
+        options = {k: entry[k] for k in RUN_OPTIONS if k in entry}
+        if "var_file" in options:
+            options["var_file"] = var_files(options["var_file"])
+        nodes.append(SuiteNode(name, source, after, options))
+
+    topological_order(nodes)
+    return nodes, config
+
+
+def topological_order(nodes: List[SuiteNode]) -> List[SuiteNode]:
+    """
+    The `nodes` ordered so each comes after those it depends on, and
+    otherwise in their declared order.
+
+    Raises `ValueError` when names are not unique, a dependency is unknown
+    or dependencies are circular.
+    """
+    by_name: Dict[str, SuiteNode] = {}
+    for node in nodes:
+        if node.name in by_name:
+            raise ValueError(
+                f"Two experiments are named '{node.name}', give them a "
+                "distinct name"
+            )
+        by_name[node.name] = node
+
+    for node in nodes:
+        for name in node.after:
+            if name not in by_name:
+                raise ValueError(
+                    f"'{node.name}' comes after '{name}', which is not an "
+                    "experiment of the suite"
+                )
+
+    ordered: List[SuiteNode] = []
+    done: Set[str] = set()
+    remaining = list(nodes)
+    while remaining:
+        ready = [n for n in remaining if done.issuperset(n.after)]
+        if not ready:
+            cycle = ", ".join(n.name for n in remaining)
+            raise ValueError(f"Circular dependencies between {cycle}")
+        for node in ready:
+            ordered.append(node)
+            done.add(node.name)
+        remaining = [n for n in remaining if n.name not in done]
+    return ordered
+
+
+def run_suite(
+    nodes: List[SuiteNode], submit: Callable[[SuiteNode], Future]
+) -> List[Dict[str, Any]]:
+    """
+    Run the `nodes` of a suite as soon as the experiments they come after
+    succeeded, through `submit`, which returns the future of the summary of
+    a run. Independent experiments run concurrently, as far as the pool
+    behind `submit` allows.
+
+    When a run fails or deviates, the experiments which depend on it,
+    directly or not, are skipped. Returns the summary of each experiment,
+    in the declared order, with its `name`, `source` and, when skipped, the
+    experiment it was `skipped_after`.
+    """
+    ordered = topological_order(nodes)
+    dependents: Dict[str, List[str]] = {n.name: [] for n in nodes}
+    for node in nodes:
+        for name in node.after:
+            dependents[name].append(node.name)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    succeeded: Set[str] = set()
+    running: Dict[Future, SuiteNode] = {}
+    while True:
+        started = {n.name for n in running.values()}
+        for node in ordered:
+            if node.name in results or node.name in started:
+                continue
+            if succeeded.issuperset(node.after):
+                logger.info(f"Running '{node.name}'")
+                running[submit(node)] = node
+
+        if not running:
+            break
+
+        completed, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in completed:
+            node = running.pop(future)
+            try:
+                result = dict(future.result())
+            except Exception as x:
+                logger.error(f"'{node.name}' could not run: {x}")
+                result = {"status": "error", "deviated": False, "exit_code": 1}
+            results[node.name] = result
+
+            if result["exit_code"] == 0:
+                succeeded.add(node.name)
+                continue
+
+            for name in _descendants(node.name, dependents):
+                if name not in results:
+                    logger.warning(f"Skipping '{name}', '{node.name}' failed")
+                    results[name] = {
+                        "status": "skipped",
+                        "deviated": False,
+                        "exit_code": 1,
+                        "skipped_after": node.name,
+                    }
+
+    summaries = []
+    for node in nodes:
+        result = results[node.name]
+        result["name"] = node.name
+        result["source"] = node.source
+        summaries.append(result)
+    return summaries
+
+
+###############################################################################
+# Internals
+###############################################################################
+def _descendants(name: str, dependents: Dict[str, List[str]]) -> List[str]:
+    found: List[str] = []
+    stack = list(dependents[name])
+    while stack:
+        current = stack.pop(0)
+        if current not in found:
+            found.append(current)
+            stack.extend(dependents[current])
+    return found
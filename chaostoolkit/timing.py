@@ -0,0 +1,73 @@
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+__all__ = ["PhaseTimer", "profile_imports"]
+
+
+class PhaseTimer:
+    """
+    Record how long named phases take, in seconds and in the order they
+    started. A phase measured more than once accumulates its durations.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter_ns() - start) / 1e9
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed
+
+    def total(self) -> float:
+        return sum(self.durations.values())
+
+
+def profile_imports(modules: List[str]) -> List[Dict[str, Any]]:
+    """
+    Import each of the `modules`, in order, in a fresh interpreter started
+    with `-X importtime` and return what each imported module cost.
+
+    Every entry has the `name` of the module, its `depth` in the import tree,
+    with `0` for those imported directly, as well as its `self` and
+    `cumulative` durations, in seconds. A module which fails to import does
+    not prevent the next ones from being profiled.
+    """
+    code = "\n".join(
+        f"try:\n    import {m}\nexcept Exception:\n    pass" for m in modules
+    )
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+    )
+
+    entries = []
+    for line in p.stderr.splitlines():
+        fields = line[len("import time:") :].split("|")
+        if not line.startswith("import time:") or len(fields) != 3:
+            continue
+        self_us, cumulative_us, name = fields
+        try:
+            self_s = int(self_us) / 1e6
+            cumulative_s = int(cumulative_us) / 1e6
+        except ValueError:
+            # the header line
+            continue
+        # nested imports are indented by two more spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append(
+            {
+                "name": name.strip(),
+                "depth": depth,
+                "self": self_s,
+                "cumulative": cumulative_s,
+            }
+        )
+    return entries
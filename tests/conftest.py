@@ -7,3 +7,25 @@ import pytest
 def log_file():
     with tempfile.NamedTemporaryFile() as f:
         yield f
+
+
+@pytest.fixture(autouse=True)
+def version_check_cache(tmp_path, monkeypatch):
+    # never write the version check cache next to the fixture settings
+    path = str(tmp_path / "version-check.json")
+    monkeypatch.setattr(
+        "chaostoolkit.commands.get_version_check_cache_path", lambda _: path
+    )
+    return path
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # never write the caches next to the fixture settings either
+    path = str(tmp_path / "cache")
+    for command in ("run", "schedule", "serve", "suite", "validate"):
+        monkeypatch.setattr(
+            f"chaostoolkit.commands.{command}.get_cache_dir", lambda _: path
+        )
+    monkeypatch.setattr("chaostoolkit.settings.get_cache_dir", lambda _: path)
+    return path
@@ -0,0 +1,41 @@
+import json
+
+from chaoslib.experiment import ensure_experiment_is_valid, run_experiment
+
+from benchmarks.generate import make_experiment
+from benchmarks.suite import main as suite
+
+
+def test_synthetic_experiment_is_valid():
+    experiment = make_experiment(
+        activities=50,
+        rollbacks=5,
+        payload_size=10,
+        background_ratio=0.2,
+        pause="uniform:0.001",
+    )
+    assert len(experiment["method"]) == 50
+    assert len(experiment["rollbacks"]) == 5
+    assert any(a.get("background") for a in experiment["method"])
+    ensure_experiment_is_valid(experiment)
+
+    journal = run_experiment(experiment)
+    assert journal["status"] == "completed"
+    assert journal["deviated"] is False
+
+
+def test_synthetic_experiment_is_reproducible():
+    assert make_experiment(seed=1, pause="exponential:1") == make_experiment(
+        seed=1, pause="exponential:1"
+    )
+
+
+def test_compare_benchmark_results(tmp_path):
+    def write(name, median):
+        path = tmp_path / name
+        path.write_text(json.dumps({"results": {"help": {"median": median}}}))
+        return str(path)
+
+    baseline = write("baseline.json", 0.1)
+    assert suite(["compare", baseline, write("same.json", 0.105)]) == 0
+    assert suite(["compare", baseline, write("slower.json", 0.2)]) == 1
@@ -0,0 +1,176 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from chaoslib.exceptions import InvalidExperiment, InvalidSource
+from requests.exceptions import ReadTimeout
+
+from chaostoolkit.cache import (
+    EXPERIMENT_CACHE_TTL,
+    EXPERIMENT_FETCH_TIMEOUT,
+    ExperimentCache,
+    get_validation_key,
+    load_cached_experiment,
+    validate_experiment,
+)
+
+URL = "https://example.com/experiment.json"
+EXPERIMENT = {"title": "hello", "method": []}
+
+
+class FakeResponse:
+    def __init__(self, status=200, doc=None, headers=None):
+        self.status_code = status
+        self.text = json.dumps(doc) if doc is not None else ""
+        self.content = self.text.encode("utf-8")
+        self.headers = {"Content-Type": "application/json"}
+        self.headers.update(headers or {})
+
+
+def expire(cache_dir: str):
+    urls_dir = os.path.join(cache_dir, "experiments", "urls")
+    for name in os.listdir(urls_dir):
+        path = os.path.join(urls_dir, name)
+        with open(path) as f:
+            entry = json.load(f)
+        entry["validated_at"] = time.time() - EXPERIMENT_CACHE_TTL - 1
+        with open(path, "w") as f:
+            json.dump(entry, f)
+
+
+@patch("chaostoolkit.cache.requests", autospec=True)
+def test_fresh_experiment_is_served_from_cache(requests, tmp_path):
+    requests.get.return_value = FakeResponse(200, EXPERIMENT)
+
+    assert load_cached_experiment(URL, cache_dir=str(tmp_path)) == EXPERIMENT
+    assert load_cached_experiment(URL, cache_dir=str(tmp_path)) == EXPERIMENT
+    assert requests.get.call_count == 1
+
+
+@patch("chaostoolkit.cache.requests", autospec=True)
+def test_stale_experiment_is_revalidated(requests, tmp_path):
+    requests.get.return_value = FakeResponse(
+        200, EXPERIMENT, {"ETag": '"abc"', "Last-Modified": "yesterday"}
+    )
+    load_cached_experiment(URL, cache_dir=str(tmp_path))
+    expire(str(tmp_path))
+
+    requests.get.return_value = FakeResponse(304)
+    assert load_cached_experiment(URL, cache_dir=str(tmp_path)) == EXPERIMENT
+    headers = requests.get.call_args[1]["headers"]
+    assert headers["If-None-Match"] == '"abc"'
+    assert headers["If-Modified-Since"] == "yesterday"
+
+    # revalidated, so fresh again
+    assert load_cached_experiment(URL, cache_dir=str(tmp_path)) == EXPERIMENT
+    assert requests.get.call_count == 2
+
+
+@patch("chaostoolkit.cache.requests", autospec=True)
+def test_experiment_is_fetched_with_a_timeout(requests, tmp_path):
+    requests.get.return_value = FakeResponse(200, EXPERIMENT)
+    load_cached_experiment(URL, cache_dir=str(tmp_path))
+    assert requests.get.call_args[1]["timeout"] == EXPERIMENT_FETCH_TIMEOUT
+
+    requests.get.side_effect = ReadTimeout("too slow")
+    with pytest.raises(InvalidSource, match="too slow"):
+        load_cached_experiment(URL, cache_dir=str(tmp_path), refresh=True)
+
+
+@patch("chaostoolkit.cache.requests", autospec=True)
+def test_refresh_fetches_experiment_again(requests, tmp_path):
+    requests.get.return_value = FakeResponse(200, EXPERIMENT, {"ETag": "1"})
+    load_cached_experiment(URL, cache_dir=str(tmp_path))
+
+    changed = dict(EXPERIMENT, title="changed")
+    requests.get.return_value = FakeResponse(200, changed, {"ETag": "2"})
+    experiment = load_cached_experiment(
+        URL, cache_dir=str(tmp_path), refresh=True
+    )
+    assert experiment == changed
+    assert "If-None-Match" not in requests.get.call_args[1]["headers"]
+    assert load_cached_experiment(URL, cache_dir=str(tmp_path)) == changed
+
+
+@patch("chaostoolkit.cache.requests", autospec=True)
+def test_least_recently_used_experiments_are_evicted(requests, tmp_path):
+    cache = ExperimentCache(str(tmp_path))
+    for index in range(3):
+        doc = dict(EXPERIMENT, title=f"experiment {index}")
+        requests.get.return_value = FakeResponse(200, doc)
+        cache.load(f"https://example.com/{index}.json")
+        time.sleep(0.01)
+
+    object_size = os.path.getsize(
+        os.path.join(cache.objects_dir, os.listdir(cache.objects_dir)[0])
+    )
+    cache.evict(max_size=object_size * 2)
+
+    assert len(os.listdir(cache.urls_dir)) == 2
+    assert len(os.listdir(cache.objects_dir)) == 2
+    assert cache._read_entry("https://example.com/0.json") is None
+
+
+@patch("chaostoolkit.cache.requests", autospec=True)
+def test_local_files_are_not_cached(requests, tmp_path):
+    path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "well-formed-experiment.json"
+    )
+    experiment = load_cached_experiment(path, cache_dir=str(tmp_path))
+    assert experiment["title"]
+    assert requests.get.call_count == 0
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_valid_experiment_is_only_validated_once(tmp_path):
+    path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "well-formed-experiment.json"
+    )
+    with open(path) as f:
+        experiment = json.load(f)
+
+    with patch(
+        "chaostoolkit.cache.ensure_experiment_is_valid"
+    ) as ensure_experiment_is_valid:
+        validate_experiment(experiment, str(tmp_path))
+        validate_experiment(experiment, str(tmp_path))
+        assert ensure_experiment_is_valid.call_count == 1
+
+        experiment["title"] = "changed"
+        validate_experiment(experiment, str(tmp_path))
+        assert ensure_experiment_is_valid.call_count == 2
+
+
+def test_validation_key_depends_on_environment(monkeypatch):
+    experiment = {
+        "title": "hello",
+        "configuration": {"token": {"type": "env", "key": "MY_TOKEN"}},
+        "method": [
+            {
+                "type": "probe",
+                "name": "cwd",
+                "provider": {
+                    "type": "python",
+                    "module": "os",
+                    "func": "getcwd",
+                },
+            }
+        ],
+    }
+    monkeypatch.delenv("MY_TOKEN", raising=False)
+    key = get_validation_key(experiment)
+    assert get_validation_key(experiment) == key
+
+    monkeypatch.setenv("MY_TOKEN", "secret")
+    assert get_validation_key(experiment) != key
+
+    monkeypatch.setattr("chaostoolkit.cache.chaoslib_version", "0.0.0")
+    assert get_validation_key(experiment) != key
+
+
+def test_invalid_experiment_is_not_cached(tmp_path):
+    with pytest.raises(InvalidExperiment):
+        validate_experiment({"title": "hello"}, str(tmp_path))
+    assert not os.path.exists(os.path.join(str(tmp_path), "validations"))
@@ -1,3 +1,5 @@
+import json
+import time
 from unittest.mock import patch
 
 import semver
@@ -5,8 +7,11 @@ from chaoslib.types import Strategy
 
 from chaostoolkit import __version__
 from chaostoolkit.check import (
+    VERSION_CHECK_CACHE_TTL,
+    VERSION_CHECK_FAILURE_TTL,
     check_hypothesis_strategy_spelling,
     check_newer_version,
+    start_version_check,
 )
 
 
@@ -20,9 +25,9 @@ class FakeResponse:
         return self.response
 
 
-@patch("chaostoolkit.check.requests", autospec=True)
-def test_version_is_not_newer(requests):
-    requests.get.return_value = FakeResponse(
+@patch("requests.get", autospec=True)
+def test_version_is_not_newer(get):
+    get.return_value = FakeResponse(
         200,
         "https://releases.chaostoolkit.org/latest",
         {"version": __version__, "up_to_date": True},
@@ -32,12 +37,12 @@ def test_version_is_not_newer(requests):
     assert latest_version is None
 
 
-@patch("chaostoolkit.check.requests", autospec=True)
-def test_version_is_newer(requests):
+@patch("requests.get", autospec=True)
+def test_version_is_newer(get):
     version = __version__.replace("rc", "-rc")
     version = ".".join(version.split(".", 3)[:3])
     newer_version = semver.bump_minor(version)
-    requests.get.return_value = FakeResponse(
+    get.return_value = FakeResponse(
         200,
         "http://someplace//usage/latest/",
         {"version": newer_version, "up_to_date": False},
@@ -61,3 +66,85 @@ def test_that_incorrect_continuous_option_is_valid(logger):
         'Instead, please use "--hypothesis-strategy=continuously"'
     )
     assert output == Strategy.CONTINUOUS
+
+
+@patch("requests.get", autospec=True)
+def test_version_check_is_cached(get, version_check_cache):
+    get.return_value = FakeResponse(
+        200,
+        "https://releases.chaostoolkit.org/latest",
+        {"version": "99.0.0", "up_to_date": False},
+    )
+
+    assert check_newer_version("init", version_check_cache) == "99.0.0"
+    assert check_newer_version("init", version_check_cache) == "99.0.0"
+    assert get.call_count == 1
+
+
+@patch("requests.get", autospec=True)
+def test_stale_version_check_cache_is_refreshed(get, version_check_cache):
+    with open(version_check_cache, "w") as f:
+        json.dump(
+            {
+                "current": __version__,
+                "checked_at": time.time() - VERSION_CHECK_CACHE_TTL - 1,
+                "payload": {"version": __version__, "up_to_date": True},
+            },
+            f,
+        )
+    get.return_value = FakeResponse(
+        200,
+        "https://releases.chaostoolkit.org/latest",
+        {"version": "99.0.0", "up_to_date": False},
+    )
+
+    assert check_newer_version("init", version_check_cache) == "99.0.0"
+    assert get.call_count == 1
+
+
+@patch("requests.get", autospec=True)
+def test_failed_version_check_is_not_retried(get, version_check_cache):
+    get.side_effect = ConnectionError()
+
+    assert check_newer_version("init", version_check_cache) is None
+    assert check_newer_version("init", version_check_cache) is None
+    assert get.call_count == 1
+
+
+@patch("requests.get", autospec=True)
+def test_failed_version_check_is_retried_later(get, version_check_cache):
+    get.side_effect = ConnectionError()
+    assert check_newer_version("init", version_check_cache) is None
+
+    with open(version_check_cache) as f:
+        cache = json.load(f)
+    cache["checked_at"] -= VERSION_CHECK_FAILURE_TTL + 1
+    with open(version_check_cache, "w") as f:
+        json.dump(cache, f)
+
+    get.side_effect = None
+    get.return_value = FakeResponse(
+        200,
+        "https://releases.chaostoolkit.org/latest",
+        {"version": "99.0.0", "up_to_date": False},
+    )
+    assert check_newer_version("init", version_check_cache) == "99.0.0"
+    assert check_newer_version("init", version_check_cache) == "99.0.0"
+    assert get.call_count == 2
+
+
+@patch("requests.get", autospec=True)
+def test_version_check_runs_in_background(get, version_check_cache):
+    get.return_value = FakeResponse(
+        200,
+        "https://releases.chaostoolkit.org/latest",
+        {"version": __version__, "up_to_date": True},
+    )
+
+    t = start_version_check("init", version_check_cache)
+    assert t is not None
+    t.join(5)
+    assert get.call_count == 1
+
+    assert start_version_check("init", version_check_cache) is None
+    assert get.call_count == 1
@@ -20,6 +20,7 @@ from chaoslib.settings import CHAOSTOOLKIT_CONFIG_PATH
 from click.testing import CliRunner
 
 from chaostoolkit.cli import cli, encoder
+from chaostoolkit.journal import load_journal
 
 empty_settings_path = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "fixtures", "empty-settings.yaml")
@@ -395,7 +396,7 @@ def test_notify_discover_complete(disco, notify):
 
 
 @patch("chaostoolkit.commands.init.notify", spec=True)
-def test_notify_init_complete(notify):
+def test_notify_init_complete(notify, tmp_path):
     # fill the inputs of the init command
     inputs = "\n".join(
         [
@@ -421,8 +422,8 @@ def test_notify_init_complete(notify):
 
     base_path = os.path.dirname(__file__)
     disco_path = os.path.join(base_path, "fixtures", "disco.json")
-    export_path_json = os.path.join(base_path, "experiment.json")
-    export_path_yaml = os.path.join(base_path, "experiment.yaml")
+    export_path_json = str(tmp_path / "experiment.json")
+    export_path_yaml = str(tmp_path / "experiment.yaml")
 
     export_paths = [None, export_path_json, export_path_yaml]
 
@@ -437,14 +438,15 @@ def test_notify_init_complete(notify):
 
         if export_path:
             cli_params.extend(["--experiment-path", export_path])
-        else:
-            export_path = os.path.join(os.getcwd(), "experiment.json")
 
-        result = runner.invoke(cli, cli_params, input=inputs)
+        with runner.isolated_filesystem(temp_dir=tmp_path) as cwd:
+            result = runner.invoke(cli, cli_params, input=inputs)
 
-        assert result.exit_code == 0
-        assert result.exception is None
-        assert os.path.exists(export_path)
+            assert result.exit_code == 0
+            assert result.exception is None
+            assert os.path.exists(
+                export_path or os.path.join(cwd, "experiment.json")
+            )
 
         notify.assert_any_call(ANY, InitFlowEvent.InitStarted)
         notify.assert_any_call(ANY, InitFlowEvent.InitCompleted, ANY)
@@ -904,3 +906,631 @@ def test_rollbacks_cli_hypothesis_strategies_in_experiment_can_be_overriden_by_c
 
     m = "Runtime strategies: hypothesis - after-method-only / rollbacks - default"
     assert m in log
+
+
+def test_stream_journal_as_ndjson(log_file):
+    runner = CliRunner()
+    exp_path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "check-file-exists.json"
+    )
+    with tempfile.TemporaryDirectory() as d:
+        journal_path = os.path.join(d, "journal.json")
+        stream_path = os.path.join(d, "journal.ndjson")
+        result = runner.invoke(
+            cli,
+            [
+                "--settings",
+                empty_settings_path,
+                "--log-file",
+                log_file.name,
+                "run",
+                "--journal-path",
+                journal_path,
+                "--journal-stream",
+                stream_path,
+                exp_path,
+            ],
+        )
+        assert result.exit_code == 0
+
+        with open(stream_path) as f:
+            records = [json.loads(line) for line in f]
+
+        with open(journal_path) as f:
+            journal = json.load(f)
+
+    types = [r["type"] for r in records]
+    assert types[0] == "started"
+    assert types[-1] == "finished"
+    assert records[-1]["status"] == journal["status"]
+
+    activities = [r for r in records if r["type"] == "activity"]
+    phases = [r["phase"] for r in activities]
+    assert (
+        phases
+        == ["hypothesis-before"] * 2 + ["method"] + ["hypothesis-after"] * 2
+    )
+    assert activities[2]["run"]["activity"]["name"] == "touch-file"
+
+
+def test_stream_and_journal_cannot_both_go_to_stdout(log_file):
+    runner = CliRunner()
+    exp_path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "check-file-exists.json"
+    )
+    result = runner.invoke(
+        cli,
+        [
+            "--settings",
+            empty_settings_path,
+            "--log-file",
+            log_file.name,
+            "run",
+            "--journal-path",
+            "-",
+            "--journal-stream",
+            "-",
+            exp_path,
+        ],
+    )
+    assert result.exit_code == 2
+    assert "cannot both write to the standard output" in result.output
+
+
+def test_write_journal_to_stdout(log_file):
+    runner = CliRunner()
+    exp_path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "check-file-exists.json"
+    )
+    result = runner.invoke(
+        cli,
+        [
+            "--settings",
+            empty_settings_path,
+            "--log-file",
+            log_file.name,
+            "run",
+            "--journal-path",
+            "-",
+            exp_path,
+        ],
+    )
+    assert result.exit_code == 0
+    journal = json.loads(result.stdout)
+    assert journal["status"] == "completed"
+
+
+def test_run_many_experiments_in_parallel(log_file):
+    runner = CliRunner()
+    fixtures_dir = os.path.join(os.path.dirname(__file__), "fixtures")
+    with tempfile.TemporaryDirectory() as d:
+        result = runner.invoke(
+            cli,
+            [
+                "--settings",
+                empty_settings_path,
+                "--log-file",
+                log_file.name,
+                "run",
+                "--workers",
+                "2",
+                "--journal-path",
+                os.path.join(d, "journal.json"),
+                os.path.join(fixtures_dir, "check-file-exists.json"),
+                os.path.join(fixtures_dir, "check-file-exists-fail.json"),
+            ],
+        )
+        assert result.exit_code == 1
+
+        with open(os.path.join(d, "journal-check-file-exists.json")) as f:
+            assert json.load(f)["status"] == "completed"
+
+        with open(os.path.join(d, "journal-check-file-exists-fail.json")) as f:
+            assert json.load(f)["status"] == "failed"
+
+    log_file.seek(0)
+    log = log_file.read().decode("utf-8")
+    assert "Ran 2 experiments: 1 completed, 1 failed" in log
+
+
+def test_run_experiments_matching_a_glob(log_file):
+    runner = CliRunner()
+    pattern = os.path.join(
+        os.path.dirname(__file__), "fixtures", "check-file-exists.json*"
+    )
+    with tempfile.TemporaryDirectory() as d:
+        result = runner.invoke(
+            cli,
+            [
+                "--settings",
+                empty_settings_path,
+                "--log-file",
+                log_file.name,
+                "run",
+                "--journal-path",
+                d,
+                pattern,
+            ],
+        )
+        assert result.exit_code == 0
+        assert os.listdir(d) == ["check-file-exists.json"]
+
+
+def test_run_fails_when_no_experiment_matches(log_file, tmp_path):
+    runner = CliRunner()
+    empty_dir = tmp_path / "experiments"
+    empty_dir.mkdir()
+    for source in [str(empty_dir / "*.json"), str(empty_dir)]:
+        result = runner.invoke(
+            cli,
+            [
+                "--settings",
+                empty_settings_path,
+                "--log-file",
+                log_file.name,
+                "run",
+                "--journal-path",
+                str(tmp_path / "journal.json"),
+                source,
+            ],
+        )
+        assert result.exit_code != 0
+        assert "No experiment found" in result.output
+
+
+def test_sweep_over_vars(log_file):
+    runner = CliRunner()
+    exp_path = os.path.join(
+        os.path.dirname(__file__),
+        "fixtures",
+        "check-configured-file-exists.json",
+    )
+    with tempfile.TemporaryDirectory() as d:
+        result = runner.invoke(
+            cli,
+            [
+                "--settings",
+                empty_settings_path,
+                "--log-file",
+                log_file.name,
+                "run",
+                "--workers",
+                "2",
+                "--journal-path",
+                os.path.join(d, "journal.json"),
+                "--sweep-var",
+                "path=tests/conftest.py,tests/missing.py",
+                exp_path,
+            ],
+        )
+        assert result.exit_code == 0
+
+        with open(os.path.join(d, "journal-index.json")) as f:
+            index = json.load(f)
+
+        runs = index["runs"]
+        assert [r["var"] for r in runs] == [
+            {"path": "tests/conftest.py"},
+            {"path": "tests/missing.py"},
+        ]
+        assert [r["status"] for r in runs] == ["completed", "completed"]
+
+        met = []
+        for name in ("journal-1.json", "journal-2.json"):
+            with open(os.path.join(d, name)) as f:
+                journal = json.load(f)
+            met.append(journal["steady_states"]["before"]["steady_state_met"])
+        assert met == [True, False]
+
+
+def test_sweep_env_var_files_do_not_leak(log_file, tmp_path):
+    experiment = {
+        "title": "Output the FOO environment variable",
+        "description": "n/a",
+        "configuration": {
+            "foo": {"type": "env", "key": "FOO", "default": "unset"}
+        },
+        "method": [
+            {
+                "name": "output-foo",
+                "type": "probe",
+                "provider": {
+                    "type": "python",
+                    "module": "os.path",
+                    "func": "basename",
+                    "arguments": {"p": "${foo}"},
+                },
+            }
+        ],
+    }
+    exp_path = tmp_path / "experiment.json"
+    exp_path.write_text(json.dumps(experiment))
+    (tmp_path / "a.env").write_text("FOO=one\n")
+    (tmp_path / "b.env").write_text("BAR=two\n")
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--settings",
+            empty_settings_path,
+            "--log-file",
+            log_file.name,
+            "run",
+            "--workers",
+            "1",
+            "--journal-path",
+            str(tmp_path / "journal.json"),
+            "--sweep-var-file",
+            str(tmp_path / "a.env"),
+            "--sweep-var-file",
+            str(tmp_path / "b.env"),
+            str(exp_path),
+        ],
+    )
+    assert result.exit_code == 0
+
+    outputs = []
+    for name in ("journal-1.json", "journal-2.json"):
+        with open(tmp_path / name) as f:
+            outputs.append(json.load(f)["run"][0]["output"])
+    assert outputs == ["one", "unset"]
+
+
+def test_compressed_journal_format(log_file):
+    runner = CliRunner()
+    exp_path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "check-file-exists.json"
+    )
+    with tempfile.TemporaryDirectory() as d:
+        journal_path = os.path.join(d, "journal.json.gz")
+        result = runner.invoke(
+            cli,
+            [
+                "--settings",
+                empty_settings_path,
+                "--log-file",
+                log_file.name,
+                "run",
+                "--journal-path",
+                journal_path,
+                exp_path,
+            ],
+        )
+        assert result.exit_code == 0
+
+        with open(journal_path, "rb") as f:
+            assert f.read(2) == b"\x1f\x8b"
+
+        assert load_journal(journal_path)["status"] == "completed"
+
+
+def test_doctor_reports_startup_timings():
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--no-log-file",
+            "--no-version-check",
+            "--settings",
+            empty_settings_path,
+            "doctor",
+            "--timings",
+            "--format",
+            "json",
+            "--top",
+            "3",
+        ],
+    )
+    assert result.exit_code == 0
+    report = json.loads(result.output)
+    timings = report["timings"]
+    assert timings["imports"]["chaostoolkit"] > 0
+    assert len(timings["imports"]["slowest"]) == 3
+    assert "configure_logger" in timings["phases"]
+    assert "load_settings" in timings["phases"]
+    assert "global_controls" in timings["phases"]
+    assert "version_check" not in timings["phases"]
+
+    result = runner.invoke(
+        cli,
+        [
+            "--no-log-file",
+            "--no-version-check",
+            "--settings",
+            empty_settings_path,
+            "doctor",
+            "--timings",
+        ],
+    )
+    assert result.exit_code == 0
+    assert "SLOWEST MODULES" in result.output
+    assert "load_settings" in result.output
+
+    result = runner.invoke(
+        cli,
+        [
+            "--no-log-file",
+            "--no-version-check",
+            "--settings",
+            empty_settings_path,
+            "doctor",
+            "--format",
+            "json",
+        ],
+    )
+    assert result.exit_code == 0
+    assert "timings" not in json.loads(result.output)
+
+
+def test_phase_timings_are_saved_in_journal(log_file):
+    runner = CliRunner()
+    exp_path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "check-file-exists.json"
+    )
+    with tempfile.TemporaryDirectory() as d:
+        journal_path = os.path.join(d, "journal.json")
+        result = runner.invoke(
+            cli,
+            [
+                "--verbose",
+                "--settings",
+                empty_settings_path,
+                "--log-file",
+                log_file.name,
+                "run",
+                "--journal-path",
+                journal_path,
+                exp_path,
+            ],
+        )
+        assert result.exit_code == 0
+
+        with open(journal_path) as f:
+            journal = json.load(f)
+
+    timings = journal["chaostoolkit"]["timings"]
+    assert list(timings) == [
+        "load_settings",
+        "load_global_controls",
+        "load_experiment",
+        "notify:run-started",
+        "ensure_experiment_is_valid",
+        "run_experiment",
+    ]
+    assert all(t >= 0 for t in timings.values())
+    assert timings["run_experiment"] <= journal["duration"] + 1
+
+    log_file.seek(0)
+    log = log_file.read().decode("utf-8")
+    assert "save_journal" in log
+    assert "notify:run-completed" in log
+
+
+def test_export_run_metrics_to_textfile(log_file):
+    runner = CliRunner()
+    exp_path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "check-file-exists.json"
+    )
+    with tempfile.TemporaryDirectory() as d:
+        journal_path = os.path.join(d, "journal.json")
+        metrics_path = os.path.join(d, "chaostoolkit.prom")
+        for _ in range(2):
+            result = runner.invoke(
+                cli,
+                [
+                    "--settings",
+                    empty_settings_path,
+                    "--log-file",
+                    log_file.name,
+                    "run",
+                    "--journal-path",
+                    journal_path,
+                    "--metrics-file",
+                    metrics_path,
+                    exp_path,
+                ],
+            )
+            assert result.exit_code == 0
+
+        with open(metrics_path) as f:
+            metrics = f.read()
+        journal_size = os.path.getsize(journal_path)
+
+    assert 'status="completed"} 2\n' in metrics
+    assert "chaostoolkit_activity_duration_seconds_count{" in metrics
+    assert f"}} {journal_size}\n" in metrics
+
+
+def test_metrics_only_apply_to_a_single_experiment(log_file):
+    runner = CliRunner()
+    exp_path = os.path.join(
+        os.path.dirname(__file__), "fixtures", "check-file-exists.json"
+    )
+    result = runner.invoke(
+        cli,
+        [
+            "--settings",
+            empty_settings_path,
+            "--log-file",
+            log_file.name,
+            "run",
+            "--metrics-port",
+            "0",
+            exp_path,
+            exp_path,
+        ],
+    )
+    assert result.exit_code == 2
+    assert "only apply to a single experiment" in result.output
+
+
+def test_journal_stats(tmp_path):
+    for index, status in enumerate(["completed", "completed", "failed"]):
+        journal = {
+            "experiment": {"title": "hello"},
+            "status": status,
+            "deviated": index == 1,
+            "duration": 1.0 + index,
+            "run": [
+                {
+                    "activity": {"name": "say-hello"},
+                    "status": "succeeded",
+                    "duration": 0.5,
+                }
+            ],
+        }
+        path = tmp_path / f"journal-{index}.json"
+        path.write_text(json.dumps(journal))
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--no-log-file",
+            "--no-version-check",
+            "--settings",
+            empty_settings_path,
+            "journal",
+            "stats",
+            "--workers",
+            "1",
+            "--format",
+            "json",
+            str(tmp_path),
+        ],
+    )
+    assert result.exit_code == 0
+    report = json.loads(result.output)
+    assert report["journals"] == 3
+    assert report["statuses"] == {"completed": 2, "failed": 1}
+    assert report["experiments"]["hello"]["duration"]["p50"] == 2.0
+    assert report["slowest"] == [{"name": "say-hello", "p95": 0.5}]
+
+    result = runner.invoke(
+        cli,
+        [
+            "--no-log-file",
+            "--no-version-check",
+            "--settings",
+            empty_settings_path,
+            "journal",
+            "stats",
+            str(tmp_path),
+        ],
+    )
+    assert result.exit_code == 0
+    assert "33.3% succeeded" in result.output
+    assert "say-hello" in result.output
+
+
+def test_journal_index_and_query(tmp_path):
+    journal = {
+        "experiment": {"title": "hello"},
+        "status": "completed",
+        "deviated": True,
+        "start": "2024-01-01T10:00:00+00:00",
+        "duration": 2.0,
+        "run": [],
+    }
+    (tmp_path / "journal.json").write_text(json.dumps(journal))
+    settings_path = str(tmp_path / "settings.yaml")
+
+    runner = CliRunner()
+    for _ in range(2):
+        result = runner.invoke(
+            cli,
+            [
+                "--no-log-file",
+                "--no-version-check",
+                "--settings",
+                settings_path,
+                "journal",
+                "index",
+                str(tmp_path),
+            ],
+        )
+        assert result.exit_code == 0
+    assert os.path.isfile(tmp_path / "journals.db")
+
+    result = runner.invoke(
+        cli,
+        [
+            "--no-log-file",
+            "--no-version-check",
+            "--settings",
+            settings_path,
+            "journal",
+            "query",
+            "--deviated",
+            "--since",
+            "2024-01-01",
+            "--format",
+            "json",
+        ],
+    )
+    assert result.exit_code == 0
+    runs = json.loads(result.output)
+    assert len(runs) == 1
+    assert runs[0]["experiment"] == "hello"
+    assert runs[0]["duration"] == 2.0
+
+    result = runner.invoke(
+        cli,
+        [
+            "--no-log-file",
+            "--no-version-check",
+            "--settings",
+            settings_path,
+            "journal",
+            "query",
+            "--since",
+            "yesterday",
+        ],
+    )
+    assert result.exit_code == 2
+
+
+def test_journal_diff_fails_on_regression(tmp_path):
+    def write(name, duration):
+        journal = {
+            "experiment": {"title": "hello"},
+            "status": "completed",
+            "deviated": False,
+            "steady_states": {
+                "before": {
+                    "steady_state_met": True,
+                    "probes": [
+                        {
+                            "activity": {"name": "probe"},
+                            "status": "succeeded",
+                            "duration": duration,
+                        }
+                    ],
+                },
+            },
+            "run": [],
+        }
+        path = tmp_path / name
+        path.write_text(json.dumps(journal))
+        return str(path)
+
+    baseline = write("baseline.json", 1.0)
+    same = write("same.json", 1.0)
+    slower = write("slower.json", 2.0)
+
+    runner = CliRunner()
+    args = ["--no-log-file", "--no-version-check", "journal", "diff"]
+    result = runner.invoke(cli, args + ["--fail-on-regression", baseline, same])
+    assert result.exit_code == 0
+
+    result = runner.invoke(
+        cli,
+        args + ["--fail-on-regression", "--format", "json", baseline, slower],
+    )
+    assert result.exit_code == 1
+    report = json.loads(result.output)
+    assert report["regressions"]["steady_state_duration"] == 1
+
+    result = runner.invoke(cli, args + [slower])
+    assert result.exit_code == 2
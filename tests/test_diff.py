@@ -0,0 +1,116 @@
+from chaostoolkit.diff import diff_journals
+
+
+def make_journal(probe_duration, status="succeeded", tolerance_met=True):
+    return {
+        "experiment": {"title": "hello"},
+        "status": "completed",
+        "deviated": not tolerance_met,
+        "duration": 2.0,
+        "steady_states": {
+            "before": {
+                "steady_state_met": tolerance_met,
+                "probes": [
+                    {
+                        "activity": {"name": "probe"},
+                        "status": "succeeded",
+                        "tolerance_met": tolerance_met,
+                        "duration": probe_duration,
+                    }
+                ],
+            },
+            "after": None,
+            "during": [],
+        },
+        "run": [
+            {"activity": {"name": "action"}, "status": status, "duration": 1},
+            {"activity": {"name": "action"}, "status": status, "duration": 1},
+        ],
+        "rollbacks": [],
+    }
+
+
+def test_diff_identical_journals():
+    report = diff_journals([make_journal(1.0)], make_journal(1.0))
+    assert report["regressions"] == {
+        "duration": 0,
+        "steady_state_duration": 0,
+        "status": 0,
+        "tolerance": 0,
+    }
+    keys = [
+        (a["phase"], a["name"], a["occurrence"]) for a in report["activities"]
+    ]
+    assert keys == [
+        ("hypothesis-before", "probe", 0),
+        ("method", "action", 0),
+        ("method", "action", 1),
+    ]
+
+
+def test_diff_reports_regressions():
+    report = diff_journals(
+        [make_journal(1.0)],
+        make_journal(1.5, status="failed", tolerance_met=False),
+    )
+    probe = report["activities"][0]
+    assert probe["duration"]["delta"] == 0.5
+    assert probe["duration"]["relative"] == 50.0
+    assert probe["duration"]["regression"] is True
+    assert probe["tolerance_met"] == {
+        "baseline": True,
+        "candidate": False,
+        "changed": True,
+    }
+    assert report["run"]["deviated"]["changed"] is True
+    assert report["regressions"] == {
+        "duration": 1,
+        "steady_state_duration": 1,
+        "status": 2,
+        "tolerance": 1,
+    }
+
+
+def test_diff_thresholds():
+    report = diff_journals([make_journal(1.0)], make_journal(1.1))
+    assert report["activities"][0]["duration"]["regression"] is False
+
+    report = diff_journals(
+        [make_journal(1.0)], make_journal(1.1), threshold=5.0
+    )
+    assert report["activities"][0]["duration"]["regression"] is True
+
+    report = diff_journals(
+        [make_journal(1.0)], make_journal(1.1), threshold=5.0, min_delta=0.2
+    )
+    assert report["activities"][0]["duration"]["regression"] is False
+
+
+def test_diff_against_noisy_baselines():
+    baselines = [make_journal(d) for d in (1.0, 2.0, 1.0, 2.0)]
+    # +33% but well within the variance of the baselines
+    report = diff_journals(baselines, make_journal(2.0))
+    assert report["activities"][0]["duration"]["regression"] is False
+
+    report = diff_journals(baselines, make_journal(5.0))
+    probe = report["activities"][0]["duration"]
+    assert probe["baseline"] == 1.5
+    assert probe["z_score"] > 3
+    assert probe["regression"] is True
+
+
+def test_diff_added_and_removed_activities():
+    candidate = make_journal(1.0)
+    candidate["run"] = candidate["run"][:1]
+    candidate["rollbacks"] = [{"activity": {"name": "rollback"}}]
+    report = diff_journals([make_journal(1.0)], candidate)
+    changes = {
+        (a["name"], a["occurrence"]): a.get("change")
+        for a in report["activities"]
+    }
+    assert changes == {
+        ("probe", 0): None,
+        ("action", 0): None,
+        ("rollback", 0): "added",
+        ("action", 1): "removed",
+    }
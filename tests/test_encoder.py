@@ -1,11 +1,19 @@
+import base64
 import decimal
 import json
+import os
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from pathlib import Path
 
 import pytest
 
+from chaostoolkit import encoding, register_encoder
 from chaostoolkit.cli import encoder
+from chaostoolkit.encoding import BASE64_CHUNK_SIZE, dumps
 
 
 def test_encode_date_and_datetime():
@@ -43,3 +51,113 @@ def test_unknown_type():
     with pytest.raises(TypeError) as x:
         json.dumps({"d": Dummy()})
     assert "not JSON serializable" in str(x.value)
+
+
+def test_encode_bytes_as_base64():
+    doc = json.loads(json.dumps({"b": b"hello"}, default=encoder))
+    assert doc["b"] == {"encoding": "base64", "data": "aGVsbG8="}
+
+
+def test_encode_large_bytes_as_base64_chunks():
+    data = os.urandom(BASE64_CHUNK_SIZE * 2 + 10)
+    doc = json.loads(json.dumps({"b": data}, default=encoder))
+    chunks = doc["b"]["chunks"]
+    assert len(chunks) == 3
+    assert base64.b64decode("".join(chunks)) == data
+
+
+def test_encode_set_enum_path_and_dataclass():
+    class Color(Enum):
+        RED = "red"
+
+    @dataclass
+    class Point:
+        x: int
+        y: Decimal
+
+    doc = json.loads(
+        json.dumps(
+            {
+                "s": {3, 1, 2},
+                "c": Color.RED,
+                "p": Path("/tmp/hello"),
+                "pt": Point(1, Decimal("2.5")),
+            },
+            default=encoder,
+        )
+    )
+    assert doc == {
+        "s": [1, 2, 3],
+        "c": "red",
+        "p": "/tmp/hello",
+        "pt": {"x": 1, "y": "2.5"},
+    }
+
+
+def test_encode_numpy_like_values():
+    # a stand-in for numpy types, recognized by their module
+    FakeArray = type(
+        "ndarray", (), {"__module__": "numpy", "tolist": lambda s: [1, 2]}
+    )
+    doc = json.dumps({"a": FakeArray()}, default=encoder)
+    assert json.loads(doc) == {"a": [1, 2]}
+
+
+def test_register_encoder_applies_to_subclasses():
+    class Base:
+        pass
+
+    class Child(Base):
+        pass
+
+    with pytest.raises(TypeError):
+        json.dumps({"c": Child()}, default=encoder)
+
+    register_encoder(Base, lambda o: type(o).__name__)
+    assert json.dumps({"c": Child()}, default=encoder) == '{"c": "Child"}'
+
+
+def test_dumps_matches_standard_library():
+    u = uuid.uuid4()
+    now = datetime.now()
+    doc = {"u": u, "now": now, "d": decimal.Decimal("1.5"), "big": 2**70}
+    assert json.loads(dumps(doc)) == {
+        "u": str(u),
+        "now": now.isoformat(),
+        "d": "1.5",
+        "big": 2**70,
+    }
+    assert dumps([1, {"a": 2}], indent=2) == json.dumps([1, {"a": 2}], indent=2)
+
+
+@pytest.mark.parametrize("backend", ["orjson", "json"])
+def test_registered_uuid_encoder_applies_with_any_backend(backend, monkeypatch):
+    if backend == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(encoding, "_orjson", None)
+    monkeypatch.setattr(encoding, "_registry", dict(encoding._registry))
+    monkeypatch.setattr(encoding, "_handlers", {})
+    monkeypatch.setattr(encoding, "_customized", False)
+    monkeypatch.setattr(encoding, "_overrides_orjson", False)
+
+    u = uuid.uuid4()
+    register_encoder(uuid.UUID, lambda o: o.hex)
+    assert json.loads(dumps({"u": u})) == {"u": u.hex}
+    assert json.loads(dumps({"u": u}, indent=2)) == {"u": u.hex}
+
+
+@pytest.mark.parametrize(
+    "backend,expected",
+    [("orjson", [None, None]), ("json", ["nan", "inf"])],
+)
+def test_non_finite_floats_depend_on_the_backend(
+    backend, expected, monkeypatch
+):
+    if backend == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(encoding, "_orjson", None)
+
+    doc = json.loads(dumps([float("nan"), float("inf")]))
+    assert [x if x is None else str(x) for x in doc] == expected
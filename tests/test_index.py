@@ -0,0 +1,131 @@
+import json
+import os
+import time
+
+from chaostoolkit.index import JournalIndex
+
+
+def make_journal(title, start, deviated=False, status="completed"):
+    return {
+        "experiment": {"title": title},
+        "status": status,
+        "deviated": deviated,
+        "start": start,
+        "duration": 1.5,
+        "steady_states": {
+            "before": {
+                "steady_state_met": True,
+                "probes": [
+                    {
+                        "activity": {"name": "probe", "type": "probe"},
+                        "status": "succeeded",
+                        "tolerance_met": not deviated,
+                        "start": start,
+                        "duration": 0.5,
+                    }
+                ],
+            },
+            "after": None,
+            "during": [],
+        },
+        "run": [
+            {
+                "activity": {"name": "action", "type": "action"},
+                "status": "succeeded",
+                "start": start,
+                "duration": 1.0,
+            }
+        ],
+        "rollbacks": [],
+    }
+
+
+def write(path, doc):
+    with open(path, "w") as f:
+        json.dump(doc, f)
+    return str(path)
+
+
+def test_index_skips_known_journals(tmp_path):
+    first = write(
+        tmp_path / "a.json", make_journal("a", "2024-01-01T00:00:00+00:00")
+    )
+    copy = write(
+        tmp_path / "b.json", make_journal("a", "2024-01-01T00:00:00+00:00")
+    )
+    other = write(tmp_path / "c.json", {"source": "experiment.json"})
+
+    with JournalIndex(str(tmp_path / "journals.db")) as index:
+        assert index.add_file(first) == "indexed"
+        assert index.add_file(copy) == "unchanged"
+        assert index.add_file(other) == "skipped"
+        assert index.add_file(other) == "unchanged"
+        assert len(index.query_runs()) == 1
+
+        # same path, new content: the previous run goes away
+        write(first, make_journal("a", "2024-01-02T00:00:00"))
+        os.utime(first, ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert index.add_file(first) == "indexed"
+        assert len(index.query_runs()) == 2
+
+
+def test_index_forgets_deleted_journals(tmp_path):
+    first = write(
+        tmp_path / "a.json", make_journal("a", "2024-01-01T00:00:00+00:00")
+    )
+    copy = write(
+        tmp_path / "b.json", make_journal("a", "2024-01-01T00:00:00+00:00")
+    )
+
+    with JournalIndex(str(tmp_path / "journals.db")) as index:
+        index.add_file(first)
+        index.add_file(copy)
+        assert index.remove_missing() == 0
+
+        # the run is still in the copy
+        os.remove(first)
+        assert index.remove_missing() == 1
+        assert [r["path"] for r in index.query_runs()] == [copy]
+
+        os.remove(copy)
+        assert index.remove_missing() == 1
+        assert index.query_runs() == []
+        assert index.query_activities("action") == []
+
+
+def test_query_index(tmp_path):
+    db = str(tmp_path / "journals.db")
+    with JournalIndex(db) as index:
+        for day, deviated in ((1, False), (2, True), (3, False)):
+            path = write(
+                tmp_path / f"{day}.json",
+                make_journal(
+                    f"exp-{day % 2}",
+                    f"2024-01-0{day}T00:00:00+00:00",
+                    deviated=deviated,
+                ),
+            )
+            index.add_file(path)
+
+    with JournalIndex(db) as index:
+        runs = index.query_runs()
+        assert [r["experiment"] for r in runs] == ["exp-1", "exp-0", "exp-1"]
+        assert runs[0]["duration"] == 1.5
+
+        runs = index.query_runs(deviated=True)
+        assert [r["experiment"] for r in runs] == ["exp-0"]
+
+        since = 1704153600  # 2024-01-02
+        assert len(index.query_runs(experiment="exp-*", since=since)) == 2
+        assert len(index.query_runs(experiment="exp-1", until=since)) == 1
+        assert len(index.query_runs(activity="probe", limit=1)) == 1
+
+        probes = index.query_activities("probe", deviated=True)
+        assert len(probes) == 1
+        assert probes[0]["phase"] == "hypothesis-before"
+        assert probes[0]["tolerance_met"] == 0
+
+        summary = index.summarize()
+        assert summary[0]["experiment"] == "exp-0"
+        assert summary[0]["deviations"] == 1
+        assert summary[1]["runs"] == 2
@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+import threading
+
+import pytest
+
+from chaostoolkit.journal import (
+    JOURNAL_FORMATS,
+    JournalStreamer,
+    find_journals,
+    guess_journal_format,
+    iter_activity_runs,
+    iter_phase_runs,
+    load_journal,
+    save_journal,
+)
+
+journal = {
+    "chaoslib-version": "1.44.0",
+    "experiment": {"title": "ünïcode"},
+    "status": "completed",
+    "deviated": False,
+    "steady_states": {"before": None, "after": None, "during": []},
+    "run": [
+        {"activity": {"name": "a"}, "status": "succeeded", "output": "x"},
+        {"activity": {"name": "b"}, "status": "failed", "output": None},
+    ],
+    "rollbacks": [],
+}
+
+
+@pytest.mark.parametrize("fmt", JOURNAL_FORMATS)
+def test_save_and_load_journal(fmt):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "journal")
+        save_journal(journal, path, fmt)
+        assert load_journal(path) == journal
+
+
+def test_compact_journal_is_smaller():
+    with tempfile.TemporaryDirectory() as d:
+        sizes = {}
+        for fmt in ("json", "compact", "gzip"):
+            path = os.path.join(d, fmt)
+            save_journal(journal, path, fmt)
+            sizes[fmt] = os.path.getsize(path)
+
+    assert sizes["compact"] < sizes["json"]
+
+
+def test_guess_journal_format():
+    assert guess_journal_format("journal.json") == "json"
+    assert guess_journal_format("journal.json.gz") == "gzip"
+    assert guess_journal_format("journal.json.XZ") == "xz"
+    assert guess_journal_format("journal.ndjson") == "ndjson"
+    assert guess_journal_format("journal.jsonl") == "ndjson"
+
+
+def test_load_interrupted_stream():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "journal.ndjson")
+        with JournalStreamer(path) as streamer:
+            streamer.started({}, {"experiment": {}, "run": []})
+            streamer.start_method({})
+            streamer.activity_completed({}, journal["run"][0])
+
+        with open(path) as f:
+            assert len(f.readlines()) == 2
+
+        loaded = load_journal(path)
+
+    assert loaded["status"] == "interrupted"
+    assert loaded["run"] == journal["run"][:1]
+
+
+def test_stream_continuous_hypothesis_probes():
+    probe = {"activity": {"name": "probe"}, "status": "succeeded"}
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "journal.ndjson")
+        with JournalStreamer(path) as streamer:
+            streamer.started({}, {"experiment": {}, "run": []})
+            streamer.start_method({})
+
+            def hypothesis():
+                streamer.start_continuous_hypothesis(1)
+                streamer.activity_completed({}, probe)
+                streamer.continuous_hypothesis_iteration(1, {"probes": []})
+                streamer.continuous_hypothesis_completed({}, {})
+
+            thread = threading.Thread(target=hypothesis)
+            thread.start()
+            thread.join()
+            streamer.activity_completed({}, journal["run"][0])
+
+        loaded = load_journal(path)
+
+    assert loaded["run"] == journal["run"][:1]
+    assert loaded["steady_states"]["during"] == [
+        {"steady_state_met": None, "probes": [probe]}
+    ]
+    assert list(iter_phase_runs(loaded)) == [
+        ("hypothesis-continuous", probe),
+        ("method", journal["run"][0]),
+    ]
+
+
+def test_load_pretty_json_journal():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "journal.json")
+        with open(path, "w") as f:
+            json.dump(journal, f, indent=2)
+
+        assert load_journal(path) == journal
+
+
+def test_find_journals():
+    with tempfile.TemporaryDirectory() as d:
+        os.makedirs(os.path.join(d, "nested"))
+        for name in ("a.json", "nested/b.json.gz", "nested/c.ndjson"):
+            save_journal(journal, os.path.join(d, name))
+        with open(os.path.join(d, "d.txt"), "w") as f:
+            json.dump(journal, f)
+        # neither experiments nor indexes are journals
+        with open(os.path.join(d, "experiment.json"), "w") as f:
+            json.dump({"title": "hello", "method": []}, f)
+        with open(os.path.join(d, "index.json"), "w") as f:
+            json.dump({"runs": [{"status": "completed"}]}, f)
+        open(os.path.join(d, "empty.json"), "w").close()
+
+        assert find_journals([d]) == [
+            os.path.join(d, "a.json"),
+            os.path.join(d, "nested", "b.json.gz"),
+            os.path.join(d, "nested", "c.ndjson"),
+        ]
+        assert find_journals([os.path.join(d, "*.json")]) == [
+            os.path.join(d, "a.json")
+        ]
+        index_path = os.path.join(d, "index.json")
+        assert find_journals([index_path]) == [index_path]
+
+
+def test_iter_activity_runs():
+    doc = dict(
+        journal,
+        steady_states={
+            "before": {"probes": [{"activity": {"name": "before"}}]},
+            "after": None,
+            "during": [],
+        },
+        rollbacks=[{"activity": {"name": "rollback"}}],
+    )
+    names = [r["activity"]["name"] for r in iter_activity_runs(doc)]
+    assert names == ["before", "a", "b", "rollback"]
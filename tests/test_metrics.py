@@ -0,0 +1,96 @@
+import multiprocessing
+import urllib.request
+
+from chaostoolkit.metrics import (
+    MetricsCollector,
+    MetricsServer,
+    parse_samples,
+)
+
+EXPERIMENT = {"title": 'say "hello"'}
+
+
+def collect(status: str = "completed", deviated: bool = False):
+    collector = MetricsCollector()
+    collector.started(EXPERIMENT, {})
+    collector.activity_completed(
+        {"name": "probe-1", "type": "probe"},
+        {"status": "succeeded", "duration": 0.5},
+    )
+    collector.finish({"status": status, "deviated": deviated, "duration": 2})
+    return collector
+
+
+def test_render_openmetrics():
+    text = collect(deviated=True).render()
+    lines = text.splitlines()
+    assert lines[-1] == "# EOF"
+    assert "# TYPE chaostoolkit_runs counter" in lines
+    experiment = 'experiment="say \\"hello\\""'
+    assert f'chaostoolkit_runs_total{{{experiment},status="completed"}} 1' in (
+        lines
+    )
+    assert f"chaostoolkit_runs_deviated_total{{{experiment}}} 1" in lines
+    assert f"chaostoolkit_run_in_progress{{{experiment}}} 0" in lines
+    assert (
+        'chaostoolkit_activity_duration_seconds_sum{activity="probe-1",'
+        f'{experiment},status="succeeded",type="probe"}} 0.5'
+    ) in lines
+
+
+def test_textfile_counters_persist_across_runs(tmp_path):
+    path = str(tmp_path / "chaostoolkit.prom")
+    collect().write_textfile(path)
+    collect(status="failed").write_textfile(path)
+    collect().write_textfile(path)
+
+    samples = parse_samples(path)
+    labels = (("experiment", 'say "hello"'),)
+    assert samples[("chaostoolkit_run_duration_seconds_count", labels)] == 3
+    assert samples[("chaostoolkit_run_duration_seconds_sum", labels)] == 6
+    assert samples[("chaostoolkit_last_run_duration_seconds", labels)] == 2
+    completed = tuple(sorted(labels + (("status", "completed"),)))
+    failed = tuple(sorted(labels + (("status", "failed"),)))
+    assert samples[("chaostoolkit_runs_total", completed)] == 2
+    assert samples[("chaostoolkit_runs_total", failed)] == 1
+    assert not [p for p in tmp_path.iterdir() if p.suffix == ".tmp"]
+
+
+def write_runs(path: str, runs: int):
+    for _ in range(runs):
+        collect().write_textfile(path)
+
+
+def test_textfile_concurrent_writers_keep_all_samples(tmp_path):
+    path = str(tmp_path / "chaostoolkit.prom")
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=write_runs, args=(path, 5)) for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    labels = (("experiment", 'say "hello"'),)
+    samples = parse_samples(path)
+    assert samples[("chaostoolkit_run_duration_seconds_count", labels)] == 20
+
+
+def test_metrics_endpoint():
+    collector = MetricsCollector()
+    collector.started(EXPERIMENT, {})
+    server = MetricsServer(collector, 0).start()
+    try:
+        url = f"http://127.0.0.1:{server.port}/metrics"
+        with urllib.request.urlopen(url) as r:
+            assert r.headers["Content-Type"].startswith(
+                "application/openmetrics-text"
+            )
+            body = r.read().decode("utf-8")
+    finally:
+        server.stop()
+
+    assert 'chaostoolkit_run_in_progress{experiment="say \\"hello\\""} 1' in (
+        body
+    )
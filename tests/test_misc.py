@@ -1,4 +1,5 @@
 from chaostoolkit.commands.init import is_yaml
+from chaostoolkit.commands.run import expand_sweep
 
 
 def test_is_yaml():
@@ -7,3 +8,22 @@ def test_is_yaml():
     assert is_yaml("experiment.yaml")
     assert is_yaml("experiment.yml")
     assert is_yaml("ExperiMent.YAML")
+
+
+def test_expand_sweep():
+    combinations = expand_sweep(
+        [("region", ["eu", "us"]), ("replicas", [1, 3])], ["a.json", "b.json"]
+    )
+    assert len(combinations) == 8
+    assert combinations[0] == {
+        "var": {"region": "eu", "replicas": 1},
+        "var_file": ["a.json"],
+    }
+    assert combinations[-1] == {
+        "var": {"region": "us", "replicas": 3},
+        "var_file": ["b.json"],
+    }
+
+
+def test_expand_empty_sweep():
+    assert expand_sweep() == [{"var": {}, "var_file": []}]
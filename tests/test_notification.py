@@ -0,0 +1,153 @@
+import threading
+import time
+from unittest.mock import patch
+
+from chaoslib.notification import RunFlowEvent
+
+from chaostoolkit.notification import NotificationDispatcher
+
+received = []
+release = threading.Event()
+
+
+def record(channel, payload):
+    received.append(payload)
+
+
+def block(channel, payload):
+    release.wait(5)
+    received.append(payload)
+
+
+def plugin_settings(func: str, **channel) -> dict:
+    channel.update(
+        {"type": "plugin", "module": "tests.test_notification", "func": func}
+    )
+    return {"notifications": [channel]}
+
+
+def setup_function():
+    received.clear()
+    release.clear()
+
+
+def test_notify_does_not_wait_for_channels():
+    dispatcher = NotificationDispatcher()
+    settings = plugin_settings("block")
+
+    start = time.monotonic()
+    dispatcher.notify(settings, RunFlowEvent.RunStarted, {"title": "hello"})
+    assert time.monotonic() - start < 1
+    assert received == []
+
+    release.set()
+    assert dispatcher.flush(5)
+    assert [p["name"] for p in received] == ["run-started"]
+    assert received[0]["phase"] == "run"
+    assert received[0]["payload"] == {"title": "hello"}
+
+
+def test_payload_is_copied_when_notified():
+    dispatcher = NotificationDispatcher()
+    experiment = {"title": "hello"}
+    dispatcher.notify(
+        plugin_settings("block"), RunFlowEvent.RunStarted, experiment
+    )
+    experiment["title"] = "changed"
+
+    release.set()
+    assert dispatcher.flush(5)
+    assert received[0]["payload"] == {"title": "hello"}
+
+
+def test_pending_events_are_coalesced_and_bounded():
+    dispatcher = NotificationDispatcher(queue_size=4)
+    settings = plugin_settings("block")
+    dispatcher.notify(settings, RunFlowEvent.RunStarted)
+    # let the worker pick the first event up and block on it
+    time.sleep(0.2)
+
+    for _ in range(5):
+        dispatcher.notify(settings, RunFlowEvent.RunCompleted)
+    dispatcher.notify(settings, RunFlowEvent.RunDeviated)
+
+    release.set()
+    assert dispatcher.flush(5)
+    assert [p["name"] for p in received] == [
+        "run-started",
+        "run-completed",
+        "run-deviated",
+    ]
+    # two were dropped as the queue holds four events at most
+    assert received[1]["coalesced"] == 2
+    assert "coalesced" not in received[2]
+
+
+def test_events_of_distinct_runs_are_not_coalesced():
+    dispatcher = NotificationDispatcher()
+    settings = plugin_settings("block")
+    dispatcher.notify(settings, RunFlowEvent.RunStarted)
+    time.sleep(0.2)
+
+    one = {"title": "one"}
+    other = {"title": "other"}
+    dispatcher.notify(settings, RunFlowEvent.RunCompleted, one)
+    dispatcher.notify(settings, RunFlowEvent.RunCompleted, other)
+    dispatcher.notify(settings, RunFlowEvent.RunCompleted, one)
+
+    release.set()
+    assert dispatcher.flush(5)
+    assert [p["payload"] for p in received[1:]] == [other, one]
+    assert received[2]["coalesced"] == 1
+
+
+def test_flush_is_bounded_by_deadline():
+    dispatcher = NotificationDispatcher()
+    dispatcher.notify(plugin_settings("block"), RunFlowEvent.RunStarted)
+
+    start = time.monotonic()
+    assert dispatcher.flush(0.2) is False
+    assert time.monotonic() - start < 1
+    release.set()
+    assert dispatcher.flush(5)
+
+
+def test_events_filter_is_honoured():
+    dispatcher = NotificationDispatcher()
+    settings = plugin_settings("record", events=["run-failed"])
+    dispatcher.notify(settings, RunFlowEvent.RunStarted)
+    dispatcher.notify(settings, RunFlowEvent.RunFailed)
+    assert dispatcher.flush(5)
+    assert [p["name"] for p in received] == ["run-failed"]
+
+
+@patch("chaostoolkit.notification.requests", autospec=True)
+def test_http_channel_timeout_and_batch(requests):
+    requests.HTTPError = Exception
+    dispatcher = NotificationDispatcher()
+    settings = {
+        "notifications": [
+            {
+                "type": "http",
+                "url": "https://example.com/hook",
+                "timeout": [1, 3],
+                "batch": True,
+            },
+            {"type": "plugin", "module": "tests.test_notification"},
+        ]
+    }
+    with patch("chaostoolkit.notification.notify_via_plugin") as plugin:
+        plugin.side_effect = lambda channel, payload: release.wait(5)
+        dispatcher.notify(settings, RunFlowEvent.RunStarted)
+        dispatcher.notify(settings, RunFlowEvent.RunCompleted)
+        release.set()
+        assert dispatcher.flush(5)
+
+    for call in requests.post.call_args_list:
+        assert call[1]["timeout"] == (1, 3)
+    sent = [call[1]["json"] for call in requests.post.call_args_list]
+    names = []
+    for payload in sent:
+        batch = payload if isinstance(payload, list) else [payload]
+        names.extend(p["name"] for p in batch)
+    assert names == ["run-started", "run-completed"]
@@ -0,0 +1,88 @@
+import json
+import sys
+from unittest.mock import patch
+
+from chaostoolkit.plugins import (
+    CLI_PLUGINS_GROUP,
+    _fingerprint,
+    load_cli_plugins,
+)
+
+try:
+    import importlib.metadata as importlib_metadata
+except ImportError:
+    import importlib_metadata
+
+PLUGIN = importlib_metadata.EntryPoint(
+    name="hello", value="chaoshello.cli:hello", group=CLI_PLUGINS_GROUP
+)
+
+
+@patch("chaostoolkit.plugins._scan_entry_points", autospec=True)
+def test_cli_plugins_are_indexed(scan_entry_points, tmp_path):
+    scan_entry_points.return_value = [PLUGIN]
+    index_path = str(tmp_path / "cli-plugins.json")
+
+    assert load_cli_plugins(index_path) == [PLUGIN]
+    plugins = load_cli_plugins(index_path)
+    assert scan_entry_points.call_count == 1
+
+    assert len(plugins) == 1
+    assert plugins[0].name == "hello"
+    assert plugins[0].value == "chaoshello.cli:hello"
+    assert plugins[0].group == CLI_PLUGINS_GROUP
+
+
+@patch("chaostoolkit.plugins._scan_entry_points", autospec=True)
+def test_stale_cli_plugins_index_is_rebuilt(scan_entry_points, tmp_path):
+    scan_entry_points.return_value = []
+    index_path = str(tmp_path / "cli-plugins.json")
+    with open(index_path, "w") as f:
+        json.dump(
+            {
+                "fingerprint": ["another python"],
+                "entry_points": [
+                    {"name": "gone", "value": "gone:cli", "group": "x"}
+                ],
+            },
+            f,
+        )
+
+    assert load_cli_plugins(index_path) == []
+    assert scan_entry_points.call_count == 1
+    with open(index_path) as f:
+        assert json.load(f)["entry_points"] == []
+
+
+@patch("chaostoolkit.plugins._fingerprint", autospec=True)
+@patch("chaostoolkit.plugins._scan_entry_points", autospec=True)
+def test_cli_plugins_index_follows_installed_packages(
+    scan_entry_points, fingerprint, tmp_path
+):
+    index_path = str(tmp_path / "cli-plugins.json")
+    scan_entry_points.return_value = []
+    fingerprint.return_value = ["before"]
+    assert load_cli_plugins(index_path) == []
+
+    scan_entry_points.return_value = [PLUGIN]
+    fingerprint.return_value = ["after"]
+    assert load_cli_plugins(index_path) == [PLUGIN]
+    assert scan_entry_points.call_count == 2
+
+
+def test_fingerprint_ignores_the_current_directory(tmp_path, monkeypatch):
+    one = tmp_path / "one"
+    other = tmp_path / "other"
+    site = tmp_path / "site-packages"
+    for d in (one, other, site):
+        d.mkdir()
+    monkeypatch.setattr(sys, "path", ["", str(site)])
+
+    monkeypatch.chdir(one)
+    fingerprint = _fingerprint()
+    assert [p[0] for p in fingerprint[1:]] == [str(site)]
+    (one / "touched.txt").write_text("")
+    assert _fingerprint() == fingerprint
+
+    monkeypatch.chdir(other)
+    assert _fingerprint() == fingerprint
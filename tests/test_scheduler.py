@@ -0,0 +1,251 @@
+import json
+import os
+import random
+from concurrent.futures import Future
+from datetime import datetime
+
+import pytest
+from click.testing import CliRunner
+
+from chaostoolkit.cli import cli
+from chaostoolkit.scheduler import (
+    CronExpression,
+    ScheduledExperiment,
+    Scheduler,
+    load_schedule,
+    parse_duration,
+)
+
+empty_settings_path = os.path.join(
+    os.path.dirname(__file__), "fixtures", "empty-settings.yaml"
+)
+
+
+def ts(*args):
+    return datetime(*args).timestamp()
+
+
+class FakeRuns:
+    def __init__(self):
+        self.submitted = []
+
+    def __call__(self, experiment, at):
+        future = Future()
+        self.submitted.append((experiment.name, at, future))
+        return future
+
+    def complete(self, index, status="completed"):
+        self.submitted[index][2].set_result(
+            {"status": status, "deviated": False, "exit_code": 0}
+        )
+
+
+def test_parse_duration():
+    assert parse_duration(5) == 5.0
+    assert parse_duration("30s") == 30.0
+    assert parse_duration("1.5m") == 90.0
+    assert parse_duration("2h") == 7200.0
+    assert parse_duration("1d") == 86400.0
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+    with pytest.raises(ValueError):
+        parse_duration("-1s")
+
+
+def test_cron_expression_next_after():
+    every_15 = CronExpression("*/15 * * * *")
+    assert every_15.next_after(ts(2024, 3, 1, 10, 7, 30)) == ts(
+        2024, 3, 1, 10, 15
+    )
+    assert every_15.next_after(ts(2024, 3, 1, 10, 15)) == ts(2024, 3, 1, 10, 30)
+
+    weekdays = CronExpression("30 9 * * mon-fri")
+    # 2 March 2024 is a Saturday
+    assert weekdays.next_after(ts(2024, 3, 2, 12)) == ts(2024, 3, 4, 9, 30)
+
+    assert CronExpression("@monthly").next_after(ts(2024, 1, 31)) == ts(
+        2024, 2, 1
+    )
+    assert CronExpression("0 0 29 feb *").next_after(ts(2024, 3, 1)) == ts(
+        2028, 2, 29
+    )
+    # either the day of the month or the day of the week
+    either = CronExpression("0 0 13 * 5")
+    assert either.next_after(ts(2024, 3, 2)) == ts(2024, 3, 8)
+    assert CronExpression("0 0 * * 7").next_after(ts(2024, 3, 2)) == ts(
+        2024, 3, 3
+    )
+
+    for invalid in ("* * * *", "60 * * * *", "*/0 * * * *", "a * * * *"):
+        with pytest.raises(ValueError):
+            CronExpression(invalid)
+
+
+def test_load_schedule(tmp_path):
+    path = tmp_path / "schedule.yaml"
+    path.write_text(
+        "max-concurrency: 3\n"
+        "jitter: 10s\n"
+        "experiments:\n"
+        "  - source: experiments/latency.json\n"
+        "    cron: '*/5 * * * *'\n"
+        "    var-file: vars.env\n"
+        "  - source: https://example.com/failover.yaml\n"
+        "    every: 1h\n"
+        "    catch-up: once\n"
+        "    jitter: 0\n"
+        "    fail-fast: true\n"
+    )
+    experiments, config = load_schedule(str(path))
+    assert config == {"max_concurrency": 3}
+
+    latency, failover = experiments
+    assert latency.name == "latency"
+    assert latency.source == str(tmp_path / "experiments" / "latency.json")
+    assert latency.jitter == 10.0
+    assert latency.options == {"var_file": [str(tmp_path / "vars.env")]}
+    assert failover.name == "failover"
+    assert failover.every == 3600.0
+    assert failover.catch_up == "once"
+    assert failover.jitter == 0
+    assert failover.options == {"fail_fast": True}
+
+    path.write_text("experiments:\n  - source: a.json\n    shell: ls\n")
+    with pytest.raises(ValueError, match="shell"):
+        load_schedule(str(path))
+
+    path.write_text("experiments:\n  - source: a.json\n")
+    with pytest.raises(ValueError, match="cron expression or an interval"):
+        load_schedule(str(path))
+
+
+def test_interval_fires_at_start_and_never_overlaps():
+    runs = FakeRuns()
+    experiment = ScheduledExperiment("exp", "exp.json", every=60)
+    scheduler = Scheduler([experiment], runs)
+    scheduler.start(1000)
+
+    assert scheduler.tick(1000) == 60
+    assert [r[:2] for r in runs.submitted] == [("exp", 1000)]
+
+    # still running, the next firing is skipped
+    scheduler.tick(1060)
+    assert len(runs.submitted) == 1
+
+    runs.complete(0)
+    assert scheduler.running() == []
+    scheduler.tick(1120)
+    assert [r[:2] for r in runs.submitted] == [("exp", 1000), ("exp", 1120)]
+
+
+def test_max_concurrency_queues_firings():
+    runs = FakeRuns()
+    experiments = [
+        ScheduledExperiment(name, f"{name}.json", every=60)
+        for name in ("a", "b", "c")
+    ]
+    scheduler = Scheduler(experiments, runs, max_concurrency=2)
+    scheduler.start(1000)
+    scheduler.tick(1000)
+    assert [r[0] for r in runs.submitted] == ["a", "b"]
+
+    runs.complete(0)
+    scheduler.tick(1001)
+    assert [r[0] for r in runs.submitted] == ["a", "b", "c"]
+
+
+def test_stop_while_dispatching_drops_the_queued_runs():
+    runs = FakeRuns()
+    experiments = [
+        ScheduledExperiment(name, f"{name}.json", every=60)
+        for name in ("a", "b", "c")
+    ]
+    scheduler = Scheduler(experiments, None, max_concurrency=1)
+
+    def submit(experiment, at):
+        # as if SIGTERM was received while submitting the run
+        scheduler.stop()
+        return runs(experiment, at)
+
+    scheduler.submit = submit
+    scheduler.start(1000)
+    scheduler.tick(1000)
+    runs.complete(0)
+    scheduler.tick(1001)
+    assert [r[0] for r in runs.submitted] == ["a"]
+
+
+@pytest.mark.parametrize(
+    "policy,expected",
+    [("skip", []), ("once", [1540]), ("all", [1180, 1360, 1540])],
+)
+def test_catch_up_policies(tmp_path, policy, expected):
+    state_path = str(tmp_path / "state.json")
+    with open(state_path, "w") as f:
+        json.dump({"experiments": {"exp": {"last_scheduled": 1000}}}, f)
+
+    runs = FakeRuns()
+    experiment = ScheduledExperiment(
+        "exp", "exp.json", every=180, catch_up=policy
+    )
+    scheduler = Scheduler([experiment], runs, state_path=state_path)
+    scheduler.start(1650)
+    scheduler.tick(1650)
+    # caught up firings run one after the other
+    for index, _ in enumerate(expected):
+        runs.complete(index)
+        scheduler.tick(1650)
+
+    assert [r[1] for r in runs.submitted] == expected
+    assert scheduler.next_firings() == {"exp": 1720}
+
+    with open(state_path) as f:
+        state = json.load(f)["experiments"]["exp"]
+    assert state.get("runs", 0) == len(expected)
+    if expected:
+        assert state["last_scheduled"] == expected[-1]
+        assert state["last_status"] == "completed"
+
+
+def test_jitter_delays_firings():
+    runs = FakeRuns()
+    experiment = ScheduledExperiment("exp", "exp.json", every=60, jitter=30)
+    scheduler = Scheduler([experiment], runs, rng=random.Random(1))
+    scheduler.start(1000)
+    due = scheduler.next_firings()["exp"]
+    assert 1000 <= due <= 1030
+
+    scheduler.tick(due - 0.1)
+    assert runs.submitted == []
+    scheduler.tick(due)
+    assert [r[1] for r in runs.submitted] == [1000]
+
+
+def test_schedule_list(tmp_path):
+    path = tmp_path / "schedule.json"
+    path.write_text(
+        json.dumps(
+            {
+                "experiments": [
+                    {"source": "exp.json", "cron": "0 0 * * *"},
+                    {"source": "other.json", "every": "10m"},
+                ]
+            }
+        )
+    )
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--settings",
+            empty_settings_path,
+            "--no-log-file",
+            "schedule",
+            "--list",
+            str(path),
+        ],
+    )
+    assert result.exit_code == 0
+    lines = result.stdout.splitlines()
+    assert lines[0].startswith("exp ")
+    assert lines[0].endswith(str(tmp_path / "exp.json"))
+    assert lines[1].startswith("other ")
@@ -0,0 +1,263 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from click.testing import CliRunner
+
+from chaostoolkit.cli import cli
+from chaostoolkit.commands.run import create_pool, shutdown_pool
+from chaostoolkit.commands.serve import WorkerPool, handle_request
+from chaostoolkit.server import ChaosServer, send_request
+
+fixtures_dir = os.path.join(os.path.dirname(__file__), "fixtures")
+empty_settings_path = os.path.join(fixtures_dir, "empty-settings.yaml")
+# an experiment whose method outputs the FOO environment variable
+ENV_EXPERIMENT = {
+    "title": "Output the FOO environment variable",
+    "description": "n/a",
+    "configuration": {"foo": {"type": "env", "key": "FOO", "default": "unset"}},
+    "method": [
+        {
+            "name": "output-foo",
+            "type": "probe",
+            "provider": {
+                "type": "python",
+                "module": "os.path",
+                "func": "basename",
+                "arguments": {"p": "${foo}"},
+            },
+        }
+    ],
+}
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(socket_path, handler):
+        server = ChaosServer(socket_path, handler).start()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.close()
+
+
+def echo(request):
+    yield {"type": "accepted"}
+    yield {"type": "result", "echo": request}
+
+
+def test_send_request_yields_messages_up_to_the_result(tmp_path, serve):
+    socket_path = str(tmp_path / "chaos.sock")
+    serve(socket_path, echo)
+
+    messages = list(send_request(socket_path, {"command": "ping"}, 5))
+    assert messages == [
+        {"type": "accepted"},
+        {"type": "result", "echo": {"command": "ping"}},
+    ]
+    assert os.stat(socket_path).st_mode & 0o077 == 0
+
+
+def test_invalid_requests_and_failures_are_errors(tmp_path, serve):
+    def fail(request):
+        yield {"type": "accepted"}
+        raise RuntimeError("boom")
+
+    socket_path = str(tmp_path / "chaos.sock")
+    serve(socket_path, fail)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(b"not json\n[]\n")
+        with sock.makefile("rb") as f:
+            assert json.loads(f.readline())["type"] == "error"
+            assert json.loads(f.readline())["message"] == (
+                "Requests must be JSON objects"
+            )
+
+    messages = list(send_request(socket_path, {}, 5))
+    assert messages == [
+        {"type": "accepted"},
+        {"type": "error", "message": "boom"},
+    ]
+
+
+def test_stale_socket_is_replaced(tmp_path, serve):
+    socket_path = str(tmp_path / "chaos.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    serve(socket_path, echo)
+    assert list(send_request(socket_path, {}, 5))[-1]["type"] == "result"
+
+    with pytest.raises(OSError):
+        ChaosServer(socket_path, echo).start()
+
+    with pytest.raises(OSError):
+        list(send_request(str(tmp_path / "missing.sock"), {}, 5))
+
+
+def test_handle_request_runs_and_validates_in_pool():
+    experiment = os.path.join(fixtures_dir, "check-file-exists.json")
+    with create_pool({}, workers=1, prefork=True) as pool:
+        assert list(handle_request(pool, None, {"command": "ping"}))[0][
+            "version"
+        ]
+
+        messages = list(
+            handle_request(
+                pool,
+                None,
+                {
+                    "command": "validate",
+                    "source": experiment,
+                    "cwd": fixtures_dir,
+                },
+            )
+        )
+        assert messages[0] == {"type": "accepted"}
+        assert messages[1]["status"] == "valid"
+
+        pending = set()
+        list(
+            handle_request(
+                pool,
+                None,
+                {"command": "validate", "source": experiment},
+                pending,
+            )
+        )
+        assert pending == set()
+
+        messages = list(
+            handle_request(
+                pool,
+                None,
+                {
+                    "command": "run",
+                    "source": experiment,
+                    "options": {"journal_path": os.devnull, "shell": True},
+                },
+            )
+        )
+        assert messages == [
+            {"type": "error", "message": "Unsupported options: shell"}
+        ]
+
+
+def test_handle_request_loads_env_var_files_in_the_client_env(tmp_path):
+    experiment = tmp_path / "experiment.json"
+    experiment.write_text(json.dumps(ENV_EXPERIMENT))
+    var_file = tmp_path / "a.env"
+    var_file.write_text("FOO=one\n")
+
+    with create_pool({}, workers=1) as pool:
+        messages = list(
+            handle_request(
+                pool,
+                None,
+                {
+                    "command": "run",
+                    "source": str(experiment),
+                    "options": {
+                        "journal_path": os.devnull,
+                        "var_file": [str(var_file)],
+                        "include_journal": True,
+                    },
+                    "cwd": str(tmp_path),
+                    "env": {"PATH": os.environ.get("PATH", "")},
+                },
+            )
+        )
+    journal = messages[-1]["journal"]
+    assert journal["run"][0]["output"] == "one"
+
+
+def test_shutdown_pool_cancels_the_futures_not_started_yet():
+    pool = create_pool({}, workers=1, prefork=True)
+    running = pool.submit(time.sleep, 0.5)
+    time.sleep(0.1)
+    queued = [pool.submit(time.sleep, 0.2) for _ in range(5)]
+
+    shutdown_pool(pool, [running, *queued])
+    assert running.done() and not running.cancelled()
+    # the pool hands a couple of futures over to its workers in advance
+    assert all(f.cancelled() for f in queued[2:])
+
+
+def test_worker_pool_is_replaced_once_broken():
+    pool = WorkerPool({}, workers=1)
+    try:
+        pid = pool.submit(os.getpid).result()
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result()
+
+        assert pool.submit(os.getpid).result() != pid
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 11), reason="max_tasks_per_child is from 3.11"
+)
+def test_workers_are_replaced_after_max_runs():
+    with create_pool({}, workers=1, prefork=True, max_runs=1) as pool:
+        first = pool.submit(os.getpid).result()
+        assert pool.submit(os.getpid).result() != first
+
+
+def test_run_on_server(tmp_path, serve):
+    socket_path = str(tmp_path / "chaos.sock")
+    experiment = os.path.join(fixtures_dir, "check-file-exists.json")
+    with create_pool({}, workers=1) as pool:
+        serve(socket_path, lambda r: handle_request(pool, None, r))
+
+        runner = CliRunner()
+        with runner.isolated_filesystem(temp_dir=tmp_path):
+            result = runner.invoke(
+                cli,
+                [
+                    "--settings",
+                    empty_settings_path,
+                    "--no-log-file",
+                    "run",
+                    "--server",
+                    "--server-socket",
+                    socket_path,
+                    experiment,
+                ],
+            )
+            assert result.exit_code == 0
+            with open("journal.json") as f:
+                assert json.load(f)["status"] == "completed"
+
+            result = runner.invoke(
+                cli,
+                [
+                    "--settings",
+                    empty_settings_path,
+                    "--no-log-file",
+                    "run",
+                    "--server",
+                    "--server-socket",
+                    socket_path,
+                    "--journal-path",
+                    "-",
+                    os.path.join(fixtures_dir, "check-file-exists-fail.json"),
+                ],
+            )
+            assert result.exit_code == 1
+            assert json.loads(result.stdout)["status"] == "failed"
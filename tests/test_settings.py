@@ -0,0 +1,310 @@
+import multiprocessing
+import marshal
+import os
+import time
+from datetime import date, datetime
+
+import pytest
+import yaml
+from chaoslib.settings import get_loaded_settings
+from click.testing import CliRunner
+
+from chaostoolkit import settings as settings_module
+from chaostoolkit.cli import cli
+from chaostoolkit.settings import (
+    InvalidSettings,
+    SettingsConflict,
+    apply_json_patch,
+    apply_settings_changes,
+    get_settings_cache_path,
+    load_settings,
+    lock_settings,
+    update_settings,
+)
+
+
+@pytest.fixture
+def settings_path(tmp_path):
+    path = tmp_path / "settings.yaml"
+    path.write_text("notifications:\n  - type: http\n    url: http://a\n")
+    # old enough to be cached
+    past = time.time() - 60
+    os.utime(path, (past, past))
+    settings_module._memory.clear()
+    return str(path)
+
+
+def count_parses(monkeypatch):
+    calls = []
+    parse = settings_module._parse
+
+    def counting_parse(*args):
+        calls.append(args)
+        return parse(*args)
+
+    monkeypatch.setattr(settings_module, "_parse", counting_parse)
+    return calls
+
+
+def test_load_settings_reuses_its_snapshot(settings_path, monkeypatch):
+    parses = count_parses(monkeypatch)
+
+    settings = load_settings(settings_path)
+    assert settings == {"notifications": [{"type": "http", "url": "http://a"}]}
+    assert get_loaded_settings() is settings
+    assert os.path.exists(get_settings_cache_path(settings_path))
+
+    # each call gets its own copy
+    settings["notifications"].clear()
+    assert load_settings(settings_path)["notifications"] != []
+
+    # a new process only has the snapshot on disk
+    settings_module._memory.clear()
+    assert load_settings(settings_path)["notifications"][0]["type"] == "http"
+    assert len(parses) == 1
+
+
+def test_load_settings_keeps_a_snapshot_per_file(
+    settings_path, tmp_path, monkeypatch
+):
+    other_path = tmp_path / "other.yaml"
+    other_path.write_text("auths: {}\n")
+    load_settings(settings_path)
+    load_settings(str(other_path))
+
+    reads = []
+    monkeypatch.setattr(
+        settings_module, "_read_snapshot", lambda *args: reads.append(args)
+    )
+    for _ in range(2):
+        assert "notifications" in load_settings(settings_path)
+        assert load_settings(str(other_path)) == {"auths": {}}
+    assert reads == []
+
+
+def test_load_settings_parses_changed_files(settings_path, monkeypatch):
+    parses = count_parses(monkeypatch)
+    load_settings(settings_path)
+
+    with open(settings_path, "w") as f:
+        f.write("auths: {}\n")
+    assert load_settings(settings_path) == {"auths": {}}
+    assert len(parses) == 2
+
+    # modified too recently to be trusted, the snapshot is left as it was
+    with open(get_settings_cache_path(settings_path), "rb") as f:
+        assert "notifications" in marshal.loads(marshal.load(f)[1])
+
+
+def test_load_settings_ignores_corrupted_snapshots(settings_path):
+    load_settings(settings_path)
+    settings_module._memory.clear()
+    with open(get_settings_cache_path(settings_path), "wb") as f:
+        f.write(b"garbage")
+
+    assert load_settings(settings_path)["notifications"][0]["url"] == "http://a"
+
+
+def test_load_settings_ignores_snapshots_writable_by_others(
+    settings_path, monkeypatch
+):
+    load_settings(settings_path)
+    settings_module._memory.clear()
+    os.chmod(get_settings_cache_path(settings_path), 0o666)
+    parses = count_parses(monkeypatch)
+
+    assert load_settings(settings_path)["notifications"][0]["url"] == "http://a"
+    assert len(parses) == 1
+
+
+def test_load_settings_snapshot_keeps_dates(tmp_path):
+    path = tmp_path / "settings.yaml"
+    path.write_text("since: 2024-01-02\nat: 2024-01-02 03:04:05\n")
+    past = time.time() - 60
+    os.utime(path, (past, past))
+
+    load_settings(str(path))
+    settings_module._memory.clear()
+    assert load_settings(str(path)) == {
+        "since": date(2024, 1, 2),
+        "at": datetime(2024, 1, 2, 3, 4, 5),
+    }
+
+
+def test_load_settings_without_file_or_with_invalid_yaml(tmp_path):
+    assert load_settings(str(tmp_path / "missing.yaml")) is None
+
+    path = tmp_path / "invalid.yaml"
+    path.write_text("a: [\n")
+    assert load_settings(str(path)) is None
+
+
+def test_apply_settings_changes():
+    settings = {"auths": {"a.com": {"type": "bearer"}}, "controls": [1, 2]}
+    apply_settings_changes(
+        settings,
+        [
+            ("set", "auths.a\\\\.com.type", "basic"),
+            ("remove", "controls[0]", None),
+        ],
+    )
+    assert settings == {"auths": {"a.com": {"type": "basic"}}, "controls": [2]}
+
+    with pytest.raises(ValueError, match="No settings entry at 'burp'"):
+        apply_settings_changes(settings, [("set", "burp", 1)])
+
+
+def test_apply_json_patch():
+    settings = {"auths": {}, "controls": [{"name": "a"}]}
+    apply_json_patch(
+        settings,
+        [
+            {"op": "add", "path": "/auths/a.com", "value": {"type": "x"}},
+            {"op": "replace", "path": "/auths/a.com/type", "value": "bearer"},
+            {"op": "copy", "from": "/controls/0", "path": "/controls/-"},
+            {"op": "move", "from": "/controls/1", "path": "/controls/0"},
+            {"op": "add", "path": "/controls/0/name", "value": "b"},
+            {"op": "remove", "path": "/controls/1"},
+            {"op": "test", "path": "/controls", "value": [{"name": "b"}]},
+        ],
+    )
+    assert settings == {
+        "auths": {"a.com": {"type": "bearer"}},
+        "controls": [{"name": "b"}],
+    }
+
+    with pytest.raises(ValueError, match="'/burp' does not exist"):
+        apply_json_patch(settings, [{"op": "remove", "path": "/burp"}])
+    with pytest.raises(ValueError, match="tested value"):
+        apply_json_patch(
+            settings, [{"op": "test", "path": "/auths", "value": {}}]
+        )
+
+
+def test_settings_apply_command(settings_path, tmp_path):
+    patch_path = tmp_path / "patch.json"
+    patch_path.write_text(
+        '[{"op": "add", "path": "/auths", "value": {"a.com": {}}}]'
+    )
+    os.chmod(settings_path, 0o600)
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--settings",
+            settings_path,
+            "settings",
+            "apply",
+            "--patch",
+            str(patch_path),
+            'auths.a\\\\.com={"type": "bearer"}',
+            'notifications[0].url="http://b"',
+            "-notifications[0].type",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    with open(settings_path) as f:
+        assert yaml.safe_load(f) == {
+            "auths": {"a.com": {"type": "bearer"}},
+            "notifications": [{"url": "http://b"}],
+        }
+    assert os.stat(settings_path).st_mode & 0o777 == 0o600
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".tmp")]
+
+
+def test_settings_apply_command_changes_all_or_nothing(settings_path):
+    with open(settings_path) as f:
+        before = f.read()
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--settings",
+            settings_path,
+            "settings",
+            "apply",
+            'notifications[0].url="http://b"',
+            "-burp",
+        ],
+    )
+    assert result.exit_code == 1
+    with open(settings_path) as f:
+        assert f.read() == before
+
+
+def test_update_settings_leaves_invalid_files_alone(tmp_path):
+    settings_path = str(tmp_path / "settings.yaml")
+    with open(settings_path, "w") as f:
+        f.write("auths: {a.com: [\n")
+
+    with pytest.raises(InvalidSettings):
+        update_settings(settings_path, lambda s: s.update({"controls": {}}))
+    with open(settings_path) as f:
+        assert f.read() == "auths: {a.com: [\n"
+
+    # an empty file holds no settings yet
+    with open(settings_path, "w") as f:
+        f.write("# nothing yet\n")
+    assert update_settings(settings_path, lambda s: s.update(a=1)) == {"a": 1}
+
+
+def add_entry(settings_path, name):
+    update_settings(
+        settings_path,
+        lambda settings: settings.setdefault("controls", {}).update({name: {}}),
+    )
+
+
+def test_update_settings_from_concurrent_processes(settings_path):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=add_entry, args=(settings_path, f"c{i}"))
+        for i in range(8)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    settings_module._memory.clear()
+    assert sorted(load_settings(settings_path)["controls"]) == [
+        f"c{i}" for i in range(8)
+    ]
+
+
+def test_update_settings_applies_again_after_a_conflict(settings_path):
+    attempts = []
+
+    def update(settings):
+        attempts.append(dict(settings))
+        if len(attempts) == 1:
+            # another writer, not taking the lock, replaces the file
+            with open(settings_path, "w") as f:
+                f.write("auths: {}\n")
+        settings["extra"] = True
+
+    update_settings(settings_path, update)
+    assert len(attempts) == 2
+    settings_module._memory.clear()
+    assert load_settings(settings_path) == {"auths": {}, "extra": True}
+
+
+def test_update_settings_gives_up_on_conflicts(settings_path):
+    def update(settings):
+        with open(settings_path, "a") as f:
+            f.write("#\n")
+
+    with pytest.raises(SettingsConflict):
+        update_settings(settings_path, update, retries=1)
+    tmp_dir = os.path.dirname(settings_path)
+    assert not [p for p in os.listdir(tmp_dir) if p.endswith(".tmp")]
+
+
+def test_lock_settings_times_out(settings_path):
+    with lock_settings(settings_path):
+        with pytest.raises(TimeoutError):
+            with lock_settings(settings_path, timeout=0.1):
+                pass
+
+    with lock_settings(settings_path, timeout=0.1):
+        pass
@@ -0,0 +1,20 @@
+from chaostoolkit.sources import normalize_keys, resolve_path, source_name
+
+
+def test_normalize_keys():
+    assert normalize_keys({"journal-path": "a", "var_file": []}) == {
+        "journal_path": "a",
+        "var_file": [],
+    }
+
+
+def test_resolve_path():
+    assert resolve_path("/base", "exp.json") == "/base/exp.json"
+    assert resolve_path("/base", "/abs/exp.json") == "/abs/exp.json"
+    assert resolve_path("/base", "https://x/exp.json") == "https://x/exp.json"
+
+
+def test_source_name():
+    assert source_name("/path/to/latency.yaml") == "latency"
+    assert source_name("https://example.com/exps/cpu.json") == "cpu"
+    assert source_name("") == "experiment"
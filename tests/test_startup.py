@@ -0,0 +1,89 @@
+import json
+import subprocess
+import sys
+import time
+
+from click.testing import CliRunner
+from click.utils import make_default_short_help
+
+from chaostoolkit.cli import cli
+from chaostoolkit.commands import LAZY_COMMANDS
+from chaostoolkit.timing import profile_imports
+
+# modules that must not be imported until a command actually needs them
+HEAVY_MODULES = [
+    "requests",
+    "chaoslib.control",
+    "chaoslib.discovery",
+    "chaoslib.experiment",
+    "chaoslib.notification",
+    "chaostoolkit.commands.discover",
+    "chaostoolkit.commands.init",
+    "chaostoolkit.commands.run",
+    "chaostoolkit.commands.validate",
+]
+
+# generous on purpose, this catches regressions not slow machines
+MAX_HELP_DURATION = 5.0
+
+
+def imported_modules(*args: str) -> list:
+    code = (
+        "import json, sys\n"
+        "from chaostoolkit.cli import cli\n"
+        "try:\n"
+        f"    cli({list(args)!r})\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "sys.stderr.write(json.dumps(sorted(sys.modules)))\n"
+    )
+    p = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    return json.loads(p.stderr.splitlines()[-1])
+
+
+def test_help_does_not_import_subcommands():
+    modules = imported_modules("--no-version-check", "--help")
+    for module in HEAVY_MODULES:
+        assert module not in modules
+
+
+def test_settings_command_does_not_import_run_machinery():
+    modules = imported_modules(
+        "--no-log-file", "--no-version-check", "settings", "--help"
+    )
+    assert "chaostoolkit.commands.settings" in modules
+    for module in HEAVY_MODULES:
+        assert module not in modules
+
+
+def test_help_startup_time():
+    start = time.perf_counter()
+    p = subprocess.run(
+        [sys.executable, "-m", "chaostoolkit", "--no-version-check", "--help"],
+        capture_output=True,
+    )
+    duration = time.perf_counter() - start
+    assert p.returncode == 0
+    assert duration < MAX_HELP_DURATION
+
+
+def test_lazy_commands_short_help_is_accurate():
+    runner = CliRunner()
+    for name, (_, short_help) in LAZY_COMMANDS.items():
+        cmd = cli.get_command(None, name)
+        assert cmd.name == name
+        assert cmd.get_short_help_str() == make_default_short_help(short_help)
+
+    result = runner.invoke(cli, ["--no-version-check", "--help"])
+    for name in LAZY_COMMANDS:
+        assert name in result.output
+
+
+def test_profile_imports():
+    entries = profile_imports(["json", "chaostoolkit.cli"])
+    names = [e["name"] for e in entries if e["depth"] == 0]
+    assert "json" in names
+    assert "chaostoolkit.cli" in names
+    assert all(e["cumulative"] >= e["self"] for e in entries)
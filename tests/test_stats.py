@@ -0,0 +1,138 @@
+import os
+import tempfile
+
+from chaostoolkit.journal import save_journal
+from chaostoolkit.stats import JournalStats, Reservoir, collect_stats
+
+
+def make_journal(title, status="completed", deviated=False, durations=()):
+    return {
+        "experiment": {"title": title},
+        "status": status,
+        "deviated": deviated,
+        "duration": sum(durations),
+        "steady_states": {
+            "before": {
+                "steady_state_met": True,
+                "probes": [
+                    {
+                        "activity": {"name": "probe"},
+                        "status": "succeeded",
+                        "duration": 0.1,
+                    }
+                ],
+            },
+            "after": None,
+            "during": [],
+        },
+        "run": [
+            {
+                "activity": {"name": f"action-{index}"},
+                "status": "failed" if status == "failed" else "succeeded",
+                "duration": duration,
+            }
+            for index, duration in enumerate(durations)
+        ],
+        "rollbacks": [],
+    }
+
+
+def test_reservoir_is_exact_below_its_size():
+    reservoir = Reservoir(100)
+    for value in range(1, 101):
+        reservoir.add(value)
+    assert reservoir.percentile(50) == 50
+    assert reservoir.percentile(99) == 99
+    assert reservoir.percentile(100) == 100
+
+
+def test_reservoir_is_bounded():
+    reservoir = Reservoir(10)
+    other = Reservoir(10)
+    for value in range(1000):
+        reservoir.add(value)
+        other.add(value)
+    reservoir.merge(other)
+    assert len(reservoir.values) == 10
+    assert reservoir.count == 2000
+
+
+def test_journal_stats():
+    stats = JournalStats()
+    stats.add_journal(make_journal("a", durations=[1.0, 2.0]))
+    stats.add_journal(make_journal("a", deviated=True, durations=[3.0]))
+    stats.add_journal(make_journal("b", status="failed", durations=[4.0]))
+    report = stats.to_dict(top=1)
+
+    assert report["journals"] == 3
+    assert report["rates"] == {
+        "succeeded": 1 / 3,
+        "deviated": 1 / 3,
+        "failed": 1 / 3,
+    }
+    assert report["experiments"]["a"]["outcomes"] == {
+        "completed": 1,
+        "deviated": 1,
+    }
+    assert report["experiments"]["a"]["duration"]["max"] == 3.0
+    assert report["activities"]["probe"]["runs"] == 3
+    assert report["activities"]["action-0"]["duration"]["p50"] == 3.0
+    assert report["slowest"] == [{"name": "action-0", "p95": 4.0}]
+    assert report["most_failing"] == [
+        {"name": "action-0", "failures": 1, "runs": 3}
+    ]
+
+
+def test_skipped_activities_are_not_failures():
+    journal = make_journal("a", durations=[1.0, 2.0])
+    journal["run"][1]["status"] = "skipped"
+    stats = JournalStats()
+    stats.add_journal(journal)
+    report = stats.to_dict()
+
+    assert report["activities"]["action-1"]["outcomes"] == {"skipped": 1}
+    assert report["activities"]["action-1"]["failures"] == 0
+    assert report["most_failing"] == []
+
+
+def test_journal_stats_counts_failed_and_deviated_runs_as_deviated():
+    stats = JournalStats()
+    stats.add_journal(make_journal("a", durations=[1.0]))
+    stats.add_journal(
+        make_journal("a", status="failed", deviated=True, durations=[1.0])
+    )
+    assert stats.to_dict()["rates"] == {
+        "succeeded": 0.5,
+        "deviated": 0.5,
+        "failed": 0.0,
+    }
+
+
+def test_journal_stats_merge():
+    one = JournalStats()
+    one.add_journal(make_journal("a", durations=[1.0]))
+    other = JournalStats()
+    other.add_journal(make_journal("a", durations=[2.0]))
+    one.merge(other)
+    report = one.to_dict()
+    assert report["journals"] == 2
+    assert report["activities"]["action-0"]["duration"]["mean"] == 1.5
+
+
+def test_collect_stats_in_parallel():
+    with tempfile.TemporaryDirectory() as d:
+        paths = []
+        for index in range(6):
+            path = os.path.join(d, f"journal-{index}.json.gz")
+            save_journal(make_journal("a", durations=[index]), path)
+            paths.append(path)
+        path = os.path.join(d, "index.json")
+        save_journal({"source": "experiment.json", "runs": []}, path)
+        paths.append(path)
+
+        stats = collect_stats(paths, workers=2, chunk_size=2)
+
+    report = stats.to_dict()
+    assert report["journals"] == 6
+    assert report["skipped"] == 1
+    assert report["activities"]["action-0"]["duration"]["max"] == 5
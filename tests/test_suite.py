@@ -0,0 +1,166 @@
+import json
+import os
+from concurrent.futures import Future
+
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from chaostoolkit.cli import cli
+from chaostoolkit.suite import (
+    SuiteNode,
+    load_suite,
+    run_suite,
+    topological_order,
+)
+
+fixtures_dir = os.path.join(os.path.dirname(__file__), "fixtures")
+empty_settings_path = os.path.join(fixtures_dir, "empty-settings.yaml")
+
+
+def completed(exit_code=0):
+    future = Future()
+    future.set_result(
+        {
+            "status": "completed" if exit_code == 0 else "failed",
+            "deviated": False,
+            "exit_code": exit_code,
+        }
+    )
+    return future
+
+
+def test_topological_order():
+    nodes = [
+        SuiteNode("kill", "kill.json", after=["baseline"]),
+        SuiteNode("baseline", "baseline.json"),
+        SuiteNode("other", "other.json"),
+    ]
+    assert [n.name for n in topological_order(nodes)] == [
+        "baseline",
+        "other",
+        "kill",
+    ]
+
+    with pytest.raises(ValueError, match="not an experiment"):
+        topological_order([SuiteNode("a", "a.json", after=["b"])])
+
+    with pytest.raises(ValueError, match="Circular dependencies"):
+        topological_order(
+            [
+                SuiteNode("a", "a.json", after=["b"]),
+                SuiteNode("b", "b.json", after=["a"]),
+            ]
+        )
+
+    with pytest.raises(ValueError, match="distinct name"):
+        topological_order([SuiteNode("a", "a.json"), SuiteNode("a", "b.json")])
+
+
+def test_load_suite(tmp_path):
+    path = tmp_path / "suite.yaml"
+    path.write_text(
+        "workers: 2\n"
+        "var-file: shared.yaml\n"
+        "experiments:\n"
+        "  - source: experiments/baseline.json\n"
+        "  - source: experiments/kill.json\n"
+        "    after: baseline\n"
+        "    var:\n"
+        "      replicas: 1\n"
+    )
+    nodes, config = load_suite(str(path))
+    assert config == {
+        "workers": 2,
+        "var": {},
+        "var_file": [str(tmp_path / "shared.yaml")],
+    }
+    baseline, kill = nodes
+    assert baseline.name == "baseline"
+    assert baseline.source == str(tmp_path / "experiments" / "baseline.json")
+    assert kill.after == ["baseline"]
+    assert kill.options == {"var": {"replicas": 1}}
+
+
+def test_run_suite_skips_the_dependents_of_failures():
+    outcomes = {"baseline": 0, "kill": 1, "recover": 0, "other": 0}
+    submitted = []
+
+    def submit(node):
+        submitted.append(node.name)
+        return completed(outcomes[node.name])
+
+    nodes = [
+        SuiteNode("baseline", "baseline.json"),
+        SuiteNode("kill", "kill.json", after=["baseline"]),
+        SuiteNode("recover", "recover.json", after=["kill"]),
+        SuiteNode("report", "report.json", after=["recover", "other"]),
+        SuiteNode("other", "other.json"),
+    ]
+    results = run_suite(nodes, submit)
+
+    assert submitted == ["baseline", "other", "kill"]
+    assert [(r["name"], r["status"]) for r in results] == [
+        ("baseline", "completed"),
+        ("kill", "failed"),
+        ("recover", "skipped"),
+        ("report", "skipped"),
+        ("other", "completed"),
+    ]
+    assert results[3]["skipped_after"] == "kill"
+
+
+def test_suite_command(tmp_path):
+    experiment = os.path.join(fixtures_dir, "check-configured-file-exists.json")
+    failing = os.path.join(fixtures_dir, "check-file-exists-fail.json")
+    suite_path = tmp_path / "suite.yaml"
+    suite_path.write_text(
+        yaml.safe_dump(
+            {
+                "var": {"path": "tests/missing.py"},
+                "experiments": [
+                    {
+                        "name": "baseline",
+                        "source": experiment,
+                        "var": {"path": "tests/conftest.py"},
+                    },
+                    {
+                        "name": "failing",
+                        "source": failing,
+                        "after": ["baseline"],
+                    },
+                    {
+                        "name": "downstream",
+                        "source": experiment,
+                        "after": ["failing"],
+                    },
+                    {"name": "independent", "source": experiment},
+                ],
+            }
+        )
+    )
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--settings",
+            empty_settings_path,
+            "--no-log-file",
+            "suite",
+            "--workers",
+            "2",
+            "--journal-path",
+            str(tmp_path),
+            str(suite_path),
+        ],
+    )
+    assert result.exit_code == 1
+
+    with open(tmp_path / "index.json") as f:
+        runs = {r["name"]: r for r in json.load(f)["runs"]}
+    assert runs["baseline"]["status"] == "completed"
+    assert runs["failing"]["status"] == "failed"
+    assert runs["downstream"]["status"] == "skipped"
+    assert runs["independent"]["status"] == "completed"
+    assert os.path.exists(tmp_path / "baseline.json")
+    assert not os.path.exists(tmp_path / "downstream.json")